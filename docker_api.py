@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+docker_api.py
+
+Minimal Docker Engine API client for the launcher tasks.
+
+Talks HTTP/1.1 to the daemon's unix socket over one persistent connection
+(re-opened transparently when the daemon closes it) and returns the decoded JSON
+objects instead of CLI tables. The socket path is a constructor argument, so the
+client can be pointed at a local fake server.
+
+Usage:
+    ./docker_api.py images | containers | ping      print the API result as JSON
+"""
+
+import http.client
+import json
+import os
+import socket
+import struct
+import sys
+from typing import Any, Optional
+from urllib.parse import quote, urlencode
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+API_VERSION = "v1.41"
+
+
+class DockerError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def get_socket_path() -> str:
+    docker_host = os.environ.get("DOCKER_HOST", "")
+    if docker_host.startswith("unix://"):
+        return docker_host[len("unix://"):]
+    if docker_host:
+        raise DockerError(0, f"DOCKER_HOST={docker_host} is not a unix socket")
+    return DEFAULT_SOCKET
+
+
+def split_image_name(image: str) -> tuple[str, str]:
+    """("registry:5000/repo", "tag") of an image reference; the tag defaults to latest."""
+    repository, _, tag = image.rpartition(":")
+    if not repository or "/" in tag:  # no tag, the colon belongs to a registry port
+        return image, "latest"
+    return repository, tag
+
+
+def demux_stream(data: bytes) -> tuple[bytes, bytes]:
+    """Split a non-TTY attach/exec stream (8-byte frame headers) into (stdout, stderr)."""
+    out, err = [], []
+    pos = 0
+    while pos + 8 <= len(data):
+        stream_type, size = struct.unpack(">BxxxL", data[pos:pos + 8])
+        payload = data[pos + 8:pos + 8 + size]
+        (err if stream_type == 2 else out).append(payload)
+        pos += 8 + size
+    return b"".join(out), b"".join(err)
+
+
+class DockerClient:
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = 60):
+        self.socket_path = socket_path or get_socket_path()
+        self.timeout = timeout
+        self.conn = UnixHTTPConnection(self.socket_path, timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def request(self, method: str, path: str, params: Optional[dict] = None, body: Any = None,
+                ok: tuple[int, ...] = (200, 201, 204, 304)) -> tuple[int, bytes]:
+        """Send one request on the persistent connection; returns (status, raw body)."""
+        url = f"/{API_VERSION}{path}"
+        if params:
+            url += "?" + urlencode(params)
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in (1, 2):
+            try:
+                self.conn.request(method, url, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self.conn.close()  # the daemon dropped the idle connection: reconnect once
+                if attempt == 2:
+                    raise
+        if response.will_close:
+            self.conn.close()
+        if response.status not in ok:
+            try:
+                message = json.loads(data).get("message", data.decode(errors="replace"))
+            except ValueError:
+                message = data.decode(errors="replace")
+            raise DockerError(response.status, message.strip())
+        return response.status, data
+
+    def get_json(self, path: str, params: Optional[dict] = None) -> Any:
+        return json.loads(self.request("GET", path, params)[1])
+
+    def ping(self) -> bool:
+        return self.request("GET", "/_ping")[1] == b"OK"
+
+    def images(self) -> list[dict]:
+        return self.get_json("/images/json")
+
+    def containers(self, all: bool = True, filters: Optional[dict] = None) -> list[dict]:
+        params = {"all": "1" if all else "0"}
+        if filters:
+            params["filters"] = json.dumps(filters)
+        return self.get_json("/containers/json", params)
+
+    def inspect_container(self, name: str) -> Optional[dict]:
+        try:
+            return self.get_json(f"/containers/{quote(name)}/json")
+        except DockerError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def inspect_image(self, name: str) -> Optional[dict]:
+        try:
+            return self.get_json(f"/images/{quote(name)}/json")
+        except DockerError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def pull_image(self, image: str) -> None:
+        """POST /images/create: pull `image` from its registry, returns once the pull finished."""
+        repository, tag = split_image_name(image)
+        _, data = self.request("POST", "/images/create", {"fromImage": repository, "tag": tag})
+        # the daemon answers 200 and reports failures in the JSON progress stream
+        for line in data.splitlines():
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get("error"):
+                raise DockerError(500, f"pull {image}: {message['error']}")
+
+    def create_container(self, name: str, config: dict, pull: bool = True) -> str:
+        """
+        POST /containers/create with a full create config; returns the container id.
+        A missing image is pulled and the create retried once, as `docker run` does.
+        """
+        try:
+            _, data = self.request("POST", "/containers/create", {"name": name}, config)
+        except DockerError as e:
+            if e.status != 404 or not pull:
+                raise
+            print(f"[i] {config['Image']} not found locally, pulling it", flush=True)
+            self.pull_image(config["Image"])
+            _, data = self.request("POST", "/containers/create", {"name": name}, config)
+        return json.loads(data)["Id"]
+
+    def start_container(self, container: str) -> None:
+        self.request("POST", f"/containers/{quote(container)}/start")
+
+    def stop_container(self, container: str, timeout: int = 10) -> None:
+        self.request("POST", f"/containers/{quote(container)}/stop", {"t": timeout})
+
+    def remove_container(self, container: str, force: bool = False) -> None:
+        self.request("DELETE", f"/containers/{quote(container)}", {"force": "1" if force else "0"})
+
+    def exec(self, container: str, cmd: list[str], user: Optional[str] = None) -> tuple[int, str, str]:
+        """Run `cmd` in a running container; returns (exit code, stdout, stderr)."""
+        config = {"Cmd": cmd, "AttachStdout": True, "AttachStderr": True, "Tty": False}
+        if user:
+            config["User"] = user
+        _, data = self.request("POST", f"/containers/{quote(container)}/exec", body=config)
+        exec_id = json.loads(data)["Id"]
+        # the daemon streams the output until the command exits, then closes the connection
+        _, data = self.request("POST", f"/exec/{exec_id}/start", body={"Detach": False, "Tty": False})
+        self.conn.close()
+        stdout, stderr = demux_stream(data)
+        exit_code = self.get_json(f"/exec/{exec_id}/json")["ExitCode"]
+        return exit_code, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("images", "containers", "ping"):
+        print("Usage: docker_api.py images | containers | ping")
+        sys.exit(1)
+    with DockerClient() as client:
+        result = getattr(client, sys.argv[1])()
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+build_cache.py
+
+Content-hash build stamps for hdlforge tool steps.
+
+A build key is a sha256 over the content of every input file plus any
+settings that change the tool output (flags, defines, top module, tool
+version ...). The key is written next to the build output; when the next
+call computes the same key the step can be skipped.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+from pathlib import Path
+from typing import Any, Iterable
+
+STAMP_FILE_NAME = ".hdlforge_build_key"
+INPUTS_FILE_NAME = ".hdlforge_build_inputs.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: Path) -> str:
+    """Return the sha256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_tool_version(cmd: list[str]) -> str:
+    """Return the first line printed by `cmd` (e.g. ["verilator", "--version"]), or "" if it cannot run."""
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    except OSError:
+        return ""
+    output = (result.stdout or result.stderr).strip()
+    return output.splitlines()[0] if output else ""
+
+
+def compute_build_key(files: Iterable[Path], settings: dict[str, Any]) -> str:
+    """
+    Hash the content of `files` (in order) together with `settings`.
+    `settings` must be JSON serialisable; unknown types are converted with str().
+    """
+    digest = hashlib.sha256()
+    for file in files:
+        file = Path(file)
+        digest.update(str(file).encode())
+        digest.update(b"\0")
+        digest.update(hash_file(file).encode() if file.exists() else b"<missing>")
+        digest.update(b"\n")
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def read_build_key(build_dir: Path) -> str | None:
+    stamp = Path(build_dir) / STAMP_FILE_NAME
+    if not stamp.exists():
+        return None
+    return stamp.read_text().strip()
+
+
+def write_build_key(build_dir: Path, key: str) -> None:
+    build_dir = Path(build_dir)
+    build_dir.mkdir(parents=True, exist_ok=True)
+    tmp = build_dir / (STAMP_FILE_NAME + ".tmp")
+    tmp.write_text(key + "\n")
+    os.replace(tmp, build_dir / STAMP_FILE_NAME)
+
+
+def clear_build_key(build_dir: Path) -> None:
+    for name in (STAMP_FILE_NAME, INPUTS_FILE_NAME):
+        stamp = Path(build_dir) / name
+        if stamp.exists():
+            stamp.unlink()
+
+
+def parse_make_depfile(depfile: Path) -> list[Path]:
+    """Prerequisites of every rule in a make dependency file (`targets : deps \\` lines)."""
+    deps = []
+    try:
+        with open(depfile, "r", errors="replace") as f:
+            text = f.read().replace("\\\n", " ")
+    except OSError:
+        return deps
+    for line in text.splitlines():
+        if ":" not in line:
+            continue
+        for dep in line.split(":", 1)[1].split():
+            if Path(dep) not in deps:
+                deps.append(Path(dep))
+    return deps
+
+
+def write_input_hashes(build_dir: Path, files: Iterable[Path]) -> None:
+    """Record the content hash of every input the tool actually read (checked by inputs_unchanged)."""
+    build_dir = Path(build_dir)
+    hashes = {str(f): hash_file(f) for f in map(Path, files) if f.is_file()}
+    tmp = build_dir / (INPUTS_FILE_NAME + ".tmp")
+    tmp.write_text(json.dumps(hashes, indent=1))
+    os.replace(tmp, build_dir / INPUTS_FILE_NAME)
+
+
+def inputs_unchanged(build_dir: Path) -> bool:
+    """False when no inputs were recorded or any recorded input changed or disappeared."""
+    try:
+        hashes = json.loads((Path(build_dir) / INPUTS_FILE_NAME).read_text())
+    except (OSError, ValueError):
+        return False
+    for file, digest in hashes.items():
+        if not Path(file).is_file() or hash_file(Path(file)) != digest:
+            return False
+    return True
+
+
+def is_up_to_date(build_dir: Path, key: str, outputs: Iterable[Path] = ()) -> bool:
+    """True when the stored key matches `key` and every expected output still exists."""
+    if read_build_key(build_dir) != key:
+        return False
+    return all(Path(output).exists() for output in outputs)
@@ -5,6 +5,8 @@ set synth_run     [lindex $argv 2]
 set impl_run      [lindex $argv 3]
 set param_string  [lindex $argv 4]
 set define_string [lindex $argv 5]
+set jobs          [expr { $argc > 6 ? [lindex $argv 6] : 4 }]
+set incremental_dcp [expr { $argc > 7 ? [lindex $argv 7] : "" }]
 
 puts "(i) print all arguments"
 puts "=========== TCL Arguments ==========="
@@ -14,6 +16,8 @@ puts "Synthesis run:    $synth_run"
 puts "Implementation run: $impl_run"
 puts "Parameters:       $param_string"
 puts "Defines:          $define_string"
+puts "Jobs:             $jobs"
+puts "Incremental DCP:  $incremental_dcp"
 puts "====================================="
 
 puts "(i) Open project"
@@ -67,7 +71,7 @@ if { $stage == "syn" | $stage == "all" | $stage == "impl" } {
         puts "setting current_run: $synth_run"
         current_run $run_obj
         reset_runs $synth_run
-        launch_runs $synth_run -to_step synth_design -jobs 4
+        launch_runs $synth_run -to_step synth_design -jobs $jobs
         wait_on_run $run_obj
        
     } else {
@@ -96,10 +100,18 @@ if { $stage == "impl" | $stage == "all" } {
 
     puts "$impl_run: $status (PROGRESS: $progress), needs_refresh: $need_refresh"
 
+    # the property is stored in the .xpr: always set it, so a full run never reuses a stale reference
+    if { $incremental_dcp ne "" && [file exists $incremental_dcp] } {
+        puts "(i) Incremental implementation from reference checkpoint: $incremental_dcp"
+        set_property incremental_checkpoint [file normalize $incremental_dcp] $run_obj
+    } else {
+        set_property incremental_checkpoint {} $run_obj
+    }
+
     if { $need_refresh == 1 || [string match "*complete*" $status_lower] == 0 } {
         puts "Resetting and launching implementation run: $impl_run"
         reset_runs $impl_run
-        launch_runs $impl_run -to_step write_bitstream -jobs 4
+        launch_runs $impl_run -to_step write_bitstream -jobs $jobs
         wait_on_run $run_obj
     } else {
         puts "Skipping $impl_run (STATUS: $status)"
@@ -8,10 +8,12 @@ A tiny helper that
 3. launches the same Docker command you had in Bash.
 
 Usage:
-    ./compile_ghdl.py <source_list.txt> <output_dir> <REPO_TOP>
+    ./compile_ghdl.py --repo_top R --project_json P [--lib L] --c compile|sim      VUnit compile (and cocotb sim)
+    ./compile_ghdl.py --repo_top R --project_json P [--lib L] --c analyse [--full] incremental ghdl-gcc -a
 """
 
 import argparse
+import json
 import os
 import shlex
 import subprocess
@@ -19,16 +21,97 @@ import sys
 from pathlib import Path
 from typing import NamedTuple
 from enum import Enum
-from vunit import VUnit 
 import tomllib
 
+import build_cache
+import ghdl_vendor_libs
+import hdl_deps
+import project_model
+import step_trace
+
+GHDL_STATE_FILE = ".hdlforge_ghdl_state.json"
+
+
+def get_ghdl_workdir(flags: list[str]) -> Path:
+    """The --workdir=DIR given in `flags` (GHDL writes its library files there), else the cwd."""
+    workdir = Path.cwd()
+    for flag in flags:
+        if flag.startswith("--workdir="):
+            workdir = Path(flag.split("=", 1)[1]).resolve()
+    return workdir
+
+
+def load_ghdl_state(workdir: Path) -> dict:
+    state_file = workdir / GHDL_STATE_FILE
+    try:
+        with open(state_file, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_ghdl_state(workdir: Path, state: dict) -> None:
+    workdir.mkdir(parents=True, exist_ok=True)
+    tmp = workdir / (GHDL_STATE_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, workdir / GHDL_STATE_FILE)
+
+
+def select_sources_to_analyse(sources: list[str], flags: list[str], workdir: Path, full: bool = False) -> tuple[list[str], dict]:
+    """
+    Compare `sources` against the state file in `workdir`.
+    Returns (sources to analyse in list order, new state to save once analysis succeeds).
+    Changed/new files are re-analysed together with every file that depends on them;
+    a change of flags or GHDL version, or a missing work library, means a full analysis.
+    """
+    old_state = load_ghdl_state(workdir)
+    old_files = old_state.get("files", {})
+    ghdl_version = build_cache.get_tool_version(["ghdl-gcc", "--version"])
+
+    files = {}
+    changed = []
+    for src in sources:
+        file_hash = build_cache.hash_file(Path(src))
+        old = old_files.get(src)
+        if old is not None and old["hash"] == file_hash:
+            files[src] = old  # unchanged: reuse the stored scan
+            continue
+        defines, uses = hdl_deps.scan_vhdl_file(Path(src))
+        files[src] = {"hash": file_hash, "defines": sorted(defines), "uses": sorted(uses)}
+        changed.append(src)
+    new_state = {"flags": flags, "ghdl_version": ghdl_version, "files": files}
+
+    if full:
+        print("[i] Full analysis requested")
+        return sources, new_state
+    if old_state.get("flags") != flags or old_state.get("ghdl_version") != ghdl_version:
+        if old_state:
+            print("[i] GHDL flags or version changed, full analysis")
+        return sources, new_state
+    if not any(workdir.glob("*-obj*.cf")):
+        print(f"[i] No GHDL library in {workdir}, full analysis")
+        return sources, new_state
+
+    scans = {src: (set(info["defines"]), set(info["uses"])) for src, info in files.items()}
+    dependents = hdl_deps.invert_graph(hdl_deps.build_dependency_graph(scans))
+    affected = hdl_deps.affected_files(changed, dependents)
+    to_analyse = [src for src in sources if src in affected]
+    print(f"[i] {len(changed)} changed, {len(to_analyse) - len(changed)} dependent, "
+          f"{len(sources) - len(to_analyse)} up to date of {len(sources)} sources")
+    return to_analyse, new_state
+
+
 def run_ghdl_on_file_list(repo_top: str,
                           file_of_sources: str,
                           ghdl_flags: list[str],
-                          compile_flag: list[str]) -> None:
+                          compile_flag: list[str],
+                          full: bool = False) -> None:
     """
     Read all source filenames from `file_of_sources`, resolve them,
-    then invoke ghdl-gcc -a once on the entire list.
+    then invoke ghdl-gcc -a once on the files that changed since the last
+    successful analysis (and the files depending on them).
+    `full` re-analyses the entire list.
     """
     # Resolve build path and sources file
     sources_list_path = Path(repo_top) / file_of_sources
@@ -42,14 +125,23 @@ def run_ghdl_on_file_list(repo_top: str,
             src = line.strip()
             if not src:
                 continue
-            src_path = Path(repo_top, src).resolve()
-            if not src_path.exists():
-                sys.exit(f"Source file not found: {src_path}")
-            sources.append(str(src_path))
+            sources.append(str(Path(repo_top, src).resolve()))
+    missing = project_model.find_missing(sources)
+    if missing:
+        for src_path in missing:
+            print(f"Source file not found: {src_path}")
+        sys.exit(f"{len(missing)} of {len(sources)} source files not found")
 
-    # Build the full GHDL command
     flags = ghdl_flags + compile_flag
-    ghdl_cmd = ["ghdl-gcc", "-a", *flags, *sources]
+    workdir = get_ghdl_workdir(flags)
+    to_analyse, new_state = select_sources_to_analyse(sources, flags, workdir, full)
+    if not to_analyse:
+        print("[i] All sources are up to date, nothing to analyse")
+        save_ghdl_state(workdir, new_state)  # drops files removed from the list
+        return
+
+    # Build the full GHDL command
+    ghdl_cmd = ["ghdl-gcc", "-a", *flags, *to_analyse]
 
     # Quote it and pipe through tee with pipefail enabled
     cmd_str = " ".join(shlex.quote(arg) for arg in ghdl_cmd)
@@ -57,27 +149,100 @@ def run_ghdl_on_file_list(repo_top: str,
 
     print(f"Running: {bash_invocation}")
     try:
-        subprocess.run(
-            bash_invocation,
-            shell=True,
-            check=True,
-            executable="/bin/bash"
-        )
+        with step_trace.span("ghdl analysis", cat="tool", files=len(to_analyse), of=len(sources)):
+            subprocess.run(
+                bash_invocation,
+                shell=True,
+                check=True,
+                executable="/bin/bash"
+            )
     except subprocess.CalledProcessError as e:
         print(f"Error during compilation (exit {e.returncode})")
         sys.exit(e.returncode)
-                        
-                        
+    save_ghdl_state(workdir, new_state)
+
+
+def load_project_toml(repo_top: str, project_json: str) -> tuple[dict, str]:
+    """(project data, directory of the project file)."""
+    project_json_full_path = os.path.join(repo_top, project_json)
+    with open(project_json_full_path, "rb") as f:
+        return tomllib.load(f), os.path.dirname(project_json_full_path)
+
+
+def analyse_libraries(args) -> None:
+    """
+    Incremental `ghdl-gcc -a` of every ghdl_settings.lib_list library (or --lib) into
+    <build_dir>/<lib>: only files changed since the last analysis and their dependents,
+    everything with --full.
+    """
+    repo_top = args.repo_top
+    project_data, project_dir = load_project_toml(repo_top, args.project_json)
+    ghdl_settings = project_data["ghdl_settings"]
+    libs = {name: info for name, info in ghdl_settings["lib_list"].items() if args.lib is None or args.lib == name}
+    if not libs:
+        print(f"❌ No library found matching '{args.lib}'")
+        exit(1)
+    for lib_name, lib_info in libs.items():
+        print(f"ℹ️  Analysing library {lib_name}")
+        flags = list(lib_info["ghdl_flags"])
+        if not any(flag.startswith("--work=") for flag in flags):
+            flags.append(f"--work={lib_name}")
+        if not any(flag.startswith("--workdir=") for flag in flags):
+            flags.append(f"--workdir={Path(project_dir, ghdl_settings['build_dir'], lib_name).resolve()}")
+        Path(get_ghdl_workdir(flags)).mkdir(parents=True, exist_ok=True)
+        external_dirs = ghdl_vendor_libs.resolve_external_libraries(lib_info.get("external_libraries", {}), repo_top,
+                                                                    lib_info["ghdl_flags"], ghdl="ghdl-gcc")
+        external_flags = [f"-P{lib_path}" for lib_path in external_dirs.values()]
+        sources_file = os.path.join(project_dir, lib_info["sources_file"])
+        run_ghdl_on_file_list(repo_top, sources_file, flags, external_flags, full=args.full)
+
+
+def run_cocotb_sim(lib_name: str, cocotb_target: dict, ghdl_flags: list[str]) -> None:
+    """
+    Elaborate and run `cocotb_target` (ghdl_settings.cocotb_targets.<name>) with the cocotb VPI.
+    test_path (PYTHONPATH of the test) and module (cocotb test module) are required,
+    toplevel defaults to top_module.
+    """
+    missing = [key for key in ("test_path", "module") if not cocotb_target.get(key)]
+    if missing:
+        sys.exit(f"ERROR: cocotb target needs {', '.join(missing)} to run sim")
+    top_module_to_sim = cocotb_target["top_module"]
+    generics_to_sim = cocotb_target.get("generics", [])
+    vpi_path = cocotb_target.get("vpi", "/mnt/userdata/miniconda3/envs/devtools/lib/python3.11/site-packages/cocotb/libs/libcocotbvpi_ghdl.so")
+    print(f"ℹ️  sim target: '{top_module_to_sim}' in library: '{lib_name}'")
+
+    print(*ghdl_flags)
+    cmd = ["ghdl", "-e", *ghdl_flags, f"--work={lib_name}",  top_module_to_sim]
+    print("ℹ️  Running:", " ".join(cmd))
+    subprocess.run(cmd, check=True)
+    env = os.environ.copy()
+    env.update({
+        "TOPLEVEL": cocotb_target.get("toplevel", top_module_to_sim),
+        "TOPLEVEL_LANG": "vhdl",
+        "MODULE": cocotb_target["module"],
+        "PYTHONPATH": cocotb_target["test_path"],
+        "COCOTB_SIM": "ghdl",
+        "CONFIG_FILE": cocotb_target.get("config_file", ""),
+        "COCOTB_FAIL_ON_EXCEPTION": "1",
+        # Optional: logging level
+        "COCOTB_LOG_LEVEL": "INFO",
+        "LD_LIBRARY_PATH": "/mnt/userdata/miniconda3/envs/devtools/lib:" + env.get("LD_LIBRARY_PATH", "")
+
+    })
+    cmd = ["ghdl", "-r", *ghdl_flags, f"--work={lib_name}",  top_module_to_sim,  *generics_to_sim, f"--vpi={vpi_path}"]
+    print("ℹ️  Running:", " ".join(cmd))
+    subprocess.run(cmd, check=True,env=env)
+    print(f"✅ sim of {top_module_to_sim} finished.")
+
 
 def run_vunit(args) -> None:
+    from vunit import VUnit
+
     os.environ["VUNIT_GHDL_PATH"] = "/mnt/tools/ghdl-llvm-5.1.1-ubuntu24.04-x86_64/bin" # path to the simulator executable
     repo_top=args.repo_top
     
     print(f"ℹ️  repo_top: {repo_top}")
-    project_json_full_path = os.path.join(repo_top, args.project_json)
-    project_dir = os.path.dirname(project_json_full_path)
-    with open(project_json_full_path, "rb") as f:
-        project_data = tomllib.load(f)
+    project_data, project_dir = load_project_toml(repo_top, args.project_json)
 
     settings        = project_data["settings"]
     project_path    = settings["project_path"]
@@ -100,12 +265,11 @@ def run_vunit(args) -> None:
             external_libraries = lib_info["external_libraries"]
             ######### processing external_libs ################
             print(f"ℹ️  processing external_libs")
-            for external_lib_name, external_lib in external_libraries.items():
-                name =external_lib_name
-                path = external_lib
-                if name == None or path == None:
-                    continue
-                path_realpath = os.path.realpath(os.path.join(repo_top, path))
+            # unisim/unimacro/xpm without an existing path come from the shared precompiled cache
+            external_dirs = ghdl_vendor_libs.resolve_external_libraries(
+                {name: path for name, path in external_libraries.items() if name is not None}, repo_top,
+                lib_info["ghdl_flags"], ghdl=os.path.join(os.environ["VUNIT_GHDL_PATH"], "ghdl"))
+            for name, path_realpath in external_dirs.items():
                 if( not os.path.isdir(path_realpath)): 
                     raise NotADirectoryError(f"external library path '{path_realpath}' does not exist or is not a directory")
                 
@@ -121,14 +285,16 @@ def run_vunit(args) -> None:
             sources_file = lib_info["sources_file"]
             sources_file = os.path.join(project_dir, sources_file)
             with open(sources_file) as f:
-                for line in f:
-                    vhdl_file_abs_path = os.path.abspath(os.path.join(repo_top, line.strip()))
-                    if(args.v):
-                        print(f"ℹ️ Adding source file: {vhdl_file_abs_path}")
-                    if not os.path.isfile(vhdl_file_abs_path):
-                        print(f"❌ Source file '{vhdl_file_abs_path}' does not exist.")
-                        exit(1) 
-                    vunit_lib.add_source_file(vhdl_file_abs_path)
+                vhdl_files = [os.path.abspath(os.path.join(repo_top, line.strip())) for line in f if line.strip()]
+            missing = project_model.find_missing(vhdl_files)
+            for vhdl_file_abs_path in missing:
+                print(f"❌ Source file '{vhdl_file_abs_path}' does not exist.")
+            if missing:
+                exit(1)
+            for vhdl_file_abs_path in vhdl_files:
+                if(args.v):
+                    print(f"ℹ️ Adding source file: {vhdl_file_abs_path}")
+                vunit_lib.add_source_file(vhdl_file_abs_path)
 
             print(f"✅  Library {lib_name} created with sources from {sources_file}")
             vunit_lib_ghdl_flags = lib_info["ghdl_flags"].copy()  # Copy to avoid modifying the original list 
@@ -145,48 +311,21 @@ def run_vunit(args) -> None:
         print(f"❌ No library found matching '{args.lib}'")
         exit(1)
 
-    vu.main()
+    try:
+        vu.main()
+    except SystemExit as e:  # vu.main() always exits; carry on to sim when it succeeded
+        if e.code not in (0, None):
+            raise
     
     print("✅ VUnit compilation completed successfully.")
     
-    cocotb_target   =  ghdl_settings["cocotb_targets"]["cocotb_main"]
-    lib_name_to_sim =  cocotb_target["lib_name"]
-    ghdl_flags_to_sim      =  ghdl_settings["lib_list"][lib_name_to_sim]["ghdl_flags"] 
-    print(f"ℹ️  ghdl_settings:{ghdl_settings['lib_list'][lib_name_to_sim]}")
-    generics_to_sim = cocotb_target["generics"]
-    top_module_to_sim   =  cocotb_target["top_module"]
-
     if args.cmd == "sim":
-        print(f"ℹ️  sim target: '{top_module_to_sim}' in library: '{lib_name}' with top module: '{top_module_to_sim}'")
-        
-        vpi_path = "/mnt/userdata/miniconda3/envs/devtools/lib/python3.11/site-packages/cocotb/libs/libcocotbvpi_ghdl.so"
-        test_path = ???
-
-        print(*ghdl_flags_to_sim)
-        cmd = ["ghdl", "-e", *ghdl_flags_to_sim, f"--work={lib_name}",  top_module_to_sim]
-        print("ℹ️  Running:", " ".join(cmd))
-        subprocess.run(cmd, check=True)
-        env = os.environ.copy()
-        env.update({
-            "TOPLEVEL": "???",
-            "TOPLEVEL_LANG": "vhdl",
-            "MODULE": "?", 
-            "PYTHONPATH": test_path,
-            "COCOTB_SIM": "ghdl",
-            "CONFIG_FILE": "?.json",  
-            "COCOTB_FAIL_ON_EXCEPTION": "1",
-            # Optional: logging level
-            "COCOTB_LOG_LEVEL": "INFO",
-            "LD_LIBRARY_PATH": "/mnt/userdata/miniconda3/envs/devtools/lib:" + env.get("LD_LIBRARY_PATH", "")
-
-        })
-        cmd = ["ghdl", "-r", *ghdl_flags_to_sim, f"--work={lib_name}",  top_module_to_sim,  *generics_to_sim, f"--vpi={vpi_path}"]
-        print("ℹ️  Running:", " ".join(cmd))
-        subprocess.run(cmd, check=True,env=env)
-        print(f"✅ sim of {top_module_to_sim} finished.")
-
-
-     
+        cocotb_target   =  ghdl_settings["cocotb_targets"]["cocotb_main"]
+        lib_name_to_sim =  cocotb_target["lib_name"]
+        print(f"ℹ️  ghdl_settings:{ghdl_settings['lib_list'][lib_name_to_sim]}")
+        run_cocotb_sim(lib_name_to_sim, cocotb_target, ghdl_settings["lib_list"][lib_name_to_sim]["ghdl_flags"])
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Compile and run VUnit with GHDL.")
     parser.add_argument("--repo_top", help="Top-level repository path")
@@ -196,8 +335,12 @@ if __name__ == "__main__":
     parser.add_argument("--test",       dest="test_name",help="Top-level entity name for VUnit")
     parser.add_argument("--lib",        dest="lib",default=None,required=False, help="Library name")
     parser.add_argument("--i",          dest="interactive",  action="store_true",required=False, help="Interactive mode")
-    parser.add_argument("--c",          dest="cmd", help="compile or elaborate", choices=["sim", "compile"], default="compile")
+    parser.add_argument("--c",          dest="cmd", help="compile or elaborate, analyse: incremental ghdl-gcc -a", choices=["sim", "compile", "analyse"], default="compile")
+    parser.add_argument("--full",       dest="full", help="analyse: re-analyse every file", action="store_true", default=False)
     parser.add_argument("--v",          dest="v", help="Verbose mode", action="store_true", default=False)
     args = parser.parse_args()
 
-    run_vunit(args)
\ No newline at end of file
+    if args.cmd == "analyse":
+        analyse_libraries(args)
+    else:
+        run_vunit(args)
\ No newline at end of file
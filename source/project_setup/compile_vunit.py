@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 
 import os
+import re
+import shutil
 import subprocess
 import sys
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from vunit import VUnit
 import load_config
+import step_trace
 
 
 
@@ -19,23 +23,140 @@ def run_cmd(cmd):
         sys.exit(f"ERROR: {e}")
 
 
-def compile_vhdl(libname: str, workdir: Path, sources: list[Path]):
-    UNISIM_GHDL="/home/admin/_repo/vivado/unisim/_ghdl"
-
-    cmd = [
-        "ghdl", "-a",
+def get_analyse_flags(external_dirs: list[str] = ()) -> list[str]:
+    """`external_dirs`: the external library directories (ghdl_vendor_libs.resolve_external_libraries)."""
+    return [
         "--std=08",
         "-fsynopsys",
-        f"-P{UNISIM_GHDL}",
-        f"--workdir={workdir}",
+        *[f"-P{lib_path}" for lib_path in external_dirs],
         "-Wno-library",   
         "-Whide",
         "-P/usr/lib/ghdl/gcc/vhdl/ieee/v08/",
         "-P/usr/lib/ghdl/gcc/vhdl/std/v08/"
-    ] + [str(s) for s in sources]
+    ]
+
+
+def compile_vhdl(libname: str, workdir: Path, sources: list[Path], external_dirs: list[str] = ()):
+    cmd = ["ghdl", "-a", *get_analyse_flags(external_dirs), f"--workdir={workdir}"] + [str(s) for s in sources]
     run_cmd(cmd)
 
 
+GHDL_FILE_LINE_RE = re.compile(r'^file\s+(\S+)\s+"([^"]*)"')
+
+
+def read_library_index(cf_file: Path) -> tuple[list[str], dict[tuple[str, str], str]]:
+    """
+    Split a GHDL library index (<lib>-obj<std>.cf) into its header lines and
+    one text block per analysed source file, keyed by the file's (dir, name).
+    """
+    header, blocks, key = [], {}, None
+    if not cf_file.exists():
+        return header, blocks
+    with open(cf_file, "r") as f:
+        for line in f:
+            m = GHDL_FILE_LINE_RE.match(line)
+            if m:
+                key = (m.group(1), m.group(2))
+                blocks[key] = line
+            elif key is None:
+                header.append(line)
+            else:
+                blocks[key] += line
+    return header, blocks
+
+
+def merge_library_index(scratch_cf: Path, cf_file: Path) -> None:
+    """Copy into `cf_file` every file block that the analysis in the scratch library added or changed."""
+    header, blocks = read_library_index(cf_file)
+    scratch_header, scratch_blocks = read_library_index(scratch_cf)
+    for key, block in scratch_blocks.items():
+        if blocks.get(key) != block:
+            blocks[key] = block
+    tmp = cf_file.with_suffix(".cf.tmp")
+    with open(tmp, "w") as f:
+        f.writelines(header or scratch_header)
+        f.writelines(blocks.values())
+    os.replace(tmp, cf_file)
+
+
+def get_compile_levels(vu, source_files) -> list[list]:
+    """
+    Group `source_files` (in VUnit compile order) into dependency levels:
+    every file only depends on files of lower levels, so one level can be analysed concurrently.
+    """
+    graph = vu._project.create_dependency_graph()  # pylint: disable=protected-access
+    level_of = {}
+    levels = []
+    for src in source_files:
+        node = src._source_file  # pylint: disable=protected-access
+        deps = graph.get_direct_dependencies(node)
+        level = 1 + max((level_of[dep] for dep in deps if dep in level_of), default=-1)
+        level_of[node] = level
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(src)
+    return levels
+
+
+def analyse_in_scratch(cmd: list[str], scratch_dir: Path, cf_file: Path) -> subprocess.CompletedProcess:
+    """Run one `ghdl -a` in a private work directory seeded with the current library index."""
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+    scratch_dir.mkdir(parents=True)
+    if cf_file.exists():
+        shutil.copy2(cf_file, scratch_dir / cf_file.name)
+    return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+
+def compile_vhdl_parallel(workdir: Path, levels: list[list], flags: list[str], jobs: int | None = None) -> None:
+    """
+    Analyse the files of each dependency level concurrently.
+
+    GHDL rewrites the whole <lib>-obj<std>.cf on every analysis, so concurrent runs into one
+    library would lose units: every file is analysed into its own scratch work directory
+    (other libraries are found through -P<workdir>), then the objects and the index
+    blocks are merged back into `workdir` before the next level starts.
+    """
+    workdir = Path(workdir).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    scratch_root = workdir / ".parallel"
+    if jobs is None:
+        jobs = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    std = next((flag.split("=", 1)[1] for flag in flags if flag.startswith("--std=")), "93")
+
+    for level_index, level in enumerate(levels):
+        print(f"[i] level {level_index + 1}/{len(levels)}: {len(level)} files on {min(jobs, len(level))} workers", flush=True)
+        work = []
+        for i, src in enumerate(level):
+            scratch_dir = scratch_root / str(i)
+            cf_file = workdir / f"{src.library.name}-obj{std}.cf"
+            cmd = ["ghdl", "-a", *flags, f"--work={src.library.name}", f"--workdir={scratch_dir}",
+                   f"-P{workdir}", src.name]
+            work.append((cmd, scratch_dir, cf_file))
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            results = list(pool.map(lambda w: analyse_in_scratch(*w), work))
+
+        failed = False
+        for (cmd, scratch_dir, cf_file), result in zip(work, results):
+            if result.returncode != 0 or result.stdout:
+                print(f"+ {' '.join(cmd)}")
+                print(result.stdout, end="")
+            if result.returncode != 0:
+                failed = True
+                error = subprocess.CalledProcessError(result.returncode, cmd)
+                print(f"ERROR: {error}")
+        if failed:
+            sys.exit(f"ERROR: analysis failed at level {level_index + 1}")
+
+        # merge serially: objects first, then the library index
+        for cmd, scratch_dir, cf_file in work:
+            for item in scratch_dir.iterdir():
+                if item.name != cf_file.name:
+                    os.replace(item, workdir / item.name)
+            merge_library_index(scratch_dir / cf_file.name, cf_file)
+    shutil.rmtree(scratch_root, ignore_errors=True)
+
+
 def elaborate(libname: str, workdir: Path, top: str):
     """Elaborate the top-level entity into an executable."""
     cmd = [
@@ -55,7 +176,9 @@ def run_vunit(  repo_top,
                 external_ghdl_path_list,
                 test_file=None,
                 compile_flag=[],
-                top_level=None) -> None:
+                top_level=None,
+                parallel=False,
+                jobs=None) -> None:
     
 
     # Ensure a VUnit action is present
@@ -85,6 +208,13 @@ def run_vunit(  repo_top,
         for vhdl_file in vhdl_ordred_files:
             file=os.path.abspath(vhdl_file)
             f.write(f"{file}\n")
+
+    if parallel:
+        flags = get_analyse_flags(external_ghdl_path_list) + list(compile_flag)
+        levels = get_compile_levels(vu, vu.get_compile_order(source_files=lib_files))
+        print(f"[i] {len(vhdl_ordred_files)} files in {len(levels)} dependency levels")
+        with step_trace.span("ghdl analysis", cat="tool", files=len(vhdl_ordred_files), levels=len(levels)):
+            compile_vhdl_parallel(Path(main_lib_path), levels, flags, jobs)
    
     
     for lib_path in external_ghdl_path_list:
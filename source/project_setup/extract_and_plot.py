@@ -1,31 +1,121 @@
 import matplotlib.pyplot as plt
 import argparse
+import re
 
 import numpy as np
 
-def process_latency_file(file_path):
-    latencies = []
+LATENCY_PERCENTILES = [1, 10, 20, 30, 40, 50, 60, 70, 80, 90, 99]
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024  # bytes read per chunk
+
+# first "diff=<number>[ns]" field of a line (not "prev_diff=", "max_diff=", ...)
+DIFF_RE = re.compile(rb"^[^\n]*?\bdiff=\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)", re.MULTILINE)
+
+
+def iter_latency_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read the file in fixed-size binary chunks (cut on line boundaries) and yield
+    a float64 array of the "diff" values found in each chunk.
+    """
+    with open(file_path, 'rb') as file:
+        remainder = b""
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            chunk = remainder + chunk
+            cut = chunk.rfind(b"\n") + 1
+            remainder = chunk[cut:]
+            matches = DIFF_RE.findall(chunk, 0, cut)
+            if matches:
+                yield np.round(np.array(matches).astype(np.float64), 3)  # Limit to 3 decimal places
+        if remainder:
+            matches = DIFF_RE.findall(remainder)
+            if matches:
+                yield np.round(np.array(matches).astype(np.float64), 3)
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with bounded relative error (log-spaced buckets, DDSketch style).
+    Every quantile is within `relative_accuracy` of the exact value; memory depends on the value
+    range, not on the number of values. Min and max are exact.
+    """
+
+    def __init__(self, relative_accuracy=0.001):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _add_to_store(self, store, values):
+        keys, counts = np.unique(np.ceil(np.log(values) / self.log_gamma).astype(np.int64), return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+
+    def add(self, values):
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.zero_count += int(np.count_nonzero(values == 0))
+        if np.any(values > 0):
+            self._add_to_store(self.positive, values[values > 0])
+        if np.any(values < 0):
+            self._add_to_store(self.negative, -values[values < 0])
+
+    def _bucket_value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def percentile(self, percentiles):
+        """Return the approximate values at `percentiles` (0..100)."""
+        # value-ordered buckets: most negative first
+        buckets = [(-self._bucket_value(k), c) for k, c in sorted(self.negative.items(), reverse=True)]
+        if self.zero_count:
+            buckets.append((0.0, self.zero_count))
+        buckets += [(self._bucket_value(k), c) for k, c in sorted(self.positive.items())]
+        values = np.array([b[0] for b in buckets])
+        cumulative = np.cumsum([b[1] for b in buckets])
+        ranks = np.floor(np.asarray(percentiles, dtype=np.float64) / 100 * (self.count - 1))
+        result = values[np.searchsorted(cumulative, ranks, side="right")]
+        return np.clip(result, self.min, self.max)
 
-    # Read the file and extract latency values (the "diff" field)
-    with open(file_path, 'r') as file:
-        for line in file:
-            if 'diff=' in line:
-                parts = line.strip().split(',')
-                diff_part = next(part for part in parts if 'diff=' in part)
-                diff_part = diff_part.replace('ns', '')  # Remove 'ns' if present
-                latency = float(diff_part.split('=')[1])  # Extract the value of "diff"
-                latency = round(latency, 3)  # Limit to 3 decimal places
-                latencies.append(latency)
-
-    # Calculate statistics using numpy
-    latencies = np.array(latencies)
-    min_latency = np.min(latencies)
-    max_latency = np.max(latencies)
-    percentiles = [1, 10, 20, 30, 40, 50, 60, 70, 80, 90, 99]
-    percentile_values = np.percentile(latencies, percentiles)
+
+def process_latency_file(file_path, chunk_size=DEFAULT_CHUNK_SIZE, sketch=False, relative_accuracy=0.001):
+    """
+    Print latency statistics of the "diff" field.
+    Exact mode keeps one float64 per value; `sketch` mode streams the file through a
+    QuantileSketch so memory stays bounded for files larger than RAM.
+    """
+    percentiles = LATENCY_PERCENTILES
+    if sketch:
+        quantiles = QuantileSketch(relative_accuracy)
+        for values in iter_latency_chunks(file_path, chunk_size):
+            quantiles.add(values)
+        if quantiles.count == 0:
+            print("No latency values found.")
+            return
+        min_latency, max_latency = quantiles.min, quantiles.max
+        percentile_values = quantiles.percentile(percentiles)
+    else:
+        chunks = list(iter_latency_chunks(file_path, chunk_size))
+        if not chunks:
+            print("No latency values found.")
+            return
+        latencies = np.concatenate(chunks)
+        del chunks
+        min_latency = np.min(latencies)
+        max_latency = np.max(latencies)
+        percentile_values = np.percentile(latencies, percentiles)
 
     # Display results
     print("Latency Statistics:")
+    if sketch:
+        print(f"(streaming sketch, relative error <= {relative_accuracy:g})")
     print(f"Min latency: {round(min_latency,3)}ns")
     for p, value in zip(percentiles, percentile_values):
         print(f"{p}% latency: {round(value,3)}ns")
@@ -33,49 +123,113 @@ def process_latency_file(file_path):
 
  
 
-def extract_and_plot(file_path, output_file="output_graph.png", items=None, start_time=0):
-    # Dictionaries to hold time and pre% values for each index
-    def extract_csv_value(line, key):
-        line = line.split(",")
-        for item in line:
-            if key in item:
-                return item.split("=")[1]
+DEFAULT_PLOT_POINTS = 10000  # buckets per series; each bucket contributes its min and max point
+INDEX_COLORS = {0: 'red', 1: 'blue', 2: 'black'}  # other indices use the default color cycle
+
+
+class MinMaxDecimator:
+    """
+    Single-pass, shape-preserving decimation of one (time, value) series.
+    Values are grouped in time buckets and only the min and max point of each bucket are
+    kept, so peaks survive. When more than 2 * `n_buckets` buckets exist the bucket width
+    doubles and neighbours merge, which bounds memory to the output resolution without
+    knowing the time range up front.
+    """
+
+    def __init__(self, n_buckets=DEFAULT_PLOT_POINTS, initial_width=1.0):
+        self.n_buckets = n_buckets
+        self.width = initial_width
+        self.t0 = None
+        self.buckets = {}  # index -> [t_min, v_min, t_max, v_max]
+
+    def add(self, t, v):
+        if self.t0 is None:
+            self.t0 = t
+        index = int((t - self.t0) // self.width)
+        bucket = self.buckets.get(index)
+        if bucket is None:
+            self.buckets[index] = [t, v, t, v]
+            if len(self.buckets) > 2 * self.n_buckets:
+                self._merge()
+        else:
+            if v < bucket[1]:
+                bucket[0], bucket[1] = t, v
+            if v > bucket[3]:
+                bucket[2], bucket[3] = t, v
+
+    def _merge(self):
+        while len(self.buckets) > self.n_buckets:
+            self.width *= 2
+            merged = {}
+            for index, bucket in self.buckets.items():
+                target = merged.get(index // 2)
+                if target is None:
+                    merged[index // 2] = bucket
+                    continue
+                if bucket[1] < target[1]:
+                    target[0], target[1] = bucket[0], bucket[1]
+                if bucket[3] > target[3]:
+                    target[2], target[3] = bucket[2], bucket[3]
+            self.buckets = merged
+
+    def points(self):
+        """Return (times, values) in time order."""
+        times, values = [], []
+        for index in sorted(self.buckets):
+            t_min, v_min, t_max, v_max = self.buckets[index]
+            pairs = [(t_min, v_min)] if t_min == t_max else sorted([(t_min, v_min), (t_max, v_max)])
+            for t, v in pairs:
+                times.append(t)
+                values.append(v)
+        return times, values
+
+
+def parse_usage_line(line):
+    """Parse "time=<ns>,value=<v>,item=<name>[<index>]" into (time, value, name, index), or None."""
+    fields = {}
+    for part in line.strip().split(","):
+        key, sep, value = part.partition("=")
+        if sep:
+            fields[key.strip()] = value.strip()
+    try:
+        time_ns = float(fields["time"])
+        value = float(fields["value"])
+        item = fields["item"]
+    except (KeyError, ValueError):
         return None
-    
-    data = {item: {0: {'times': [], 'pre_values': []},
-                   1: {'times': [], 'pre_values': []},
-                   2: {'times': [], 'pre_values': []}} for item in items}
+    name, _, index = item.partition("[")
+    index = int(index.split("]")[0]) if index else 0
+    return time_ns, value, name, index
+
+
+def extract_and_plot(file_path, output_file="output_graph.png", items=None, start_time=0, points=DEFAULT_PLOT_POINTS):
+    """
+    Stream the log once and plot every index of the selected items (all items when `items` is None).
+    Memory is bounded by `points` per series, independent of the log size.
+    """
+    series = {}  # (item, index) -> MinMaxDecimator
+    wanted = set(items) if items else None
 
     # Read and process the log file
-    with open(file_path, 'r') as file:
+    with open(file_path, 'r', errors='replace') as file:
         for line in file:
-            print(line)
-            time_ns = float(extract_csv_value(line, "time"))
-            value = float(extract_csv_value(line, "value"))
-            item = extract_csv_value(line, "item")
-            index = int(item.split("[")[1].split("]")[0])
-            item = item.split("[")[0]
-            if item in items:
-                # Extract relevant data for specified items
-                data[item][index]['times'].append(time_ns)
-                data[item][index]['pre_values'].append(value)
-    
-    # Downsample the data for better visualization
-    sample = 10000
-    for item in data:
-        for index in data[item]:
-            if len(data[item][index]['times']) > sample:
-                step = len(data[item][index]['times']) // sample
-                data[item][index]['times'] = data[item][index]['times'][::step]
-                data[item][index]['pre_values'] = data[item][index]['pre_values'][::step]
+            parsed = parse_usage_line(line)
+            if parsed is None:
+                continue
+            time_ns, value, item, index = parsed
+            if (wanted is not None and item not in wanted) or time_ns < start_time:
+                continue
+            decimator = series.get((item, index))
+            if decimator is None:
+                decimator = series[(item, index)] = MinMaxDecimator(points)
+            decimator.add(time_ns, value)
 
     # Plot the graph with specified colors and continuous lines
     plt.figure(figsize=(10, 6))
-    colors = {0: 'red', 1: 'blue', 2: 'black'}  # Define colors for each index
-    for item in data:
-        for index in data[item]:
-            if data[item][index]['times'] and data[item][index]['pre_values']:
-                plt.plot(data[item][index]['times'], data[item][index]['pre_values'], color=colors[index], linestyle='-', label=f"{item}[{index}] [%]")
+    for (item, index) in sorted(series):
+        times, values = series[(item, index)].points()
+        if times:
+            plt.plot(times, values, color=INDEX_COLORS.get(index), linestyle='-', label=f"{item}[{index}] [%]")
 
     # Customize the Y-axis ticks to reduce crowding
     plt.locator_params(axis='y', nbins=8)  # Set the number of Y-axis ticks (e.g., 8)
@@ -94,7 +248,15 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Parse log file and plot header usage.")
     parser.add_argument("file_path", type=str, help="Path to the log file")
     parser.add_argument("--output", type=str, default="output_graph.png", help="Path to save the output graph")
-    parser.add_argument("--items", type=str, help="List of items to search for in the log lines")
+    parser.add_argument("--items", type=str, help="List of items to search for in the log lines (default: all)")
+    parser.add_argument("--points", type=int, default=DEFAULT_PLOT_POINTS, help="Min/max buckets per plotted series")
+    parser.add_argument("--latency", action="store_true", help="Print latency percentiles of the 'diff=' field instead of plotting")
+    parser.add_argument("--sketch", action="store_true", help="With --latency: bounded-memory streaming quantiles (approximate)")
+    parser.add_argument("--accuracy", type=float, default=0.001, help="With --sketch: relative error bound (default: 0.001)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Bytes read per chunk")
     args = parser.parse_args()
 
-    extract_and_plot(args.file_path, args.output, args.items.split(","), 0)
+    if args.latency:
+        process_latency_file(args.file_path, args.chunk_size, args.sketch, args.accuracy)
+    else:
+        extract_and_plot(args.file_path, args.output, args.items.split(",") if args.items else None, 0, args.points)
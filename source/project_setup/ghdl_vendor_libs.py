@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+ghdl_vendor_libs.py
+
+Shared cache of precompiled GHDL vendor libraries (unisim, unimacro, xpm).
+
+Libraries are compiled once from the Vivado VHDL sources ($XILINX_VIVADO/data/vhdl/src)
+into <cache root>/<key>/<lib>, where the key hashes the GHDL version, backend, VHDL
+standard, analysis flags and the Vivado source tree. The cache root is
+$HDLFORGE_GHDL_LIBS, else /opt/hdlforge/ghdl_libs when it is mounted, else
+<user cache dir>/ghdl_libs. An existing entry is only ever read, so one directory
+can be built once and mounted into every container.
+
+Usage:
+    ./ghdl_vendor_libs.py build [--std 08] [--lib unisim --lib unimacro]   compile missing libraries
+    ./ghdl_vendor_libs.py path unisim [--std 08]                           print the library directory
+    ./ghdl_vendor_libs.py list                                             show the cache entries
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SHARED_CACHE_ROOT = Path("/opt/hdlforge/ghdl_libs")
+MANIFEST_FILE_NAME = "manifest.json"
+DEFAULT_STD = "08"
+DEFAULT_FLAGS = ["-fsynopsys", "-frelaxed", "-fexplicit", "-Wno-library", "-Wno-hide", "-Wno-binding"]
+
+# library -> (sources relative to data/vhdl/src, libraries it needs)
+# a "vhdl_analyze_order" entry expands to the files it lists (Vivado ships one per primitive dir)
+VENDOR_LIBRARIES = {
+    "unisim":   (["unisims/unisim_VPKG.vhd",
+                  "unisims/unisim_retarget_VCOMP.vhd",
+                  "unisims/primitive/vhdl_analyze_order",
+                  "unisims/retarget/vhdl_analyze_order"], []),
+    "unimacro": (["unimacro/unimacro_VCOMP.vhd",
+                  "unimacro/vhdl_analyze_order"], ["unisim"]),
+    "xpm":      (["xpm/xpm_VCOMP.vhd"], []),
+}
+
+GHDL_BACKEND_RES = {
+    "mcode": re.compile(r"mcode (JIT )?code generator"),
+    "llvm":  re.compile(r"llvm (\d+\.\d+\.\d+ )?code generator"),
+    "gcc":   re.compile(r"GCC (back-end|\d+\.\d+\.\d+) code generator"),
+}
+
+
+class VendorLibraryError(Exception):
+    pass
+
+
+def get_cache_root() -> Path:
+    if os.environ.get("HDLFORGE_GHDL_LIBS"):
+        return Path(os.environ["HDLFORGE_GHDL_LIBS"]).resolve()
+    if SHARED_CACHE_ROOT.is_dir():
+        return SHARED_CACHE_ROOT
+    from project_model import get_cache_dir
+    return get_cache_dir() / "ghdl_libs"
+
+
+def get_vivado_src_dir() -> Path:
+    return Path(os.environ.get("XILINX_VIVADO", "/opt/vivado")) / "data" / "vhdl" / "src"
+
+
+def get_ghdl_info(ghdl: str = "ghdl") -> dict:
+    """{"version": first line of `ghdl --version`, "backend": mcode/llvm/gcc}."""
+    try:
+        output = subprocess.run([ghdl, "--version"], capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise VendorLibraryError(f"Cannot run '{ghdl} --version': {e}")
+    backend = next((name for name, regex in GHDL_BACKEND_RES.items() if regex.search(output)), "unknown")
+    return {"version": output.splitlines()[0].strip() if output else "", "backend": backend}
+
+
+def get_cache_key(ghdl_info: dict, std: str, flags: list[str], src_dir: Path) -> str:
+    """Everything that changes the compiled libraries; the Vivado tree is identified by its real path."""
+    key = json.dumps({"ghdl": ghdl_info, "std": std, "flags": flags,
+                      "src": str(src_dir.resolve())}, sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def expand_sources(src_dir: Path, entries: list[str]) -> list[Path]:
+    sources = []
+    for entry in entries:
+        path = src_dir / entry
+        if path.name == "vhdl_analyze_order":
+            if path.exists():
+                with open(path, "r") as f:
+                    sources += [path.parent / line.strip() for line in f if line.strip()]
+            else:  # older trees have no order file: the files do not depend on each other
+                sources += [s for s in sorted(path.parent.glob("*.vhd")) if s not in sources]
+        else:
+            sources.append(path)
+    missing = [str(s) for s in sources if not s.exists()]
+    if missing:
+        raise VendorLibraryError(f"Vendor sources not found: {', '.join(missing[:5])}"
+                                 + (f" (+{len(missing) - 5} more)" if len(missing) > 5 else ""))
+    return sources
+
+
+def compile_library(ghdl: str, lib: str, sources: list[Path], workdir: Path, std: str, flags: list[str],
+                    dep_dirs: list[Path]) -> None:
+    workdir.mkdir(parents=True, exist_ok=True)
+    cmd = [ghdl, "-a", f"--std={std}", *flags, f"--work={lib}", f"--workdir={workdir}",
+           *[f"-P{d}" for d in dep_dirs], *[str(s) for s in sources]]
+    print(f"[i] Compiling {lib}: {len(sources)} files", flush=True)
+    result = subprocess.run(cmd, cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    with open(workdir / "compile.log", "w") as f:
+        f.write(result.stdout)
+    if result.returncode != 0:
+        raise VendorLibraryError(f"Compiling {lib} failed (exit {result.returncode}), see {workdir / 'compile.log'}")
+
+
+def read_manifest(entry_dir: Path) -> dict:
+    try:
+        with open(entry_dir / MANIFEST_FILE_NAME, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def ensure_vendor_libraries(libs: list[str],
+                            std: str = DEFAULT_STD,
+                            flags: list[str] | None = None,
+                            ghdl: str = "ghdl",
+                            build: bool = True) -> dict[str, Path]:
+    """
+    Return {lib: directory to pass as -P / external library} for `libs` and their dependencies.
+    Missing libraries are compiled into the cache (under a lock) when `build` is set.
+    """
+    flags = DEFAULT_FLAGS if flags is None else flags
+    unknown = [lib for lib in libs if lib not in VENDOR_LIBRARIES]
+    if unknown:
+        raise VendorLibraryError(f"Unknown vendor libraries: {', '.join(unknown)} (known: {', '.join(VENDOR_LIBRARIES)})")
+    wanted = []
+    for lib in libs:
+        for dep in VENDOR_LIBRARIES[lib][1] + [lib]:
+            if dep not in wanted:
+                wanted.append(dep)
+
+    src_dir = get_vivado_src_dir()
+    ghdl_info = get_ghdl_info(ghdl)
+    key = get_cache_key(ghdl_info, std, flags, src_dir)
+    entry_dir = get_cache_root() / key
+    dirs = {lib: entry_dir / lib for lib in wanted}
+
+    if all(lib in read_manifest(entry_dir).get("libraries", {}) for lib in wanted):
+        return dirs
+    if not build:
+        raise VendorLibraryError(f"Vendor libraries {', '.join(wanted)} are not in the cache {entry_dir} "
+                                 f"(run ./ghdl_vendor_libs.py build --std {std})")
+
+    try:
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        lock_file = open(entry_dir / ".lock", "w")
+    except OSError as e:
+        raise VendorLibraryError(f"Cache {entry_dir} is not writable ({e}); build it where it is mounted from")
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)  # another container may be building the same entry
+        manifest = read_manifest(entry_dir)
+        manifest.setdefault("ghdl", ghdl_info)
+        manifest.setdefault("std", std)
+        manifest.setdefault("flags", flags)
+        manifest.setdefault("src", str(src_dir))
+        libraries = manifest.setdefault("libraries", {})
+        for lib in wanted:
+            if lib in libraries:
+                continue
+            start = time.monotonic()
+            sources = expand_sources(src_dir, VENDOR_LIBRARIES[lib][0])
+            shutil.rmtree(dirs[lib], ignore_errors=True)  # leftovers of an interrupted build
+            compile_library(ghdl, lib, sources, dirs[lib], std, flags, [dirs[dep] for dep in VENDOR_LIBRARIES[lib][1]])
+            libraries[lib] = {"files": len(sources), "seconds": round(time.monotonic() - start, 1)}
+            print(f"[+] {lib} compiled in {libraries[lib]['seconds']}s -> {dirs[lib]}", flush=True)
+            tmp = entry_dir / f"{MANIFEST_FILE_NAME}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp, entry_dir / MANIFEST_FILE_NAME)
+    return dirs
+
+
+def get_ghdl_std(ghdl_flags: list[str]) -> str:
+    """The --std=XX of a library's ghdl_flags (the last one wins), else DEFAULT_STD."""
+    std = DEFAULT_STD
+    for flag in ghdl_flags:
+        if flag.startswith("--std="):
+            std = flag.split("=", 1)[1]
+    return std
+
+
+def resolve_external_libraries(external_libraries: dict[str, str | None], repo_top: str,
+                               ghdl_flags: list[str] = (),
+                               ghdl: str = "ghdl",
+                               flags: list[str] | None = None) -> dict[str, str]:
+    """
+    {name: directory} for a ghdl_settings.lib_list[*].external_libraries table: an existing path
+    (relative to repo_top) is used as is, the vendor libraries without one come from the cache
+    through a single ensure_vendor_libraries call. Nothing is built when no entry needs the cache.
+    `ghdl` is the executable the consumer analyses with and the VHDL standard comes from the
+    library's `ghdl_flags`, so the cache entry matches the backend and standard it is linked into.
+    """
+    std = get_ghdl_std(ghdl_flags)
+    dirs = {}
+    from_cache = []
+    for name, path in external_libraries.items():
+        if path:
+            path_realpath = os.path.realpath(os.path.join(repo_top, path))
+            if os.path.isdir(path_realpath) or name.lower() not in VENDOR_LIBRARIES:
+                dirs[name] = path_realpath
+                continue
+        from_cache.append(name)
+    if from_cache:
+        cached = ensure_vendor_libraries([name.lower() for name in from_cache], std=std, flags=flags, ghdl=ghdl)
+        dirs.update({name: str(cached[name.lower()]) for name in from_cache})
+    return {name: dirs[name] for name in external_libraries}
+
+
+def resolve_external_library(name: str, path: str | None, repo_top: str, ghdl_flags: list[str] = (),
+                             ghdl: str = "ghdl", flags: list[str] | None = None) -> str:
+    """Directory of one ghdl_settings.lib_list[*].external_libraries entry, see resolve_external_libraries."""
+    return resolve_external_libraries({name: path}, repo_top, ghdl_flags, ghdl, flags)[name]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared cache of precompiled GHDL vendor libraries.")
+    parser.add_argument("--std", default=DEFAULT_STD, help=f"VHDL standard (default: {DEFAULT_STD})")
+    parser.add_argument("--ghdl", default="ghdl", help="GHDL executable")
+    subparsers = parser.add_subparsers(dest="cmd", required=True)
+    build_parser = subparsers.add_parser("build", help="Compile the libraries missing from the cache")
+    build_parser.add_argument("--lib", action="append", choices=list(VENDOR_LIBRARIES), help="Library (default: all)")
+    path_parser = subparsers.add_parser("path", help="Print the directory of a cached library")
+    path_parser.add_argument("lib", choices=list(VENDOR_LIBRARIES))
+    subparsers.add_parser("list", help="Show the cache entries")
+    args = parser.parse_args()
+
+    try:
+        if args.cmd == "build":
+            for lib, lib_dir in ensure_vendor_libraries(args.lib or list(VENDOR_LIBRARIES), args.std, ghdl=args.ghdl).items():
+                print(f"{lib}: {lib_dir}")
+        elif args.cmd == "path":
+            print(ensure_vendor_libraries([args.lib], args.std, ghdl=args.ghdl, build=False)[args.lib])
+        else:
+            root = get_cache_root()
+            print(f"[i] cache root: {root}")
+            for entry_dir in sorted(root.glob("*")) if root.is_dir() else []:
+                manifest = read_manifest(entry_dir)
+                if manifest:
+                    print(f"{entry_dir.name}  {manifest['ghdl']['version']} ({manifest['ghdl']['backend']})  "
+                          f"std={manifest['std']}  {', '.join(manifest['libraries'])}")
+    except VendorLibraryError as e:
+        print(f"[!x!] {e}")
+        sys.exit(1)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+hdl_deps.py
+
+Lightweight VHDL / Verilog / SystemVerilog dependency scanner.
+
+Each file is scanned (comments stripped, regexes) for the design units it defines
+(VHDL entity/package/context/configuration, Verilog module/interface/program/package)
+and the units it uses (VHDL use/context clauses, direct entity instantiation,
+components, architecture-of, package body; Verilog module instantiation, import and
+pkg:: references, `include). Files are linked through unit names (lower-cased, one
+namespace for both languages, so mixed-language instantiation is followed).
+
+DependencyIndex keeps the scans in a JSON file, re-scanning only files whose
+mtime/size changed and whose content hash differs, and answers compile-order and
+"what depends on X" queries.
+
+Usage:
+    ./hdl_deps.py order <sources.txt | project.hdlforge.toml> [--tool vivado]
+    ./hdl_deps.py dependents <file> <sources.txt | project.hdlforge.toml> [--tool ghdl]
+    ./hdl_deps.py dependencies <file> <sources.txt | project.hdlforge.toml>
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable
+
+import build_cache
+
+INDEX_VERSION = 1
+INDEX_FILE_NAME = "hdl_deps.json"
+VHDL_SUFFIXES = {".vhd", ".vhdl"}
+VERILOG_SUFFIXES = {".v", ".vh", ".sv", ".svh"}
+
+VHDL_COMMENT_RE = re.compile(r"--[^\n]*")
+VHDL_DEFINE_RES = [
+    re.compile(r"^\s*entity\s+(\w+)\s+is\b", re.I | re.M),
+    re.compile(r"^\s*package\s+(?!body\b)(\w+)\s+is\b", re.I | re.M),
+    re.compile(r"^\s*context\s+(\w+)\s+is\b", re.I | re.M),
+    re.compile(r"^\s*configuration\s+(\w+)\s+of\b", re.I | re.M),
+]
+VHDL_USE_RES = [
+    re.compile(r"\buse\s+\w+\s*\.\s*(\w+)", re.I),                      # use work.pkg.all
+    re.compile(r"\bcontext\s+\w+\s*\.\s*(\w+)\s*;", re.I),              # context lib.ctx;
+    re.compile(r"\bentity\s+\w+\s*\.\s*(\w+)", re.I),                   # u0: entity work.foo
+    re.compile(r"^\s*component\s+(\w+)", re.I | re.M),                  # component foo
+    re.compile(r"^\s*architecture\s+\w+\s+of\s+(\w+)", re.I | re.M),    # architecture rtl of foo
+    re.compile(r"^\s*package\s+body\s+(\w+)", re.I | re.M),             # package body pkg
+    re.compile(r"^\s*configuration\s+\w+\s+of\s+(\w+)", re.I | re.M),   # configuration cfg of foo
+]
+
+
+def scan_vhdl_text(text: str) -> tuple[set[str], set[str]]:
+    """Return (defined units, used units) of VHDL source text, lower-cased."""
+    text = VHDL_COMMENT_RE.sub("", text)
+    defines = {m.lower() for regex in VHDL_DEFINE_RES for m in regex.findall(text)}
+    uses = {m.lower() for regex in VHDL_USE_RES for m in regex.findall(text)}
+    return defines, uses - {"all"}
+
+
+def scan_vhdl_file(path: Path) -> tuple[set[str], set[str]]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return scan_vhdl_text(f.read())
+
+
+VERILOG_COMMENT_RE = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+VERILOG_STRING_RE = re.compile(r'"(?:\\.|[^"\\\n])*"')
+VERILOG_INCLUDE_RE = re.compile(r'`include\s+"([^"]+)"')
+VERILOG_DEFINE_RE = re.compile(r"\b(?:module|macromodule|interface|program|package)\s+(?:(?:automatic|static)\s+)?(\w+)")
+VERILOG_IMPORT_RE = re.compile(r"\b(\w+)\s*::")
+# <type> [#(params)] <instance> [range] (   -- up to two levels of nested parentheses in the parameters
+VERILOG_INSTANCE_RE = re.compile(
+    r"^\s*([A-Za-z_]\w*)\s*(?:#\s*\((?:[^()]|\((?:[^()]|\([^()]*\))*\))*\)\s*)?\b[A-Za-z_]\w*\s*(?:\[[^\]]*\]\s*)?\(",
+    re.M | re.S)
+VERILOG_KEYWORDS = {
+    "module", "macromodule", "endmodule", "interface", "program", "package", "function", "task",
+    "begin", "end", "if", "else", "for", "foreach", "while", "repeat", "case", "casex", "casez",
+    "assign", "always", "always_ff", "always_comb", "always_latch", "initial", "final", "return",
+    "wire", "reg", "logic", "bit", "int", "integer", "input", "output", "inout", "ref", "var",
+    "parameter", "localparam", "genvar", "generate", "typedef", "struct", "union", "enum",
+    "assert", "assume", "cover", "property", "sequence", "default", "disable", "fork", "wait",
+    "import", "export", "class", "new", "void", "string", "real", "time", "posedge", "negedge",
+}
+
+
+def scan_verilog_text(text: str) -> tuple[set[str], set[str], set[str]]:
+    """Return (defined units, used units, included file names) of Verilog/SV source text."""
+    includes = set(VERILOG_INCLUDE_RE.findall(text))
+    text = VERILOG_COMMENT_RE.sub("", text)
+    text = VERILOG_STRING_RE.sub('""', text)
+    defines = {m.lower() for m in VERILOG_DEFINE_RE.findall(text)}
+    uses = {m.lower() for m in VERILOG_IMPORT_RE.findall(text)}
+    uses |= {m.lower() for m in VERILOG_INSTANCE_RE.findall(text) if m not in VERILOG_KEYWORDS}
+    return defines, uses - defines, includes
+
+
+def scan_file(path: Path) -> dict:
+    """Scan one HDL file; the language is taken from the suffix (VHDL unless it is a Verilog/SV suffix)."""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if path.suffix.lower() in VERILOG_SUFFIXES:
+        defines, uses, includes = scan_verilog_text(text)
+        lang = "verilog"
+    else:
+        (defines, uses), includes = scan_vhdl_text(text), set()
+        lang = "vhdl"
+    return {"lang": lang, "defines": sorted(defines), "uses": sorted(uses), "includes": sorted(includes)}
+
+
+def build_dependency_graph(scans: dict[str, tuple[set[str], set[str]]]) -> dict[str, set[str]]:
+    """
+    From {file: (defines, uses)} return {file: files it depends on}.
+    Uses of units not defined in `scans` (ieee, std, vendor libraries) are ignored.
+    """
+    definers = defaultdict(set)
+    for file, (defines, _) in scans.items():
+        for unit in defines:
+            definers[unit].add(file)
+    depends_on = {}
+    for file, (_, uses) in scans.items():
+        deps = set()
+        for unit in uses:
+            deps |= definers.get(unit, set())
+        deps.discard(file)
+        depends_on[file] = deps
+    return depends_on
+
+
+def invert_graph(depends_on: dict[str, set[str]]) -> dict[str, set[str]]:
+    """{file: dependencies} -> {file: files that depend on it}."""
+    dependents = defaultdict(set)
+    for file, deps in depends_on.items():
+        for dep in deps:
+            dependents[dep].add(file)
+    return dependents
+
+
+def affected_files(changed: Iterable[str], dependents: dict[str, set[str]]) -> set[str]:
+    """`changed` plus every file that depends on them, directly or transitively."""
+    affected = set()
+    stack = list(changed)
+    while stack:
+        file = stack.pop()
+        if file in affected:
+            continue
+        affected.add(file)
+        stack.extend(dependents.get(file, ()))
+    return affected
+
+
+def compile_order(files: list[str], depends_on: dict[str, set[str]]) -> list[str]:
+    """
+    Topological order of `files`, dependencies first; independent files keep their input order.
+    Files on a dependency cycle are emitted in input order with a warning.
+    """
+    position = {file: i for i, file in enumerate(files)}
+    order, state = [], {}
+
+    def visit(file, path):
+        if state.get(file) == "done":
+            return
+        if state.get(file) == "active":
+            print(f"[!] dependency cycle: {' -> '.join(path[path.index(file):] + [file])}")
+            return
+        state[file] = "active"
+        path.append(file)
+        for dep in sorted(depends_on.get(file, ()), key=position.get):
+            visit(dep, path)
+        path.pop()
+        state[file] = "done"
+        order.append(file)
+
+    for file in files:
+        visit(file, [])
+    return order
+
+
+class DependencyIndex:
+    """
+    Persistent {file: scan} index. A file is re-scanned only when its mtime/size changed
+    and its content hash differs from the stored one.
+    """
+    __slots__ = ("index_file", "entries", "dirty")
+
+    def __init__(self, index_file: Path | None = None):
+        self.index_file = Path(index_file) if index_file else get_index_file()
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(self.index_file, "r") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.entries = data["files"]
+        except (OSError, ValueError, KeyError):
+            pass  # missing / unreadable index: start empty
+
+    def update(self, files: Iterable[str]) -> list[str]:
+        """Bring the entries of `files` up to date; returns the files whose content changed."""
+        changed = []
+        for file in files:
+            st = os.stat(file)
+            entry = self.entries.get(file)
+            if entry is not None and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                continue
+            file_hash = build_cache.hash_file(Path(file))
+            if entry is None or entry["hash"] != file_hash:
+                entry = scan_file(Path(file))
+                entry["hash"] = file_hash
+                changed.append(file)
+            entry["mtime_ns"] = st.st_mtime_ns
+            entry["size"] = st.st_size
+            self.entries[file] = entry
+            self.dirty = True
+        return changed
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump({"version": INDEX_VERSION, "files": self.entries}, f)
+            os.replace(tmp, self.index_file)
+            self.dirty = False
+        except OSError as e:
+            print(f"[!] Could not write dependency index {self.index_file}: {e}")
+
+    def dependency_graph(self, files: list[str]) -> dict[str, set[str]]:
+        """{file: files it depends on} restricted to `files` (units and `include names resolved among them)."""
+        scans = {file: (set(self.entries[file]["defines"]), set(self.entries[file]["uses"])) for file in files}
+        depends_on = build_dependency_graph(scans)
+        by_name = defaultdict(set)
+        for file in files:
+            by_name[Path(file).name].add(file)
+        for file in files:
+            for include in self.entries[file]["includes"]:
+                depends_on[file] |= by_name.get(Path(include).name, set()) - {file}
+        return depends_on
+
+    def compile_order(self, files: list[str]) -> list[str]:
+        return compile_order(files, self.dependency_graph(files))
+
+    def dependents(self, targets: Iterable[str], files: list[str]) -> set[str]:
+        """Files of `files` depending (transitively) on any of `targets`, the targets excluded."""
+        targets = set(targets)
+        return affected_files(targets, invert_graph(self.dependency_graph(files))) - targets
+
+    def dependencies(self, targets: Iterable[str], files: list[str]) -> set[str]:
+        """Files of `files` that any of `targets` depends on (transitively), the targets excluded."""
+        targets = set(targets)
+        return affected_files(targets, self.dependency_graph(files)) - targets
+
+
+def get_index_file() -> Path:
+    from project_model import get_cache_dir
+    return get_cache_dir() / INDEX_FILE_NAME
+
+
+def read_file_list(source: str, tool: str | None = None) -> list[str]:
+    """Resolved files of a project TOML (optionally for one tool) or of a one-path-per-line list file."""
+    if source.endswith(".toml"):
+        import project_model
+        project = project_model.load_project(Path(source))
+        entries = project.files_for_tool(tool) if tool else [f.to_dict() for f in project.files]
+        files = [entry["resolved"] for entry in entries]
+    else:
+        base = Path(source).resolve().parent
+        with open(source, "r") as f:
+            files = [str((base / os.path.expandvars(line.strip())).resolve()) for line in f if line.strip()]
+    missing = [file for file in files if not os.path.isfile(file)]
+    if missing:
+        for file in missing:
+            print(f"[!x!] Source file not found: {file}")
+        sys.exit(1)
+    return files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HDL dependency index: compile order and dependents queries.")
+    parser.add_argument("--index", default=None, help=f"Index file (default: <cache dir>/{INDEX_FILE_NAME})")
+    parser.add_argument("--tool", default=None, help="Only the files enabled for this tool (project TOML input)")
+    subparsers = parser.add_subparsers(dest="cmd", required=True)
+    order_parser = subparsers.add_parser("order", help="Print the files in compile order")
+    order_parser.add_argument("sources", help="Source list file or *.hdlforge.toml")
+    for name, help_text in (("dependents", "Print the files depending on <file>"),
+                            ("dependencies", "Print the files <file> depends on")):
+        query_parser = subparsers.add_parser(name, help=help_text)
+        query_parser.add_argument("file", help="HDL file to query")
+        query_parser.add_argument("sources", help="Source list file or *.hdlforge.toml")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    files = read_file_list(args.sources, args.tool)
+    index = DependencyIndex(args.index)
+    changed = index.update(files)
+    index.save()
+
+    if args.cmd == "order":
+        result = index.compile_order(files)
+    else:
+        target = str(Path(args.file).resolve())
+        if target not in index.entries or target not in files:
+            sys.exit(f"[!x!] {target} is not in {args.sources}")
+        query = index.dependents if args.cmd == "dependents" else index.dependencies
+        selected = query([target], files)
+        result = [file for file in index.compile_order(files) if file in selected]
+    for file in result:
+        print(file)
+    print(f"[i] {len(files)} files, {len(changed)} rescanned, {(time.perf_counter() - start) * 1000:.1f} ms",
+          file=sys.stderr)
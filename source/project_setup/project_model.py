@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+project_model.py
+
+Compiled, cached model of a *.hdlforge.toml project file.
+
+The TOML is parsed once into a ProjectModel (compact __slots__ records for the
+settings and every [sources].files entry, with paths already joined/expanded/resolved)
+and pickled to $XDG_CACHE_HOME/hdlforge (default ~/.cache/hdlforge). The cache is
+reused while the TOML content (mtime/size, then sha256), the environment variables
+it references and the working directory are unchanged.
+
+verify_sources() stats every resolved file concurrently and reports all missing
+files at once, so a typo fails before any tool is launched.
+
+Usage:
+    ./project_model.py <project.hdlforge.toml> [tool]    print the compiled file list
+    ./project_model.py <project.hdlforge.toml> --check   report missing files of every tool
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import sys
+from pathlib import Path
+from typing import Any
+
+CACHE_VERSION = 2
+ENV_REF_RE = re.compile(r"\$\{?([A-Za-z_][A-Za-z0-9_]*)\}?")
+STAT_WORKERS = 32
+
+
+def find_missing(paths: list[str]) -> list[str]:
+    """Paths that do not exist, stat-ed concurrently (network file systems answer one stat at a time)."""
+    if not paths:
+        return []
+    from concurrent.futures import ThreadPoolExecutor  # ~10 ms to import, not paid by --list/--help
+    with ThreadPoolExecutor(max_workers=min(STAT_WORKERS, len(paths))) as pool:
+        exists = list(pool.map(os.path.exists, paths))
+    return [path for path, ok in zip(paths, exists) if not ok]
+
+
+def get_cache_dir() -> Path:
+    return Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "hdlforge"
+
+
+class SourceFile:
+    """One [sources].files entry. `file` matches get_file_list_for_tool, `resolved` is env-expanded and absolute."""
+    __slots__ = ("file", "resolved", "tools", "entry")
+
+    def __init__(self, file: str, resolved: str, tools: frozenset, entry: dict):
+        self.file = file
+        self.resolved = resolved
+        self.tools = tools
+        self.entry = entry
+
+    def to_dict(self) -> dict:
+        """The TOML entry with "file" rewritten, as get_file_list_for_tool returned it, plus "resolved"."""
+        d = dict(self.entry)
+        d["file"] = self.file
+        d["resolved"] = self.resolved
+        return d
+
+
+class ProjectModel:
+    __slots__ = ("version", "toml_path", "toml_mtime_ns", "toml_size", "toml_hash", "env", "cwd",
+                 "working_path", "data", "files")
+
+    def __repr__(self) -> str:
+        return f"ProjectModel({self.toml_path}, {len(self.files)} files)"
+
+    def files_for_tool(self, tool_name: str, verbose: bool = False) -> list[dict]:
+        """Entries enabled for `tool_name` (fresh dicts, the model is never mutated)."""
+        tool_files = [f.to_dict() for f in self.files if tool_name in f.tools]
+        if verbose:
+            for file_order, file_dict in enumerate(tool_files, start=1):
+                print(f"[i] source file #{file_order}: {file_dict['file']} for tool: {tool_name}")
+        return tool_files
+
+    def files_by_tool(self) -> dict[str, list[str]]:
+        """{tool: resolved paths} for every tool named in [sources].files, in file order."""
+        manifest = {}
+        for f in self.files:
+            for tool in sorted(f.tools):
+                manifest.setdefault(tool, []).append(f.resolved)
+        return manifest
+
+    def verify_sources(self, tool_name: str | None = None) -> None:
+        """Exit listing every missing file of `tool_name` (all tools when None)."""
+        files = self.files if tool_name is None else [f for f in self.files if tool_name in f.tools]
+        missing = set(find_missing([f.resolved for f in files]))
+        if not missing:
+            return
+        for f in files:
+            if f.resolved in missing:
+                unresolved = " (unset variable?)" if "$" in f.resolved else ""
+                print(f"[!x!] Missing source file: {f.resolved}{unresolved}  [{', '.join(sorted(f.tools))}]")
+        exit(f"{len(missing)} of {len(files)} source files not found, see {self.toml_path}")
+
+    def is_valid_for(self, toml_path: Path, st: os.stat_result) -> bool:
+        if self.version != CACHE_VERSION or self.toml_path != str(toml_path) or self.cwd != os.getcwd():
+            return False
+        if any(os.environ.get(name) != value for name, value in self.env.items()):
+            return False
+        if self.toml_mtime_ns == st.st_mtime_ns and self.toml_size == st.st_size:
+            return True
+        # touched but maybe unchanged: compare content
+        return self.toml_hash == hashlib.sha256(toml_path.read_bytes()).hexdigest()
+
+
+def compile_project(toml_path: Path, raw: bytes, st: os.stat_result) -> ProjectModel:
+    import tomllib  # only needed on a cache miss
+
+    text = raw.decode("utf-8")
+    data = tomllib.loads(text)
+
+    model = ProjectModel()
+    model.version = CACHE_VERSION
+    model.toml_path = str(toml_path)
+    model.toml_mtime_ns = st.st_mtime_ns
+    model.toml_size = st.st_size
+    model.toml_hash = hashlib.sha256(raw).hexdigest()
+    model.env = {name: os.environ.get(name) for name in sorted(set(ENV_REF_RE.findall(text)))}
+    model.cwd = os.getcwd()
+    model.data = data
+
+    working_path = os.path.expandvars(data["settings"]["project_path"])
+    model.working_path = Path(working_path).resolve()
+
+    files = []
+    for entry in data.get("sources", {}).get("files", []):
+        file_path = entry["file"]
+        if entry.get("relative_to_project_path", False):
+            file_path = model.working_path / Path(file_path)
+        else:
+            file_path = Path(file_path)
+        resolved = Path(os.path.expandvars(str(file_path))).resolve()
+        tools = frozenset(key for key, value in entry.items() if value is True and key != "relative_to_project_path")
+        files.append(SourceFile(str(file_path), str(resolved), tools, entry))
+    model.files = files
+    return model
+
+
+def load_project(toml_path: Path, use_cache: bool = True) -> ProjectModel:
+    """Return the compiled model of `toml_path`, from the on-disk cache when it is still valid."""
+    toml_path = Path(toml_path).resolve()
+    if not toml_path.exists():
+        exit(f"Project file not found: {toml_path}")
+    st = toml_path.stat()
+    cache_file = get_cache_dir() / (hashlib.sha1(str(toml_path).encode()).hexdigest() + ".pickle")
+
+    if use_cache and cache_file.exists():
+        try:
+            with open(cache_file, "rb") as f:
+                model = pickle.load(f)
+            if isinstance(model, ProjectModel) and model.is_valid_for(toml_path, st):
+                return model
+        except Exception:
+            pass  # unreadable / stale cache format: rebuild
+
+    model = compile_project(toml_path, toml_path.read_bytes(), st)
+    if use_cache:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_file)
+        except OSError as e:
+            print(f"[!] Could not write project cache {cache_file}: {e}")
+    return model
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: project_model.py <project.hdlforge.toml> [tool]")
+        sys.exit(1)
+    project = load_project(Path(sys.argv[1]))
+    if len(sys.argv) > 2 and sys.argv[2] == "--check":
+        project.verify_sources()
+        for tool, paths in project.files_by_tool().items():
+            print(f"[+] {tool}: {len(paths)} files")
+        sys.exit(0)
+    print(f"project_path: {project.working_path}")
+    files: list[Any] = project.files_for_tool(sys.argv[2]) if len(sys.argv) > 2 else [f.to_dict() for f in project.files]
+    for file_dict in files:
+        print(f"{file_dict['resolved']}")
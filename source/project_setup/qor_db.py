@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+qor_db.py
+
+Local history of Vivado build QoR and runtime, with regression alerts.
+
+Every completed synth/impl run is recorded once (keyed by project + run + run start time)
+into an sqlite database ($HDLFORGE_QOR_DB, default <user cache dir>/qor.sqlite, so it
+survives `--clean` / `--step new`) with:
+    project, run_flow, run, strategy (gen_run.xml), git commit (+ dirty flag),
+    status, wall time, peak memory, WNS/TNS/WHS/THS, LUT/FF/BRAM/URAM/DSP,
+    and per step (synth_design, opt_design, place_design, ...) elapsed, cpu and peak memory
+    from the "<step>: Time (s): ... Memory (MB): peak = ..." lines of runme.log.
+Each build is compared to the median of the builds of the same run before it.
+
+Usage:
+    ./qor_db.py record <project>.runs --project router [--run-flow main] [--run R ...] [--repo DIR]
+    ./qor_db.py trend --project router [--run R] [--last 10]       exit 1 when a latest build regressed
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import vivado_reports
+import vivado_runs
+
+BASELINE_BUILDS = 5
+DEFAULT_THRESHOLDS = {
+    "time_pct":   20.0,   # wall time (or one step) slower by more than this ...
+    "time_min_s": 120.0,  # ... and by more than this many seconds
+    "wns_ns":     0.1,    # WNS/WHS worse by more than this
+    "util_pct":   5.0,    # LUT/FF/BRAM/DSP usage up by more than this
+}
+
+STEP_TIME_RE = re.compile(r"^(\w+): Time \(s\): cpu = ([\d:]+) ; elapsed = ([\d:]+) \. Memory \(MB\): peak = ([\d.]+)")
+STRATEGY_RE  = re.compile(r'<StratHandle Name="([^"]*)"')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id         INTEGER PRIMARY KEY,
+    recorded   REAL,
+    project    TEXT,
+    run_flow   TEXT,
+    run        TEXT,
+    kind       TEXT,
+    strategy   TEXT,
+    git_commit TEXT,
+    git_dirty  INTEGER,
+    started    REAL,
+    status     TEXT,
+    wall_time  REAL,
+    peak_mem   REAL,
+    wns REAL, tns REAL, whs REAL, ths REAL,
+    lut REAL, ff REAL, bram REAL, uram REAL, dsp REAL,
+    UNIQUE (project, run, started)
+);
+CREATE TABLE IF NOT EXISTS steps (
+    build_id INTEGER REFERENCES builds(id),
+    step     TEXT,
+    elapsed  REAL,
+    cpu      REAL,
+    peak_mem REAL,
+    PRIMARY KEY (build_id, step)
+);
+"""
+
+
+def get_db_path() -> Path:
+    if os.environ.get("HDLFORGE_QOR_DB"):
+        return Path(os.environ["HDLFORGE_QOR_DB"])
+    from project_model import get_cache_dir
+    return get_cache_dir() / "qor.sqlite"
+
+
+def connect(db_path: Path | None = None) -> sqlite3.Connection:
+    db_path = Path(db_path) if db_path else get_db_path()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)  # concurrent sweeps may record at the same time
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def get_git_state(repo_top: Path) -> tuple[str, int]:
+    """(HEAD commit, 1 when tracked files are modified) of `repo_top`, ("", 0) outside git."""
+    try:
+        commit = subprocess.run(["git", "-C", str(repo_top), "rev-parse", "HEAD"],
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "-C", str(repo_top), "status", "--porcelain", "-uno"],
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "", 0
+    return commit, int(bool(dirty))
+
+
+def to_seconds(hms: str) -> float:
+    seconds = 0.0
+    for part in hms.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_step_times(log_file: Path) -> dict[str, dict]:
+    """{command: {"elapsed", "cpu", "peak_mem"}} from a run log; repeated commands add up."""
+    steps = {}
+    try:
+        with open(log_file, "r", errors="replace") as f:
+            for line in f:
+                m = STEP_TIME_RE.match(line)
+                if not m:
+                    continue
+                step = steps.setdefault(m.group(1), {"elapsed": 0.0, "cpu": 0.0, "peak_mem": 0.0})
+                step["cpu"] += to_seconds(m.group(2))
+                step["elapsed"] += to_seconds(m.group(3))
+                step["peak_mem"] = max(step["peak_mem"], float(m.group(4)))
+    except OSError:
+        pass
+    return steps
+
+
+def get_strategy(run_dir: Path) -> str:
+    try:
+        with open(run_dir / "gen_run.xml", "r", errors="replace") as f:
+            m = STRATEGY_RE.search(f.read())
+    except OSError:
+        return ""
+    return m.group(1) if m else ""
+
+
+def collect_build(run_dir: Path) -> dict | None:
+    """Metrics of a finished run directory, or None while it is still running / never ran."""
+    run = vivado_runs.scan_run(run_dir)
+    if run["status"] not in ("complete", "error"):
+        return None
+    reports = vivado_reports.parse_run(run_dir)
+    timing = reports["timing"] or {}
+    util = reports["utilization"] or {}
+    steps = parse_step_times(run_dir / "runme.log")
+    for step, marker in run["steps"].items():  # no log line (interrupted step): the marker times still count
+        if step != "vivado" and step not in steps and marker["elapsed"] is not None:
+            steps[step] = {"elapsed": marker["elapsed"], "cpu": None, "peak_mem": None}
+    build = {"run": run["run"], "kind": run["kind"], "strategy": get_strategy(run_dir), "started": run["started"],
+             "status": run["status"], "wall_time": run["elapsed"],
+             "peak_mem": max((s["peak_mem"] or 0.0 for s in steps.values()), default=None) or None,
+             "steps": steps}
+    build.update({key: timing.get(key) for key in ("wns", "tns", "whs", "ths")})
+    build.update({site.lower(): util.get(site, {}).get("used") for site in ("LUT", "FF", "BRAM", "URAM", "DSP")})
+    return build
+
+
+def record_runs(runs_dir: Path, project: str, run_flow: str | None = None, names: list[str] | None = None,
+                repo_top: Path | None = None, db_path: Path | None = None) -> int:
+    """Record every finished run under `runs_dir` not recorded yet; returns the number of new builds."""
+    runs_dir = Path(runs_dir)
+    if not runs_dir.is_dir():
+        return 0
+    commit, dirty = get_git_state(repo_top or Path.cwd())
+    added = 0
+    with connect(db_path) as conn:
+        for run_dir in sorted(runs_dir.iterdir()):
+            if not run_dir.is_dir() or (names is not None and run_dir.name not in names):
+                continue
+            build = collect_build(run_dir)
+            if build is None:
+                continue
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO builds (recorded, project, run_flow, run, kind, strategy, git_commit, git_dirty,"
+                " started, status, wall_time, peak_mem, wns, tns, whs, ths, lut, ff, bram, uram, dsp)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), project, run_flow or "", build["run"], build["kind"], build["strategy"], commit, dirty,
+                 build["started"], build["status"], build["wall_time"], build["peak_mem"],
+                 build["wns"], build["tns"], build["whs"], build["ths"],
+                 build["lut"], build["ff"], build["bram"], build["uram"], build["dsp"]))
+            if cur.rowcount == 0:
+                continue  # this run instance is already in the database
+            conn.executemany("INSERT INTO steps (build_id, step, elapsed, cpu, peak_mem) VALUES (?, ?, ?, ?, ?)",
+                             [(cur.lastrowid, step, s["elapsed"], s["cpu"], s["peak_mem"]) for step, s in build["steps"].items()])
+            added += 1
+    return added
+
+
+def get_builds(conn: sqlite3.Connection, project: str, run: str | None = None) -> list[dict]:
+    """Builds of `project` (oldest first), each with its "steps" {step: elapsed}."""
+    query = "SELECT * FROM builds WHERE project = ?" + (" AND run = ?" if run else "") + " ORDER BY run, started"
+    builds = [dict(row) for row in conn.execute(query, (project, run) if run else (project,))]
+    steps = {}
+    for row in conn.execute("SELECT build_id, step, elapsed FROM steps WHERE build_id IN "
+                            "(SELECT id FROM builds WHERE project = ?)", (project,)):
+        steps.setdefault(row["build_id"], {})[row["step"]] = row["elapsed"]
+    for build in builds:
+        build["steps"] = steps.get(build["id"], {})
+    return builds
+
+
+def median_of(builds: list[dict], key) -> float | None:
+    values = [v for v in (key(b) for b in builds) if v is not None]
+    return statistics.median(values) if values else None
+
+
+def find_regressions(build: dict, previous: list[dict], thresholds: dict) -> list[str]:
+    """What got worse in `build` compared to the median of the last BASELINE_BUILDS `previous` builds."""
+    baseline = [b for b in previous if b["status"] == "complete"][-BASELINE_BUILDS:]
+    if not baseline or build["status"] != "complete":
+        return []
+    flags = []
+
+    def slower(value, base):
+        return (value is not None and base
+                and value - base > thresholds["time_min_s"] and value > base * (1 + thresholds["time_pct"] / 100))
+
+    base = median_of(baseline, lambda b: b["wall_time"])
+    if slower(build["wall_time"], base):
+        flag = f"time +{(build['wall_time'] - base) / 60:.0f}m"
+        step_deltas = [(elapsed - median_of(baseline, lambda b, s=step: b["steps"].get(s)), step)
+                       for step, elapsed in build["steps"].items()
+                       if slower(elapsed, median_of(baseline, lambda b, s=step: b["steps"].get(s)))]
+        if step_deltas:
+            delta, step = max(step_deltas)
+            flag += f" ({step} +{delta / 60:.0f}m)"
+        flags.append(flag)
+    for key in ("wns", "whs"):
+        base = median_of(baseline, lambda b, k=key: b[k])
+        if build[key] is not None and base is not None and base - build[key] > thresholds["wns_ns"]:
+            flags.append(f"{key.upper()} {build[key] - base:+.3f}ns")
+    for key in ("lut", "ff", "bram", "dsp"):
+        base = median_of(baseline, lambda b, k=key: b[k])
+        if build[key] is not None and base and build[key] > base * (1 + thresholds["util_pct"] / 100):
+            flags.append(f"{key.upper()} +{100 * (build[key] - base) / base:.0f}%")
+    return flags
+
+
+def print_trend(project: str, run: str | None = None, last: int = 10, thresholds: dict | None = None,
+                db_path: Path | None = None) -> list[str]:
+    """Print the last `last` builds of every run with their regressions; returns the runs whose latest build regressed."""
+    from tabulate import tabulate
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    with connect(db_path) as conn:
+        builds = get_builds(conn, project, run)
+    if not builds:
+        print(f"[i] No QoR history for project: {project}")
+        return []
+    by_run = {}
+    for build in builds:
+        by_run.setdefault(build["run"], []).append(build)
+
+    regressed = []
+    for run_name, run_builds in by_run.items():
+        table = [["Date", "Commit", "Strategy", "Status", "Wall", "Peak MB", "WNS", "TNS", "LUT", "FF", "BRAM", "DSP", "Regression"]]
+        for i, build in enumerate(run_builds):
+            flags = find_regressions(build, run_builds[:i], thresholds)
+            if i == len(run_builds) - 1 and flags:
+                regressed.append(run_name)
+            if i < len(run_builds) - last:
+                continue
+            table.append([time.strftime("%Y-%m-%d %H:%M", time.localtime(build["started"])),
+                          build["git_commit"][:10] + ("*" if build["git_dirty"] else ""),
+                          build["strategy"], build["status"], vivado_runs.format_seconds(build["wall_time"]),
+                          "" if build["peak_mem"] is None else f"{build['peak_mem']:.0f}",
+                          *["" if build[k] is None else build[k] for k in ("wns", "tns", "lut", "ff", "bram", "dsp")],
+                          ("[!] " + ", ".join(flags)) if flags else ""])
+        print(f"\n================ {project}: {run_name} ({len(run_builds)} builds) ================")
+        print(tabulate(table, headers="firstrow", tablefmt="grid"))
+    for run_name in regressed:
+        print(f"[!] {run_name}: latest build regressed")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vivado QoR and runtime history.")
+    parser.add_argument("--db", default=None, help="Database file (default: $HDLFORGE_QOR_DB or <cache>/qor.sqlite)")
+    subparsers = parser.add_subparsers(dest="cmd", required=True)
+    record_parser = subparsers.add_parser("record", help="Record the finished runs of a <project>.runs directory")
+    record_parser.add_argument("runs_dir")
+    record_parser.add_argument("--project", required=True)
+    record_parser.add_argument("--run-flow", default=None)
+    record_parser.add_argument("--run", action="append", help="Only this run (repeatable)")
+    record_parser.add_argument("--repo", default=None, help="Git checkout the build came from (default: cwd)")
+    trend_parser = subparsers.add_parser("trend", help="Show the history and flag regressions")
+    trend_parser.add_argument("--project", required=True)
+    trend_parser.add_argument("--run", default=None)
+    trend_parser.add_argument("--last", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.cmd == "record":
+        added = record_runs(Path(args.runs_dir), args.project, args.run_flow, args.run,
+                            Path(args.repo) if args.repo else None, args.db)
+        print(f"[+] {added} builds recorded")
+    elif print_trend(args.project, args.run, args.last, db_path=args.db):
+        sys.exit(1)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+startup_bench.py
+
+Time-to-first-output benchmark for the hdlforge invoke CLI.
+
+Runs `invoke -c tasks <args>` from this directory several times per command and
+reports the time until the first byte appears on stdout and the total run time.
+Commands default to the ones that must stay fast (`--list` and each task's --help).
+
+Usage:
+    ./startup_bench.py                              # default commands, 10 runs each
+    ./startup_bench.py -n 20 --budget 0.1           # exit 1 if a median first-output > 100 ms
+    ./startup_bench.py --json out.json              # save results
+    ./startup_bench.py --compare out.json           # show change against a saved run
+    ./startup_bench.py --importtime                 # slowest imports of tasks.py
+    ./startup_bench.py -c "projects" -c "vivado --help"
+"""
+
+import argparse
+import json
+import os
+import selectors
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from tabulate import tabulate
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_COMMANDS = ["--list", "vivado --help", "Verilator --help", "projects --help"]
+
+
+def time_command(args: list[str], env: dict) -> tuple[float, float, int]:
+    """Return (seconds to first stdout byte, total seconds, exit code) for one run."""
+    start = time.perf_counter()
+    process = subprocess.Popen(["invoke", "-c", "tasks", *args], cwd=SCRIPT_DIR, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+    first_output = None
+    with selectors.DefaultSelector() as selector:
+        selector.register(process.stdout, selectors.EVENT_READ)
+        while True:
+            selector.select()
+            data = os.read(process.stdout.fileno(), 65536)
+            if first_output is None and data:
+                first_output = time.perf_counter() - start
+            if not data:
+                break
+    returncode = process.wait()
+    total = time.perf_counter() - start
+    return (first_output if first_output is not None else total), total, returncode
+
+
+def run_benchmark(commands: list[str], runs: int) -> dict[str, dict]:
+    env = dict(os.environ)
+    env.setdefault("HDLFORGE_ORIG_PATH", os.getcwd())
+    results = {}
+    for command in commands:
+        args = command.split()
+        time_command(args, env)  # warm-up: page cache, .pyc files
+        first, total, codes = [], [], set()
+        for _ in range(runs):
+            t_first, t_total, code = time_command(args, env)
+            first.append(t_first)
+            total.append(t_total)
+            codes.add(code)
+        results[command] = {
+            "first_output_median": statistics.median(first),
+            "first_output_min": min(first),
+            "total_median": statistics.median(total),
+            "exit_codes": sorted(codes),
+        }
+    return results
+
+
+def print_importtime(limit: int = 20) -> None:
+    """Print the slowest cumulative imports of `import tasks` (python -X importtime)."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import tasks"],
+                            cwd=SCRIPT_DIR, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self [us] | cumulative | imported package"
+        self_us, cumulative_us, name = [field.strip() for field in line.split(":", 1)[1].split("|")]
+        rows.append([name, int(cumulative_us) / 1000, int(self_us) / 1000])
+    rows.sort(key=lambda row: row[1], reverse=True)
+    print(tabulate(rows[:limit], headers=["Module", "Cumulative [ms]", "Self [ms]"], tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time-to-first-output benchmark for the hdlforge CLI.")
+    parser.add_argument("-c", "--command", action="append", help="invoke arguments to time (repeatable)")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Runs per command (default: 10)")
+    parser.add_argument("--budget", type=float, default=None, help="Fail if a median first-output exceeds this many seconds")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Compare against results saved with --json")
+    parser.add_argument("--importtime", action="store_true", help="Show the slowest imports of tasks.py and exit")
+    args = parser.parse_args()
+
+    if args.importtime:
+        print_importtime()
+        sys.exit(0)
+
+    results = run_benchmark(args.command or DEFAULT_COMMANDS, args.runs)
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else {}
+
+    table = []
+    over_budget = []
+    for command, r in results.items():
+        row = [command, f"{r['first_output_median'] * 1000:.1f}", f"{r['first_output_min'] * 1000:.1f}",
+               f"{r['total_median'] * 1000:.1f}", ",".join(str(c) for c in r["exit_codes"])]
+        if baseline:
+            old = baseline.get(command, {}).get("first_output_median")
+            row.append("" if old is None else f"{(r['first_output_median'] - old) * 1000:+.1f}")
+        table.append(row)
+        if args.budget is not None and r["first_output_median"] > args.budget:
+            over_budget.append(command)
+    headers = ["Command", "First output median [ms]", "First output min [ms]", "Total median [ms]", "Exit"]
+    if baseline:
+        headers.append("Δ first output [ms]")
+    print(tabulate(table, headers=headers, tablefmt="grid"))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"[+] Results saved to {args.json}")
+    if over_budget:
+        print(f"[!x!] Over the {args.budget * 1000:.0f} ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+step_trace.py
+
+Structured step-timing spans for hdlforge invocations.
+
+Every `with span("name"):` block appends one JSON line to the trace file
+($HDLFORGE_TRACE_FILE, default logs/trace_<date>.jsonl next to this file):
+    {"inv": <invocation id>, "name": ..., "cat": ..., "ts": <epoch s>, "dur": <s>,
+     "pid": ..., "depth": ..., "status": "ok"|"error", "args": {...}}
+start_invocation() adds a root span from process start (so interpreter and import
+time are visible) to exit. Worker processes inherit the invocation id.
+
+Usage:
+    ./step_trace.py [--file F] [--last N] summary          where the time went (last N invocations, 0: all)
+    ./step_trace.py [--file F] [--last N] chrome out.json  export for chrome://tracing / Perfetto
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+INVOCATION_ENV = "HDLFORGE_INVOCATION_ID"
+_local = threading.local()
+
+
+def get_trace_file() -> Path:
+    if os.environ.get("HDLFORGE_TRACE_FILE"):
+        return Path(os.environ["HDLFORGE_TRACE_FILE"])
+    return Path(__file__).resolve().parent / "logs" / f"trace_{time.strftime('%Y%m%d')}.jsonl"
+
+
+def get_invocation_id() -> str:
+    if INVOCATION_ENV not in os.environ:
+        os.environ[INVOCATION_ENV] = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    return os.environ[INVOCATION_ENV]
+
+
+def get_process_start_time() -> float:
+    """Epoch time this process started (from /proc), or now when it is not available."""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+def write_span(record: dict) -> None:
+    trace_file = get_trace_file()
+    try:
+        trace_file.parent.mkdir(parents=True, exist_ok=True)
+        # one write() per line on an O_APPEND file: lines of concurrent processes do not interleave
+        with open(trace_file, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError:
+        pass  # tracing must never break a build
+
+
+@contextmanager
+def span(name: str, cat: str = "step", **args):
+    """Time the enclosed block and record it as one span; extra keyword args are stored with it."""
+    depth = getattr(_local, "depth", 1)  # depth 0 is the invocation root
+    _local.depth = depth + 1
+    start = time.time()
+    status = "ok"
+    try:
+        yield args
+    except BaseException as e:
+        status = "error" if not (isinstance(e, SystemExit) and e.code in (0, None)) else "ok"
+        raise
+    finally:
+        _local.depth = depth
+        write_span({"inv": get_invocation_id(), "name": name, "cat": cat, "ts": round(start, 6),
+                    "dur": round(time.time() - start, 6), "pid": os.getpid(), "depth": depth,
+                    "status": status, "args": {k: str(v) for k, v in args.items()}})
+
+
+def start_invocation(name: str) -> None:
+    """Record `name` as the root span of this process, from process start to exit."""
+    if getattr(_local, "root_started", False):
+        return
+    _local.root_started = True
+    start = get_process_start_time()
+    invocation = get_invocation_id()
+    write_span({"inv": invocation, "name": "python startup", "cat": "overhead", "ts": round(start, 6),
+                "dur": round(time.time() - start, 6), "pid": os.getpid(), "depth": 1, "status": "ok", "args": {}})
+
+    def finish():
+        write_span({"inv": invocation, "name": name, "cat": "invocation", "ts": round(start, 6),
+                    "dur": round(time.time() - start, 6), "pid": os.getpid(), "depth": 0, "status": "ok",
+                    "args": {"argv": " ".join(sys.argv)}})
+    atexit.register(finish)
+
+
+def read_spans(trace_file: Path, last: int | None = None) -> list[dict]:
+    """Spans of the last `last` invocations in `trace_file` (all when None)."""
+    spans = []
+    with open(trace_file, "r") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue
+    if last:
+        invocations = []
+        for s in spans:
+            if s["inv"] not in invocations:
+                invocations.append(s["inv"])
+        keep = set(invocations[-last:])
+        spans = [s for s in spans if s["inv"] in keep]
+    return spans
+
+
+def to_chrome_trace(spans: list[dict]) -> dict:
+    """Chrome trace event format: one complete ("X") event per span, one trace process per invocation."""
+    events = []
+    invocations = {}
+    for s in spans:
+        pid = invocations.setdefault(s["inv"], len(invocations) + 1)
+        events.append({"name": s["name"], "cat": s["cat"], "ph": "X", "ts": int(s["ts"] * 1e6),
+                       "dur": int(s["dur"] * 1e6), "pid": pid, "tid": s["pid"],
+                       "args": dict(s.get("args", {}), status=s.get("status", "ok"))})
+    for inv, pid in invocations.items():
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": inv}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def print_summary(spans: list[dict]) -> None:
+    from tabulate import tabulate
+
+    by_inv = {}
+    for s in spans:
+        by_inv.setdefault(s["inv"], []).append(s)
+    for inv, inv_spans in by_inv.items():
+        root = next((s for s in inv_spans if s["depth"] == 0 and s["cat"] == "invocation"), None)
+        inv_spans.sort(key=lambda s: (s["ts"], s["depth"]))
+        total = root["dur"] if root else max(s["ts"] + s["dur"] for s in inv_spans) - min(s["ts"] for s in inv_spans)
+        print(f"\n================ {inv}: {root['args'].get('argv', root['name']) if root else ''} ================")
+        rows = []
+        for s in inv_spans:
+            if s is root:
+                continue
+            rows.append([("· " * max(s["depth"] - 1, 0)) + s["name"], s["cat"], f"{s['dur']:.3f}",
+                         f"{100 * s['dur'] / total:.1f}" if total else "", s.get("status", "")])
+        top_level = sum(s["dur"] for s in inv_spans if s["depth"] == 1 and s is not root)
+        if root:
+            rows.append(["(untraced python / task overhead)", "overhead", f"{max(total - top_level, 0):.3f}",
+                         f"{100 * max(total - top_level, 0) / total:.1f}" if total else "", ""])
+        print(tabulate(rows, headers=["Span", "Category", "Seconds", "% of total", "Status"], tablefmt="grid"))
+        print(f"[i] total {total:.3f}s")
+
+    totals = {}
+    for s in spans:
+        if s["depth"] == 0:
+            continue
+        entry = totals.setdefault(s["name"], [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += s["dur"]
+        entry[2] = max(entry[2], s["dur"])
+    if len(by_inv) > 1:
+        rows = [[name, n, f"{tot:.3f}", f"{tot / n:.3f}", f"{mx:.3f}"]
+                for name, (n, tot, mx) in sorted(totals.items(), key=lambda kv: kv[1][1], reverse=True)]
+        print(f"\n================ all {len(by_inv)} invocations ================")
+        print(tabulate(rows, headers=["Span", "Count", "Total [s]", "Mean [s]", "Max [s]"], tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="hdlforge step-timing traces.")
+    parser.add_argument("--file", default=None, help="Trace file (default: today's logs/trace_<date>.jsonl)")
+    parser.add_argument("--last", type=int, default=1, help="Only the last N invocations (0: all, default: 1)")
+    subparsers = parser.add_subparsers(dest="cmd", required=True)
+    subparsers.add_parser("summary", help="Show where the time went")
+    chrome_parser = subparsers.add_parser("chrome", help="Export a Chrome trace JSON")
+    chrome_parser.add_argument("output", help="Output file")
+    args = parser.parse_args()
+
+    trace_file = Path(args.file) if args.file else get_trace_file()
+    if not trace_file.exists():
+        print(f"[!x!] No trace file {trace_file}")
+        sys.exit(1)
+    spans = read_spans(trace_file, args.last or None)
+    if args.cmd == "summary":
+        print_summary(spans)
+    else:
+        with open(args.output, "w") as f:
+            json.dump(to_chrome_trace(spans), f)
+        print(f"[+] {len(spans)} spans written to {args.output}")
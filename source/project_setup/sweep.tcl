@@ -0,0 +1,95 @@
+# Usage:
+# vivado -mode batch -source sweep.tcl -tclargs <project.xpr> <sweep_runs.tcl> <jobs> <threads_per_run> <results.csv>
+#
+# sweep_runs.tcl is generated by hdlforge (vivado --step sweep); it creates the
+# strategy runs and sets sweep_synth_runs / sweep_impl_runs.
+
+if { $argc < 5 } {
+    puts "Usage: vivado -mode batch -source sweep.tcl -tclargs <project.xpr> <sweep_runs.tcl> <jobs> <threads_per_run> <results.csv>"
+    exit 1
+}
+
+set path_xpr    [lindex $argv 0]
+set runs_file   [lindex $argv 1]
+set jobs        [lindex $argv 2]
+set threads     [lindex $argv 3]
+set results_csv [lindex $argv 4]
+
+puts "=========== Sweep Arguments ==========="
+puts "Project file:     $path_xpr"
+puts "Runs file:        $runs_file"
+puts "Parallel jobs:    $jobs"
+puts "Threads per run:  $threads"
+puts "Results:          $results_csv"
+puts "======================================="
+
+open_project $path_xpr
+# limits this session only; every launched run applies it through the TCL.PRE hook from the runs file
+set_param general.maxThreads $threads
+
+puts "(i) Creating sweep runs"
+source $runs_file
+
+proc needs_launch {run} {
+    set status_lower [string tolower [get_property STATUS [get_runs $run]]]
+    set need_refresh [get_property NEEDS_REFRESH [get_runs $run]]
+    return [expr { [string match "*complete*" $status_lower] == 0 || $need_refresh == 1 }]
+}
+
+puts "================== stage = synthesis =================="
+set to_launch {}
+foreach run $sweep_synth_runs {
+    if { [needs_launch $run] } {
+        reset_runs $run
+        lappend to_launch $run
+    } else {
+        puts "(!) Skipping $run (STATUS: [get_property STATUS [get_runs $run]])"
+    }
+}
+if { [llength $to_launch] > 0 } {
+    puts "(i) Launching [llength $to_launch] synthesis runs with -jobs $jobs"
+    launch_runs $to_launch -jobs $jobs
+    foreach run $to_launch { wait_on_run $run }
+}
+
+puts "================== stage = Implementation ============"
+set to_launch {}
+foreach run $sweep_impl_runs {
+    set parent [get_property PARENT [get_runs $run]]
+    if { [string match "*complete*" [string tolower [get_property STATUS [get_runs $parent]]]] == 0 } {
+        puts "(!) Skipping $run: parent $parent did not complete"
+        continue
+    }
+    if { [needs_launch $run] } {
+        reset_runs $run
+        lappend to_launch $run
+    } else {
+        puts "(!) Skipping $run (STATUS: [get_property STATUS [get_runs $run]])"
+    }
+}
+if { [llength $to_launch] > 0 } {
+    puts "(i) Launching [llength $to_launch] implementation runs with -jobs $jobs"
+    launch_runs $to_launch -to_step route_design -jobs $jobs
+    foreach run $to_launch { wait_on_run $run }
+}
+
+puts "(i) Writing sweep results: $results_csv"
+set fp [open $results_csv w]
+puts $fp "run,synth_run,synth_strategy,impl_strategy,status,WNS,TNS,synth_elapsed,impl_elapsed"
+foreach run $sweep_impl_runs {
+    set run_obj   [get_runs $run]
+    set parent    [get_property PARENT $run_obj]
+    set synth_obj [get_runs $parent]
+    puts $fp [join [list $run $parent \
+        [get_property STRATEGY $synth_obj] \
+        [get_property STRATEGY $run_obj] \
+        [string map {"," ";"} [get_property STATUS $run_obj]] \
+        [get_property STATS.WNS $run_obj] \
+        [get_property STATS.TNS $run_obj] \
+        [get_property STATS.ELAPSED $synth_obj] \
+        [get_property STATS.ELAPSED $run_obj]] ","]
+}
+close $fp
+
+close_project
+puts "(i) tcl script completed."
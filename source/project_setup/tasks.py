@@ -1,24 +1,22 @@
 #!/usr/bin/env python
 
+# Keep module-level imports light: `hdlforge --list` and every Vivado-only task
+# import this file. cocotb, tabulate and the run/report/QoR readers (vivado_runs,
+# vivado_reports, qor_db) are imported inside the steps that use them
+# (see startup_bench.py for the time-to-first-output check).
 import os
 import sys
 from pathlib import Path
-import inspect
-import tomllib
-import tomli_w
-import cocotb
-from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge
-from cocotb.triggers import Timer
-from tabulate import tabulate
 
+from invoke import task
 
-from pyparsing import Union
-import invoke
-from invoke import task, run
-
-from typing import List, Dict, Any,Tuple
-import warnings
+from typing import List, Optional
+import verilator_runner
+import vivado_prj_mng
+import vivado_client
+import project_model
+import step_trace
+import shlex
 
 
 
@@ -104,6 +102,151 @@ def generate_vivado_tcl(
     output_path.write_text("\n".join(lines))
 
 
+NONPROJECT_STAGES = ["synth", "opt", "place", "phys_opt", "route", "bitstream"]
+NONPROJECT_COMMANDS = {"opt": "opt_design", "place": "place_design", "phys_opt": "phys_opt_design", "route": "route_design"}
+
+
+def tcl_braces(path: str) -> str:
+    return "{" + str(path) + "}"
+
+
+def generate_vivado_nonproject_tcl(
+    output_path: Path,
+    part: str,
+    top_module: str,
+    sources_dict_list,
+    generics: List[str] = [],
+    defines: List[str] = [],
+    stages: List[str] = NONPROJECT_STAGES,
+    directives: dict = {},
+    threads: int = 4,
+    constrset: str = "constrs_1") -> None:
+    """
+    Non-project (in-memory) flow from the same sources as generate_vivado_tcl.
+    Of the vivado_fileset constraint files only those of `constrset` (the project's active set) are read.
+    The script takes `-tclargs [from_stage] [to_stage]`: every stage writes <top>_<stage>.dcp,
+    a run starting after the first stage opens the checkpoint of the stage before it.
+    Report file names match the project runs, so vivado_reports parses the output directory too.
+    """
+    print(f"[i] Generating Vivado non-project TCL script: {output_path}")
+    read_lines = []
+    post_read_lines = []
+    include_dirs = []
+    for filedict in sources_dict_list:
+        file = filedict["resolved"]
+        ext = Path(file).suffix.lower()
+        if "vivado_fileset" in filedict:  # constraint sets
+            filesets = filedict["vivado_fileset"]
+            if constrset not in ([filesets] if isinstance(filesets, str) else filesets):
+                continue
+            read_lines.append(f"read_xdc {'-unmanaged ' if ext == '.tcl' else ''}{tcl_braces(file)}")
+        elif ext in (".vhd", ".vhdl"):
+            library = f" -library {filedict['library']}" if filedict.get("library") else ""
+            read_lines.append(f"read_vhdl -vhdl2008{library} {tcl_braces(file)}")
+        elif ext == ".v":
+            read_lines.append(f"read_verilog {tcl_braces(file)}")
+        elif ext == ".sv":
+            read_lines.append(f"read_verilog -sv {tcl_braces(file)}")
+        elif ext in (".vh", ".svh"):
+            if str(Path(file).parent) not in include_dirs:
+                include_dirs.append(str(Path(file).parent))
+        elif ext == ".xdc":
+            read_lines.append(f"read_xdc {tcl_braces(file)}")
+        elif ext == ".xci":
+            read_lines.append(f"read_ip {tcl_braces(file)}")
+        elif ext == ".bd":
+            read_lines.append(f"read_bd {tcl_braces(file)}")
+        elif ext == ".tcl":
+            post_read_lines.append(f"uplevel #0 [list source {tcl_braces(file)}]")  # global level, as in the project flow
+        else:
+            read_lines.append(f"add_files {tcl_braces(file)}")
+
+    synth_opts = [f"-top {top_module}", f"-part {part}", f"-directive {directives.get('synth', 'Default')}"]
+    synth_opts += [f"-generic {g}" for g in generics]
+    synth_opts += [f"-verilog_define {d}" for d in defines]
+    if include_dirs:
+        synth_opts.append(f"-include_dirs [list {' '.join(tcl_braces(d) for d in include_dirs)}]")
+
+    lines = []
+    lines.append("# This script was auto-generated by hdlforge (vivado --step batch): non-project flow.")
+    lines.append("# Usage: vivado -mode batch -source <this script> -notrace -tclargs [from_stage] [to_stage]")
+    lines.append("")
+    lines.append("#******************************************************")
+    lines.append(f"set top_module {top_module}")
+    lines.append(f"set PART  {part}")
+    lines.append(f"set stages [list {' '.join(stages)}]")
+    lines.append("set from_stage [expr { $argc > 0 ? [lindex $argv 0] : [lindex $stages 0] }]")
+    lines.append("set to_stage   [expr { $argc > 1 ? [lindex $argv 1] : [lindex $stages end] }]")
+    lines.append("set from_index [lsearch -exact $stages $from_stage]")
+    lines.append("set to_index   [lsearch -exact $stages $to_stage]")
+    lines.append("if { $from_index < 0 || $to_index < $from_index } {")
+    lines.append('    puts "Error: invalid stage range $from_stage..$to_stage (stages: $stages)"')
+    lines.append("    exit 1")
+    lines.append("}")
+    lines.append(f"set_param general.maxThreads {max(1, min(int(threads), vivado_prj_mng.VIVADO_MAX_THREADS))}")
+    lines.append("#******************************************************\n")
+
+    # REPO_TOP export: the sourced project .tcl files rely on it, as in generate_vivado_tcl
+    lines.append("#******************************************************")
+    lines.append("set REPO_TOP $::env(REPO_TOP)")
+    lines.append("set ::REPO_TOP $REPO_TOP")
+    lines.append("#******************************************************\n")
+
+    lines.append("proc stage_checkpoint {stage} { return \"${::top_module}_${stage}.dcp\" }")
+    lines.append("")
+    lines.append("proc read_sources {} {")
+    lines.extend(f"    {line}" for line in read_lines + post_read_lines)
+    lines.append("}")
+    lines.append("")
+    lines.append("proc run_stage {stage} {")
+    lines.append("    set top $::top_module")
+    lines.append('    puts "================== stage = $stage =================="')
+    lines.append("    set start [clock seconds]")
+    lines.append("    switch -- $stage {")
+    lines.append("        synth {")
+    lines.append("            read_sources")
+    lines.append(f"            synth_design {' '.join(synth_opts)}")
+    lines.append("            report_utilization -file ${top}_utilization_synth.rpt")
+    lines.append("        }")
+    for stage, command in NONPROJECT_COMMANDS.items():
+        lines.append(f"        {stage} {{")
+        lines.append(f"            {command} -directive {directives.get(stage, 'Default')}")
+        if stage == "place":
+            lines.append("            report_utilization -file ${top}_utilization_placed.rpt")
+        if stage == "route":
+            lines.append("            report_timing_summary -max_paths 10 -file ${top}_timing_summary_routed.rpt")
+            lines.append("            report_drc -file ${top}_drc_routed.rpt")
+            lines.append("            report_methodology -file ${top}_methodology_drc_routed.rpt")
+            lines.append("            report_power -file ${top}_power_routed.rpt")
+        lines.append("        }")
+    lines.append("        bitstream {")
+    lines.append("            write_bitstream -force ${top}.bit")
+    lines.append("        }")
+    lines.append("    }")
+    lines.append('    if { $stage ne "bitstream" } { write_checkpoint -force [stage_checkpoint $stage] }')
+    lines.append('    puts "(i) $stage done in [expr {[clock seconds] - $start}]s"')
+    lines.append("}")
+    lines.append("")
+    lines.append("#******************************************************")
+    lines.append("if { $from_index > 0 } {")
+    lines.append("    set resume_dcp [stage_checkpoint [lindex $stages [expr {$from_index - 1}]]]")
+    lines.append("    if { ![file exists $resume_dcp] } {")
+    lines.append('        puts "Error: cannot start at $from_stage, checkpoint $resume_dcp not found"')
+    lines.append("        exit 1")
+    lines.append("    }")
+    lines.append('    puts "(i) Resuming from checkpoint: $resume_dcp"')
+    lines.append("    open_checkpoint $resume_dcp")
+    lines.append("}")
+    lines.append("foreach stage [lrange $stages $from_index $to_index] {")
+    lines.append("    run_stage $stage")
+    lines.append("}")
+    lines.append('puts "(i) tcl script completed."')
+    lines.append("#******************************************************\n")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text("\n".join(lines))
+
+
 def add_python_paths_from_list(path_list):
     print("\n[i] Updating PYTHONPATH with the following paths:", flush=True)
     for path in path_list:
@@ -124,7 +267,7 @@ def add_python_paths_from_list(path_list):
 
 def print_task_args(local_vars: dict, REPO_TOP: str, allowed_values: dict[str, List[str]] = {}):
     # Get the calling function name automatically
-    caller_name = inspect.stack()[1].function  
+    caller_name = sys._getframe(1).f_code.co_name  
 
     # Remove Invoke context (c)
     args = {k: v for k, v in local_vars.items() if k != "c"}
@@ -143,6 +286,7 @@ def print_task_args(local_vars: dict, REPO_TOP: str, allowed_values: dict[str, L
             if REPO_TOP+"/" in str(value):
                 value = str(value).replace(REPO_TOP+"/", "$REPO_TOP/")
             table.append([key.ljust(max_key_len), value, ""])
+    from tabulate import tabulate
     print(tabulate(table, headers="firstrow", tablefmt="fancy_grid",colalign=("left", "left", "center")))
         
     print(border)
@@ -160,25 +304,14 @@ def print_boxed(message: str, border_char: str = "=", padding: int = 2):
 
         
 def load_project_data(ProjectFilePath): 
-    if( not ProjectFilePath.exists()):
-        exit(f"Project file not found: {ProjectFilePath}")    
-
-    with open(ProjectFilePath, "rb") as f:
-        project_data=tomllib.load(f)
-        project_data:dict
-        working_path= project_data["settings"]["project_path"]
-        working_path = os.path.expandvars(working_path) 
-        working_path =  Path(working_path).resolve()
-        return working_path, project_data
-
-def get_project_file_path(project_name_arg:Union[str,None]) ->  Path:
+    project = project_model.load_project(ProjectFilePath)
+    return project.working_path, project.data
+
+def get_project_file_path(project_name_arg:Optional[str]) ->  Path:
     INVOKE_PATH= Path(os.environ["HDLFORGE_ORIG_PATH"] )  
-    hdlforge_files = list(INVOKE_PATH.glob("*.hdlforge.toml"))
     if(project_name_arg==None):
+        hdlforge_files = list(INVOKE_PATH.glob("*.hdlforge.toml"))
         if(len(hdlforge_files) == 1):
-            with open(hdlforge_files[0], "rb") as f:
-                projects_dict=tomllib.load(f)
-            project_name_arg=str(projects_dict["settings"]["project_name"])
             project_file_path = INVOKE_PATH / hdlforge_files[0]
             return project_file_path
         else:
@@ -191,31 +324,18 @@ def get_project_file_path(project_name_arg:Union[str,None]) ->  Path:
     
    
 def get_file_list_for_tool(tool_name: str, project_data: dict,verbose: bool=False) -> List[dict]:
-   
-   
-    project_path_raw = Path(project_data["settings"]["project_path"])
-    project_path_expanded = os.path.expandvars(project_path_raw)
-    project_path_abs = Path(project_path_expanded).resolve()
-
-
-
-
-    all_source_files        =  project_data["sources"]["files"]
+    """Uncached variant for callers holding a raw TOML dict; tasks use ProjectModel.files_for_tool."""
+    project_path_abs = Path(os.path.expandvars(project_data["settings"]["project_path"])).resolve()
     tool_source_files= []
-    all_source_files:dict
-    file_order=1
-    for file_dict in all_source_files:
+    for file_dict in project_data["sources"]["files"]:
         if(tool_name in file_dict and file_dict[tool_name] is True):
-            relative_to_project_path = file_dict.get("relative_to_project_path", False)
             file_path = file_dict["file"]
-            if(relative_to_project_path):
+            if(file_dict.get("relative_to_project_path", False)):
                 file_path = project_path_abs / Path(file_path)
             else:
                 file_path = Path(file_path)
-            if verbose: print(f"[i] source file #{file_order}: {str(file_path)} for tool: {tool_name}")
-            file_order += 1
-            file_dict["file"] = str(file_path)
-            tool_source_files.append(file_dict)
+            if verbose: print(f"[i] source file #{len(tool_source_files)+1}: {str(file_path)} for tool: {tool_name}")
+            tool_source_files.append({**file_dict, "file": str(file_path)})
     return tool_source_files
 
 
@@ -237,26 +357,33 @@ def verify_project_file_path(_working_path: Path, REPO_TOP: Path):
     return PROJECT_FILES
 
 @task
-def vivado(c,project_toml_file=None,verbose=False,step:List[str]=[],clean=False,run_flow=None):
-   
+def vivado(c,project_toml_file=None,verbose=False,step:List[str]=[],clean=False,run_flow=None,cores=None,synth_strategies=None,impl_strategies=None,watch=None,incremental=False,from_stage=None,to_stage=None):
+    # traced from the task body, so --list/--help/completion do not write trace lines
+    step_trace.start_invocation("hdlforge " + " ".join(sys.argv[1:]))
 
-    ALLOWED_STEPS = {"step":["new","list_runs","reset_run", "syn", "impl", "bit"]}
+    ALLOWED_STEPS = {"step":["new","list_runs","reset_run", "syn", "impl", "bit", "sweep", "status", "report", "qor", "batch", "server_start", "server_stop", "server_status"]}
     TOOL_NAME = "vivado"
     SCRIPT_DIR                  = Path("/opt/project_setup")
     REPO_TOP        = get_and_verify_repo_top(Path(os.environ["HDLFORGE_ORIG_PATH"]))
 
 
     project_toml_file              = get_project_file_path(project_toml_file)
-    WORKING_PATH,PROJECT_DATA_DICT = load_project_data(project_toml_file)
+    with step_trace.span("project load", project=project_toml_file.name):
+        PROJECT                    = project_model.load_project(project_toml_file)
+    WORKING_PATH,PROJECT_DATA_DICT = PROJECT.working_path, PROJECT.data
     VIVADO_SETTING_DICT             = PROJECT_DATA_DICT["vivado_settings"]
 
    
     VIVADO_BUILD_DIR        = WORKING_PATH / VIVADO_SETTING_DICT["build_dir"]
-    SOURCES_DICT_LIST       = get_file_list_for_tool(TOOL_NAME, PROJECT_DATA_DICT,verbose)
+    with step_trace.span("source resolve", tool=TOOL_NAME):
+        SOURCES_DICT_LIST   = PROJECT.files_for_tool(TOOL_NAME, verbose)
     VIVADO_GEN_PRJ_TCL_PATH = WORKING_PATH / VIVADO_SETTING_DICT["project_tcl"]
     PROJECT_NAME            = VIVADO_SETTING_DICT["project_name"].strip()  # strip spaces just in case
     TOP_MODULE              = VIVADO_SETTING_DICT["top_module"]
     PART                    = VIVADO_SETTING_DICT["part"]
+    CORES                   = int(cores) if cores else int(VIVADO_SETTING_DICT.get("cores", 4))
+    SERVER_STATE_FILE       = VIVADO_BUILD_DIR / vivado_client.STATE_FILE_NAME
+    NONPROJECT_DIR          = VIVADO_BUILD_DIR / "nonproject"
 
     ##remove REPO_TOP  from sources list
 
@@ -280,40 +407,83 @@ def vivado(c,project_toml_file=None,verbose=False,step:List[str]=[],clean=False,
     if(clean):
         cleaning(VIVADO_BUILD_DIR,True)
 
-    def call_compile_tcl(step,syth_name,impl_name,paramaters,defines ):
+    def run_vivado_script(script, tclargs):
+        """Source `script` in the running vivado server if there is one, else in a new vivado batch process."""
+        tclargs = [str(a) for a in tclargs]
+        client = vivado_client.VivadoClient.from_state_file(SERVER_STATE_FILE)
+        if client is not None:
+            print(f"[i] Using running vivado server ({SERVER_STATE_FILE}): {Path(script).name} {' '.join(tclargs)}",flush=True)
+            with client:
+                try:
+                    client.source(Path(script), tclargs)
+                except vivado_client.VivadoServerError as e:
+                    print(f"[!x!] {Path(script).name} failed in vivado server: {e}",flush=True)
+                    exit(1)
+            return
         with c.cd(str(VIVADO_BUILD_DIR)):
-            table=[["Step", step]]
-            table.append(["Synth", syth_name])
-            table.append(["Impl", impl_name])
-            table.append(["Parameters", paramaters])
-            table.append(["Defines", defines])
-            print(tabulate(table, headers="firstrow", tablefmt="grid"))
-
-            cmd= f"vivado -mode batch -source {SCRIPT_DIR}/compile.tcl -notrace -tclargs  {PROJECT_NAME}.xpr {step} {syth_name} {impl_name} '{paramaters}' '{defines}'"
-            print(f"\n[i] Running Vivado compile TCL script with command: {cmd}\n",flush=True)
+            cmd = f"vivado -mode batch -source {script} -notrace -tclargs  {' '.join(shlex.quote(a) for a in tclargs)}"
+            print(f"\n[i] Running Vivado TCL script with command: {cmd}\n",flush=True)
             c.run(cmd,pty=True,echo=True)
 
+    def get_flow_run_names():
+        """Synth and impl runs of --run-flow, or None (all runs) when it is not given."""
+        if run_flow is None:
+            return None
+        flow = VIVADO_SETTING_DICT["runs_flow"][run_flow]
+        return [flow["synth"], *flow["impl"]]
+
+    def record_qor(run_names, flow_name):
+        """Add the finished runs to the QoR/runtime history (once per run launch)."""
+        import qor_db
+        with step_trace.span("qor record"):
+            added = qor_db.record_runs(VIVADO_BUILD_DIR / f"{PROJECT_NAME}.runs", PROJECT_NAME, flow_name, run_names, REPO_TOP)
+        print(f"[i] QoR history: {added} new builds recorded ({qor_db.get_db_path()})")
+
+    def stop_vivado_server():
+        client = vivado_client.VivadoClient.from_state_file(SERVER_STATE_FILE)
+        if client is None:
+            print(f"[i] No vivado server running for project: {PROJECT_NAME}")
+            return
+        with client:
+            client.stop()
+        print(f"[+] Stopped vivado server for project: {PROJECT_NAME}")
+
+    def call_compile_tcl(step,syth_name,impl_name,paramaters,defines,jobs=CORES,incremental_dcp="" ):
+        table=[["Step", step]]
+        table.append(["Synth", syth_name])
+        table.append(["Impl", impl_name])
+        table.append(["Parameters", paramaters])
+        table.append(["Defines", defines])
+        table.append(["Incremental", incremental_dcp or "no"])
+        from tabulate import tabulate
+        print(tabulate(table, headers="firstrow", tablefmt="grid"))
+
+        with step_trace.span(f"vivado {step}", cat="tool", synth=syth_name, impl=impl_name):
+            run_vivado_script(SCRIPT_DIR / "compile.tcl", [f"{PROJECT_NAME}.xpr", step, syth_name, impl_name, paramaters, defines, jobs, incremental_dcp])
+
     for s in step:
         match (s):
             case "new":
+                PROJECT.verify_sources(TOOL_NAME)  # fail on any missing file before Vivado starts add_files
+                stop_vivado_server()  # the project is about to be recreated under it
                 c.run(f"mkdir -p {VIVADO_BUILD_DIR}")
                 cleaning(VIVADO_BUILD_DIR,True)
                 print(f"[i] Creating new Vivado project: {PROJECT_NAME}")
 
-                generate_vivado_tcl(
-                    output_path=VIVADO_GEN_PRJ_TCL_PATH,
-                    project_name=PROJECT_NAME,
-                    part=PART,
-                    top_module=TOP_MODULE,
-                    sources_dict_list=SOURCES_DICT_LIST)
+                with step_trace.span("tcl generation", files=len(SOURCES_DICT_LIST)):
+                    generate_vivado_tcl(
+                        output_path=VIVADO_GEN_PRJ_TCL_PATH,
+                        project_name=PROJECT_NAME,
+                        part=PART,
+                        top_module=TOP_MODULE,
+                        sources_dict_list=SOURCES_DICT_LIST)
                 print(f"[i] Creating Vivado project : {VIVADO_GEN_PRJ_TCL_PATH}")
-                with c.cd(str(VIVADO_BUILD_DIR)):
+                with step_trace.span("vivado project creation", cat="tool"), c.cd(str(VIVADO_BUILD_DIR)):
                     c.run(f"vivado -mode batch -source {VIVADO_GEN_PRJ_TCL_PATH} -notrace")
 
             case "list_runs":
                 print(f"[i] Listing Vivado runs for project: {PROJECT_NAME}")
-                with c.cd(str(VIVADO_BUILD_DIR)):
-                    c.run(f"vivado -mode batch -source {SCRIPT_DIR}/project_tool.tcl -notrace -tclargs  list_all_runs  {PROJECT_NAME}.xpr",pty=True,echo=True)
+                run_vivado_script(SCRIPT_DIR / "project_tool.tcl", ["list_all_runs", f"{PROJECT_NAME}.xpr"])
                 
             case "reset_run":
                 pass
@@ -333,8 +503,131 @@ def vivado(c,project_toml_file=None,verbose=False,step:List[str]=[],clean=False,
                 defines = runs_flow.get("defines", [])
                 paramaters= " ".join(paramaters)
                 defines= " ".join(defines)
-                call_compile_tcl(f"{s}" ,f"{syth_name}" ,f"{impl_name_list[0]}" ,f"'{paramaters}'" ,f"'{defines}'" )
+                run_incremental = incremental and s in ("impl", "all")
+                incremental_dcp = ""
+                if run_incremental:
+                    reference_dcp = vivado_prj_mng.get_incremental_reference(
+                        WORKING_PATH / VIVADO_SETTING_DICT.get("incremental_dir", "vivado_incremental"), run_flow, TOP_MODULE)
+                    if reference_dcp.exists():
+                        incremental_dcp = str(reference_dcp)
+                    else:
+                        print(f"[i] No reference checkpoint for run_flow {run_flow} yet: full implementation, it becomes the reference")
+                call_compile_tcl(f"{s}" ,f"{syth_name}" ,f"{impl_name_list[0]}" ,paramaters ,defines ,incremental_dcp=incremental_dcp )
+                record_qor([syth_name, impl_name_list[0]], run_flow)
+                if run_incremental:
+                    impl_run_dir = VIVADO_BUILD_DIR / f"{PROJECT_NAME}.runs" / impl_name_list[0]
+                    if incremental_dcp:
+                        import vivado_reports
+                        reuse = vivado_reports.parse_run(impl_run_dir)["reuse"]
+                        print(f"[i] Incremental reuse: {vivado_prj_mng.format_incremental_reuse(reuse)}")
+                    vivado_prj_mng.update_incremental_reference(impl_run_dir, reference_dcp)
           
+            case "sweep":
+                # synth x impl strategy matrix, launched concurrently under the CORES budget
+                sweep_settings = VIVADO_SETTING_DICT.get("sweep", {})
+                synth_list = [st.strip() for st in synth_strategies.split(",") if st.strip()] if synth_strategies else sweep_settings.get("synth_strategies")
+                impl_list  = [st.strip() for st in impl_strategies.split(",") if st.strip()] if impl_strategies else sweep_settings.get("impl_strategies")
+                sweep_flow = VIVADO_SETTING_DICT["runs_flow"][run_flow] if run_flow is not None else {}
+                tcl_lines, sweep_runs = vivado_prj_mng.get_vivado_flows(
+                    synth_list, impl_list,
+                    synth_flow=sweep_settings.get("synth_flow", vivado_prj_mng.SYNTH_FLOW),
+                    impl_flow=sweep_settings.get("impl_flow", vivado_prj_mng.IMPL_FLOW),
+                    verbose=verbose)
+                n_impl = sum(len(run["impl"]) for run in sweep_runs)
+                jobs, threads = vivado_prj_mng.split_core_budget(CORES, sweep_settings.get("threads_per_run", 2), n_impl)
+                sweep_runs_tcl = VIVADO_BUILD_DIR / "sweep_runs.tcl"
+                results_csv    = VIVADO_BUILD_DIR / "sweep_results.csv"
+                vivado_prj_mng.write_sweep_runs_tcl(sweep_runs_tcl, sweep_runs, tcl_lines, threads,
+                                                    paramaters=sweep_flow.get("paramaters", []),
+                                                    defines=sweep_flow.get("defines", []))
+                print(f"[i] Sweeping {len(sweep_runs)} synth x {n_impl} impl runs: {jobs} jobs x {threads} threads ({CORES} cores)",flush=True)
+                with step_trace.span("vivado sweep", cat="tool", runs=n_impl, jobs=jobs, threads=threads):
+                    run_vivado_script(SCRIPT_DIR / "sweep.tcl", [f"{PROJECT_NAME}.xpr", sweep_runs_tcl, jobs, threads, results_csv])
+                vivado_prj_mng.print_sweep_table(vivado_prj_mng.read_sweep_results(results_csv))
+                record_qor([run["synth"] for run in sweep_runs] + [name for run in sweep_runs for name, _ in run["impl"]], "sweep")
+            case "batch":
+                # non-project flow: no .xpr, one in-memory design per vivado process, a checkpoint per stage
+                nonproject_settings = VIVADO_SETTING_DICT.get("nonproject", {})
+                stages = nonproject_settings.get("stages", NONPROJECT_STAGES)
+                unknown = [st for st in stages + [from_stage or stages[0], to_stage or stages[-1]] if st not in NONPROJECT_STAGES]
+                if unknown or stages[0] != "synth":
+                    print(f"[!x!] Invalid non-project stages {unknown or stages} (allowed: {', '.join(NONPROJECT_STAGES)}, first must be synth)")
+                    exit(1)
+                first_stage = from_stage or stages[0]
+                last_stage = to_stage or stages[-1]
+                if first_stage not in stages or last_stage not in stages or stages.index(last_stage) < stages.index(first_stage):
+                    print(f"[!x!] Invalid stage range {first_stage}..{last_stage} for stages {stages}")
+                    exit(1)
+                if first_stage != stages[0]:
+                    resume_dcp = NONPROJECT_DIR / f"{TOP_MODULE}_{stages[stages.index(first_stage) - 1]}.dcp"
+                    if not resume_dcp.exists():
+                        print(f"[!x!] Cannot resume at {first_stage}: {resume_dcp} not found")
+                        exit(1)
+                else:
+                    PROJECT.verify_sources(TOOL_NAME)
+                generics = list(VIVADO_SETTING_DICT.get("generics", []))
+                defines = list(VIVADO_SETTING_DICT.get("defines", []))
+                if run_flow is not None:
+                    generics += VIVADO_SETTING_DICT["runs_flow"][run_flow].get("paramaters", [])
+                    defines += VIVADO_SETTING_DICT["runs_flow"][run_flow].get("defines", [])
+                nonproject_tcl = NONPROJECT_DIR / f"{PROJECT_NAME}_nonproject.tcl"
+                with step_trace.span("tcl generation", files=len(SOURCES_DICT_LIST)):
+                    generate_vivado_nonproject_tcl(
+                        output_path=nonproject_tcl,
+                        part=PART,
+                        top_module=TOP_MODULE,
+                        sources_dict_list=SOURCES_DICT_LIST,
+                        generics=generics,
+                        defines=defines,
+                        stages=stages,
+                        directives=nonproject_settings.get("directives", {}),
+                        threads=CORES,
+                        constrset=nonproject_settings.get("constrset", "constrs_1"))
+                print(f"[i] Running non-project flow {first_stage}..{last_stage} in {NONPROJECT_DIR}",flush=True)
+                with step_trace.span(f"vivado batch {first_stage}..{last_stage}", cat="tool"), c.cd(str(NONPROJECT_DIR)):
+                    c.run(f"vivado -mode batch -source {nonproject_tcl} -notrace -tclargs {first_stage} {last_stage}",pty=True,echo=True)
+            case "status":
+                # reads <project>.runs/ directly: no Vivado launch, works while compile.tcl is in wait_on_run
+                import vivado_runs
+                vivado_runs.monitor(VIVADO_BUILD_DIR / f"{PROJECT_NAME}.runs", get_flow_run_names(), watch=watch)
+            case "report":
+                # parses the .rpt files of <project>.runs/ in Python: no Vivado launch
+                import vivado_reports
+                with step_trace.span("report parse"):
+                    results = vivado_reports.parse_runs(VIVADO_BUILD_DIR / f"{PROJECT_NAME}.runs", get_flow_run_names())
+                    if any(NONPROJECT_DIR.glob("*.rpt")):
+                        results.append(vivado_reports.parse_run(NONPROJECT_DIR))
+                if not results:
+                    print(f"[!] No run reports found under {VIVADO_BUILD_DIR / f'{PROJECT_NAME}.runs'}")
+                    continue
+                vivado_reports.print_reports_table(results)
+            case "qor":
+                # thresholds: [vivado_settings.qor] time_pct, time_min_s, wns_ns, util_pct
+                import qor_db
+                qor_db.print_trend(PROJECT_NAME, thresholds=VIVADO_SETTING_DICT.get("qor", {}))
+            case "server_start":
+                if vivado_client.VivadoClient.from_state_file(SERVER_STATE_FILE) is not None:
+                    print(f"[i] vivado server already running for project: {PROJECT_NAME}")
+                    continue
+                print(f"[i] Starting vivado server for project: {PROJECT_NAME} (opening the project once)",flush=True)
+                VIVADO_BUILD_DIR.mkdir(parents=True, exist_ok=True)
+                port, pid, *_ = vivado_client.start_server(
+                    ["vivado", "-mode", "batch", "-source", str(SCRIPT_DIR / "vivado_server.tcl"), "-notrace",
+                     "-tclargs", f"{PROJECT_NAME}.xpr", str(SERVER_STATE_FILE)],
+                    state_file=SERVER_STATE_FILE,
+                    log_file=VIVADO_BUILD_DIR / "vivado_server.log",
+                    cwd=VIVADO_BUILD_DIR)
+                print(f"[+] vivado server listening on 127.0.0.1:{port} (pid {pid})")
+            case "server_stop":
+                stop_vivado_server()
+            case "server_status":
+                state = vivado_client.read_state(SERVER_STATE_FILE)
+                client = vivado_client.VivadoClient.from_state_file(SERVER_STATE_FILE)
+                if client is None:
+                    print(f"[i] No vivado server running for project: {PROJECT_NAME}")
+                else:
+                    client.close()
+                    print(f"[i] vivado server running on 127.0.0.1:{state[0]} (pid {state[1]}) project: {state[2]}")
             case "bit":
                 pass
             case "all":
@@ -361,7 +654,8 @@ def verify_sim_target(SimTargetName, verilator_settings)    :
     return SimTargetName
 
 @task
-def Verilator(c,project=None,step=None,clean=False,SimTargetName=None,flags=None):
+def Verilator(c,project=None,step=None,clean=False,SimTargetName=None,flags=None,rebuild=False,all_targets=False,targets=None,jobs=None):
+    step_trace.start_invocation("hdlforge " + " ".join(sys.argv[1:]))
     tool_name = "verilator"
 
     ALLOWED_STEPS = {"step":["sim", "build"]}
@@ -380,16 +674,59 @@ def Verilator(c,project=None,step=None,clean=False,SimTargetName=None,flags=None
     
     project_file_path = get_project_file_path(project)
     del project
-    working_path,project_data = load_project_data(project_file_path)
+    with step_trace.span("project load", project=project_file_path.name):
+        project_model_obj = project_model.load_project(project_file_path)
+    working_path,project_data = project_model_obj.working_path, project_model_obj.data
     
     print_task_args(locals(),str(REPO_TOP),ALLOWED_STEPS)
       
     
     verilator_settings  = project_data["verilator_settings"]
     build_dir           = Path(working_path ) / verilator_settings["build_dir"]
-    SOURCES_DICT_LIST = get_file_list_for_tool(tool_name, project_data)
+    with step_trace.span("source resolve", tool=tool_name):
+        SOURCES_DICT_LIST = project_model_obj.files_for_tool(tool_name)
+        project_model_obj.verify_sources(tool_name)
       
     
+    includes_paths_list=[]
+    for _ in verilator_settings["includes_paths"]:
+        includes_paths_list.append(Path(os.path.expandvars(str(_))).resolve())
+    veruilator_sources_file = []
+    for file_dict in SOURCES_DICT_LIST:
+        veruilator_sources_file.append(Path(file_dict["resolved"]))
+
+    if all_targets or targets:
+        # build and simulate many sim targets concurrently, each in its own build dir
+        if targets:
+            target_names = [t.strip() for t in targets.split(",") if t.strip()]
+            for name in target_names:
+                verify_sim_target(name, verilator_settings)
+        else:
+            target_names = list(verilator_settings["sim_targets"].keys())
+        sim_jobs = []
+        for name in target_names:
+            target = verilator_settings["sim_targets"][name]
+            sim_jobs.append({
+                "name":          name,
+                "top_module":    target["top_module"],
+                "sources":       [str(p) for p in veruilator_sources_file],
+                "includes":      [str(p) for p in includes_paths_list],
+                "build_dir":     str(build_dir / name),
+                "build_args":    target.get("build_args", []),
+                "defines":       {},
+                "parameters":    {},
+                "python_module": (Path(working_path) / target["python_file"]).stem,
+                "python_paths":  target.get("PYTHONPATH", []),
+                "sim":           "sim" in step,
+                "clean":         clean,
+                "rebuild":       rebuild,
+            })
+        with step_trace.span("verilator parallel", targets=len(sim_jobs)):
+            results = verilator_runner.run_sim_targets_parallel(sim_jobs, int(jobs) if jobs else None)
+        if any(r["status"] != "PASS" for r in results):
+            exit(1)
+        return
+
     # Verify the parameters
     SimTargetName=verify_sim_target(SimTargetName, verilator_settings)    
    
@@ -415,52 +752,35 @@ def Verilator(c,project=None,step=None,clean=False,SimTargetName=None,flags=None
                 try:
                     print(f"[i] Verilator step: {s}",flush=True)
                     print(f"[i] Compiling Verilator sources into: {build_dir}",flush=True)
-                    veruilator_sources_file = []
-                    for file_dict in SOURCES_DICT_LIST:
-                        veruilator_sources_file.append(Path(os.path.expandvars(str(file_dict["file"]))).resolve())
                     sys.stdout.flush()
                     print(f"\n================start of verilator output : build================",flush=True)
-                    # Suppress the specific message before importing cocotb.runner
-                    warnings.filterwarnings(
-                        "ignore",
-                        message="Python runners and associated APIs are an experimental feature and subject to change.",
-                        category=UserWarning,
-                    )                
-                    from cocotb.runner import get_runner
-
-                    runner = get_runner("verilator")
+                    runner = verilator_runner.get_verilator_runner()
                     defines={}
                     parameters={}
-                    log_file = None
-                    includes_paths_list=[]
-                    for _ in verilator_settings["includes_paths"]:
-                        includes_paths_list.append(Path(os.path.expandvars(str(_))).resolve())
-                    runner.build(
-                            verilog_sources=veruilator_sources_file,
-                            hdl_toplevel=f"{top_module}",
-                            waves=True   ,
-                            always=True, 
-                            verbose=False, 
-                            build_dir=f"{build_dir}",   
-                            defines=defines,  
-                            includes=includes_paths_list,
-                            parameters=parameters,
-                            log_file=log_file,  # Use default logging
-                            build_args=build_args,
-                            clean=clean   # force rebuild
-                        )
+                    with step_trace.span("verilator build", target=SimTargetName):
+                        verilator_runner.build_model(runner,
+                                                     sources=veruilator_sources_file,
+                                                     top_module=top_module,
+                                                     includes=includes_paths_list,
+                                                     build_dir=build_dir,
+                                                     build_args=build_args,
+                                                     defines=defines,
+                                                     parameters=parameters,
+                                                     clean=clean,
+                                                     rebuild=rebuild)
                     print(f"================end of verilator output : build================\n",flush=True)
                     print(f"[+] Verilator build completed",flush=True)
                     print(f"[i] Verilator simulation started:",flush=True)
                     
                     if(s=="sim"):  
                         print(f"\n================start of verilator output : sim================",flush=True)  
-                        runner.test(
-                            hdl_toplevel=f"{top_module}",
-                            test_module=f"{python_file_path.stem}",  
-                            build_dir=f"{build_dir}",   
-                            waves=True                  # enables dump.vcd
-                        )
+                        with step_trace.span("verilator sim", target=SimTargetName):
+                            runner.test(
+                                hdl_toplevel=f"{top_module}",
+                                test_module=f"{python_file_path.stem}",  
+                                build_dir=f"{build_dir}",   
+                                waves=True                  # enables dump.vcd
+                            )
                         print(f"================end of verilator output : sim================\n",flush=True)
                         print(f"[i] Verilator simulation completed",flush=True)
                     else:
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+verilator_runner.py
+
+Verilator build/sim helpers used by the hdlforge `Verilator` task:
+1. build_model()              - cocotb runner.build guarded by the build_cache key,
+2. run_sim_target_job()       - build + test of one sim target, output to log files,
+3. run_sim_targets_parallel() - run many sim targets on a process pool and print a summary.
+"""
+
+import os
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import Any
+
+import build_cache
+import step_trace
+
+
+def get_verilator_runner():
+    # Suppress the specific message before importing cocotb.runner
+    warnings.filterwarnings(
+        "ignore",
+        message="Python runners and associated APIs are an experimental feature and subject to change.",
+        category=UserWarning,
+    )
+    from cocotb.runner import get_runner
+    return get_runner("verilator")
+
+
+def get_extra_inputs(includes: list[Path], build_args: list[str]) -> list[Path]:
+    """
+    Files the build may read besides `sources`: everything in the include dirs and in the
+    -f/-F/-v files, +incdir+/-I/-y dirs of `build_args` (include dirs are not searched recursively).
+    """
+    dirs = [Path(p) for p in includes]
+    files = []
+    args = list(build_args)
+    for i, arg in enumerate(args):
+        if arg in ("-f", "-F", "-v") and i + 1 < len(args):
+            files.append(Path(args[i + 1]))
+        elif arg == "-y" and i + 1 < len(args):
+            dirs.append(Path(args[i + 1]))
+        elif arg.startswith("+incdir+"):
+            dirs += [Path(d) for d in arg[len("+incdir+"):].split("+") if d]
+        elif arg.startswith("-I") and len(arg) > 2:
+            dirs.append(Path(arg[2:]))
+    for d in dirs:
+        if d.is_dir():
+            files += sorted(p for p in d.iterdir() if p.is_file())
+    return files
+
+
+def build_model(runner,
+                sources: list[Path],
+                top_module: str,
+                includes: list[Path],
+                build_dir: Path,
+                build_args: list[str],
+                defines: dict,
+                parameters: dict,
+                clean: bool = False,
+                rebuild: bool = False,
+                log_file: Path | None = None) -> bool:
+    """
+    Build the verilator model unless the build key stored in `build_dir` matches.
+    Returns True when a build was run, False when the existing model was reused.
+    """
+    build_dir = Path(build_dir)
+    # build key: sources + include dir / -f file contents + everything passed to verilator
+    build_key = build_cache.compute_build_key([*sources, *get_extra_inputs(includes, build_args)], {
+        "top_module": top_module,
+        "includes": [str(p) for p in includes],
+        "build_args": build_args,
+        "defines": defines,
+        "parameters": parameters,
+        "waves": True,
+        "verilator": build_cache.get_tool_version(["verilator", "--version"]),
+    })
+    if clean or rebuild:
+        build_cache.clear_build_key(build_dir)
+    # the inputs recorded from verilator's .d file also catch files found in ways the key cannot see
+    if (build_cache.is_up_to_date(build_dir, build_key, [build_dir / top_module])
+            and build_cache.inputs_unchanged(build_dir)):
+        print(f"[i] Verilator model is up to date (key {build_key[:12]}), skipping build", flush=True)
+        return False
+
+    runner.build(
+            verilog_sources=sources,
+            hdl_toplevel=f"{top_module}",
+            waves=True   ,
+            always=True,
+            verbose=False,
+            build_dir=f"{build_dir}",
+            defines=defines,
+            includes=includes,
+            parameters=parameters,
+            log_file=log_file,  # None: use default logging
+            build_args=build_args,
+            clean=clean   # force rebuild
+        )
+    depfile = build_dir / f"V{top_module}__ver.d"
+    inputs = [p for p in build_cache.parse_make_depfile(depfile)
+              if not p.resolve().is_relative_to(build_dir.resolve())]  # generated files change on every build
+    build_cache.write_input_hashes(build_dir, inputs or sources)
+    build_cache.write_build_key(build_dir, build_key)
+    return True
+
+
+def run_sim_target_job(job: dict[str, Any]) -> dict[str, Any]:
+    """
+    Process-pool worker: build (and optionally simulate) one sim target.
+    All tool output goes to <build_dir>/build.log and <build_dir>/sim.log.
+
+    `job` keys: name, top_module, sources, includes, build_dir, build_args,
+                defines, parameters, python_module, python_paths, sim, clean, rebuild
+    """
+    name      = job["name"]
+    build_dir = Path(job["build_dir"])
+    build_dir.mkdir(parents=True, exist_ok=True)
+    build_log = build_dir / "build.log"
+    sim_log   = build_dir / "sim.log"
+    result = {"name": name, "build_dir": str(build_dir), "status": "FAIL", "built": False,
+              "tests": 0, "failed": 0, "error": "", "logs": [], "elapsed": 0.0}
+
+    start = time.monotonic()
+    saved_sys_path = list(sys.path)
+    try:
+        for path in job.get("python_paths", []):
+            abs_path = os.path.abspath(os.path.expandvars(path))
+            if abs_path not in sys.path:
+                sys.path.insert(0, abs_path)
+
+        runner = get_verilator_runner()
+        result["logs"].append(str(build_log))
+        with step_trace.span("verilator build", target=name) as span_args:
+            result["built"] = build_model(runner,
+                                          sources=[Path(p) for p in job["sources"]],
+                                          top_module=job["top_module"],
+                                          includes=[Path(p) for p in job["includes"]],
+                                          build_dir=build_dir,
+                                          build_args=job["build_args"],
+                                          defines=job["defines"],
+                                          parameters=job["parameters"],
+                                          clean=job["clean"],
+                                          rebuild=job["rebuild"],
+                                          log_file=build_log)
+            span_args["built"] = result["built"]
+        if job["sim"]:
+            from cocotb.runner import get_results
+            result["logs"].append(str(sim_log))
+            with step_trace.span("verilator sim", target=name):
+                results_xml = runner.test(
+                    hdl_toplevel=job["top_module"],
+                    test_module=job["python_module"],
+                    build_dir=str(build_dir),
+                    waves=True,
+                    log_file=sim_log,
+                )
+            result["tests"], result["failed"] = get_results(results_xml)
+            result["status"] = "PASS" if result["failed"] == 0 else "FAIL"
+        else:
+            result["status"] = "PASS"
+    except (Exception, SystemExit) as e:  # cocotb runner exits with SystemExit on tool errors
+        result["error"] = str(e)
+    finally:
+        sys.path[:] = saved_sys_path
+        result["elapsed"] = time.monotonic() - start
+    return result
+
+
+def print_prefixed_logs(result: dict[str, Any]) -> None:
+    prefix = f"[{result['name']}] "
+    for log in result["logs"]:
+        log_path = Path(log)
+        if not log_path.exists():
+            continue
+        with open(log_path, "r", errors="replace") as f:
+            for line in f:
+                print(prefix + line.rstrip("\n"))
+    if result["error"]:
+        print(f"{prefix}[!x!] {result['error']}")
+
+
+def run_sim_targets_parallel(jobs: list[dict[str, Any]], max_workers: int | None = None) -> list[dict[str, Any]]:
+    """Run every job on a process pool sized to the available cores and print a combined summary."""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from tabulate import tabulate
+
+    if max_workers is None:
+        max_workers = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    max_workers = max(1, min(max_workers, len(jobs)))
+    print(f"[i] Running {len(jobs)} sim targets on {max_workers} workers", flush=True)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run_sim_target_job, job): job["name"] for job in jobs}
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"\n================start of verilator output : {result['name']}================", flush=True)
+            print_prefixed_logs(result)
+            print(f"================end of verilator output : {result['name']}================", flush=True)
+            print(f"[{'+' if result['status'] == 'PASS' else '!x!'}] {result['name']}: {result['status']} ({result['elapsed']:.1f}s)", flush=True)
+            results.append(result)
+
+    results.sort(key=lambda r: r["name"])
+    table = [["Target", "Status", "Built", "Tests", "Failed", "Time [s]", "Build dir"]]
+    for r in results:
+        table.append([r["name"], r["status"], "yes" if r["built"] else "cached", r["tests"], r["failed"],
+                      f"{r['elapsed']:.1f}", r["build_dir"]])
+    print("")
+    print(tabulate(table, headers="firstrow", tablefmt="grid"))
+    n_fail = sum(1 for r in results if r["status"] != "PASS")
+    print(f"[i] {len(results) - n_fail}/{len(results)} sim targets passed", flush=True)
+    return results
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+vivado_client.py
+
+Client for vivado_server.tcl, the long-lived per-project Vivado TCL session.
+
+Usage:
+    ./vivado_client.py <state_file> eval  "<tcl script>"
+    ./vivado_client.py <state_file> source <script.tcl> [args ...]
+    ./vivado_client.py <state_file> stop
+
+The state file (written by the server, mode 0600) holds "<port> <pid> <token> <project>";
+the token is sent as the first frame of every connection.
+The same protocol works against `tclsh vivado_server.tcl - <state_file>`.
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+STATE_FILE_NAME = ".hdlforge_vivado_server"
+
+
+class VivadoServerError(RuntimeError):
+    """The script sent to the server raised a TCL error."""
+
+
+def tcl_quote(value: str) -> str:
+    """Quote a value as a single TCL word."""
+    value = str(value)
+    if value and not any(ch in value for ch in "{}\\"):
+        return "{" + value + "}"
+    return '"' + "".join("\\" + ch if ch in '\\"[]${}' else ch for ch in value) + '"'
+
+
+def read_state(state_file: Path) -> tuple[int, int, str, str] | None:
+    """(port, pid, project, token) from the server state file, or None."""
+    state_file = Path(state_file)
+    if not state_file.exists():
+        return None
+    fields = state_file.read_text().split(maxsplit=3)
+    if len(fields) < 3:
+        return None
+    return int(fields[0]), int(fields[1]), fields[3].strip() if len(fields) > 3 else "", fields[2]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class VivadoClient:
+    def __init__(self, port: int, token: str, host: str = "127.0.0.1", timeout: float | None = None):
+        self.sock = socket.create_connection((host, port), timeout=5)
+        self.rfile = self.sock.makefile("rb")
+        try:
+            self._send("A", token)
+            self._read_frame()  # the server closes the connection on a wrong token
+        except OSError:
+            self.close()
+            raise
+        self.sock.settimeout(timeout)
+
+    @classmethod
+    def from_state_file(cls, state_file: Path, timeout: float | None = None) -> "VivadoClient | None":
+        """Connect to the server recorded in `state_file`, or return None when it is not running."""
+        state = read_state(state_file)
+        if state is None or not _pid_alive(state[1]):
+            return None
+        try:
+            return cls(state[0], state[3], timeout=timeout)
+        except OSError:
+            return None
+
+    def close(self) -> None:
+        self.rfile.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _send(self, kind: str, payload: str = "") -> None:
+        data = payload.encode("utf-8")
+        self.sock.sendall(f"{kind} {len(data)}\n".encode() + data)
+
+    def _read_frame(self) -> tuple[str, str]:
+        header = self.rfile.readline()
+        if not header:
+            raise ConnectionError("vivado server closed the connection")
+        kind, nbytes = header.decode().split()
+        payload = self.rfile.read(int(nbytes)) if int(nbytes) else b""
+        return kind, payload.decode("utf-8", errors="replace")
+
+    def eval(self, script: str, on_output: Callable[[str], None] | None = None) -> str:
+        """
+        Evaluate `script` at global level in the server and return its result.
+        Output written with puts is passed to `on_output` as it arrives (printed by default).
+        Raises VivadoServerError when the script fails.
+        """
+        if on_output is None:
+            on_output = lambda text: print(text, end="", flush=True)
+        self._send("S", script)
+        while True:
+            kind, payload = self._read_frame()
+            if kind == "O":
+                on_output(payload)
+            elif kind == "R":
+                return payload
+            elif kind == "E":
+                raise VivadoServerError(payload)
+            else:
+                raise ConnectionError(f"unexpected frame from vivado server: {kind}")
+
+    def source(self, script: Path, args: list[str] = [], on_output: Callable[[str], None] | None = None) -> str:
+        """Run a batch script (compile.tcl, project_tool.tcl ...) against the already open project."""
+        words = " ".join(tcl_quote(a) for a in [str(script), *args])
+        return self.eval(f"hdlforge_source {words}", on_output)
+
+    def stop(self) -> None:
+        self._send("Q")
+        self._read_frame()
+
+
+def start_server(cmd: list[str], state_file: Path, log_file: Path, cwd: Path, timeout: float = 600.0) -> tuple[int, int, str, str]:
+    """
+    Launch the server in the background (`cmd` is the vivado/tclsh command line) and wait
+    until it has opened the project and written its state file.
+    """
+    state_file = Path(state_file)
+    if state_file.exists():
+        state_file.unlink()
+    with open(log_file, "ab") as log:
+        process = subprocess.Popen(cmd, cwd=cwd, stdout=log, stderr=subprocess.STDOUT,
+                                   stdin=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = read_state(state_file)
+        if state is not None:
+            return state
+        if process.poll() is not None:
+            raise RuntimeError(f"vivado server exited with code {process.returncode}, see {log_file}")
+        time.sleep(0.2)
+    process.terminate()
+    raise TimeoutError(f"vivado server did not start within {timeout:.0f}s, see {log_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send commands to a running hdlforge vivado server.")
+    parser.add_argument("state_file", help=f"Server state file (<build_dir>/{STATE_FILE_NAME})")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_eval = sub.add_parser("eval", help="Evaluate a TCL script")
+    p_eval.add_argument("script")
+    p_source = sub.add_parser("source", help="Source a batch TCL script with tclargs")
+    p_source.add_argument("script")
+    p_source.add_argument("args", nargs="*")
+    sub.add_parser("stop", help="Stop the server")
+    args = parser.parse_args()
+
+    client = VivadoClient.from_state_file(Path(args.state_file))
+    if client is None:
+        sys.exit(f"vivado server is not running ({args.state_file})")
+    with client:
+        try:
+            if args.cmd == "eval":
+                print(client.eval(args.script))
+            elif args.cmd == "source":
+                client.source(Path(args.script), args.args)
+            else:
+                client.stop()
+        except VivadoServerError as e:
+            sys.exit(f"Error: {e}")
@@ -4,57 +4,193 @@
 
 import tomllib
 
+import os
+import shutil
 import sys
 import argparse
+from pathlib import Path
+
+
+
+SYNTH_STRATEGIES = [
+    "Flow_PerfOptimized_high",
+    "Flow_RuntimeOptimized",
+    "Flow_AreaOptimized_high",
+    "Flow_AreaOptimized_medium",
+    "Flow_AlternateRoutability",
+    "Flow_PerfThresholdCarry",
+    "Flow_AreaMultThresholdDSP"
+]
+
+IMPL_STRATEGIES = [
+    # Performance
+    "Performance_Explore",
+    "Performance_ExplorePostRoutePhysOpt",
+    "Performance_ExtraTimingOpt",
+    "Performance_NetDelay_high",
+    "Performance_WLBlockPlacement",
+    "Performance_Retiming",
+    # Congestion
+    "Congestion_SpreadLogic_high",
+    "Congestion_SpreadLogic_medium",
+    "Congestion_SpreadLogic_low",
+    # Area
+    "Area_Explore",
+    "Area_ExploreSequential",
+    "Area_ExploreWithRemap",
+    # Power
+    "Power_DefaultOpt",
+    "Power_ExploreArea",
+    # Flow
+    "Flow_RunPhysOpt",
+    "Flow_RunPostRoutePhysOpt",
+    "Flow_RuntimeOptimized",
+    "Flow_Quick"
+]
+
+SYNTH_FLOW = "{Vivado Synthesis 2021}"
+IMPL_FLOW = "{Vivado Implementation 2021}"
+
+
+def get_vivado_flows(synth_strategies=None, impl_strategies=None, prefix="sweep",
+                     synth_flow=SYNTH_FLOW, impl_flow=IMPL_FLOW, verbose=True):
+    """
+    Build the synth x impl strategy matrix.
+    Returns (tcl_lines, runs) where runs is a list of
+    {"synth": name, "synth_strategy": s, "impl": [(impl_name, impl_strategy), ...]}.
+    Each create_run is guarded so re-running a sweep reuses existing runs.
+    """
+    if synth_strategies is None:
+        synth_strategies = SYNTH_STRATEGIES
+    if impl_strategies is None:
+        impl_strategies = IMPL_STRATEGIES
 
-
-
-def get_vivado_flows():
-    synth_strategies = [
-        "Flow_PerfOptimized_high",
-        "Flow_RuntimeOptimized",
-        "Flow_AreaOptimized_high",
-        "Flow_AreaOptimized_medium",
-        "Flow_AlternateRoutability",
-        "Flow_PerfThresholdCarry",
-        "Flow_AreaMultThresholdDSP"
-    ]
-
-    impl_strategies = [
-        # Performance
-        "Performance_Explore",
-        "Performance_ExplorePostRoutePhysOpt",
-        "Performance_ExtraTimingOpt",
-        "Performance_NetDelay_high",
-        "Performance_WLBlockPlacement",
-        "Performance_Retiming",
-        # Congestion
-        "Congestion_SpreadLogic_high",
-        "Congestion_SpreadLogic_medium",
-        "Congestion_SpreadLogic_low",
-        # Area
-        "Area_Explore",
-        "Area_ExploreSequential",
-        "Area_ExploreWithRemap",
-        # Power
-        "Power_DefaultOpt",
-        "Power_ExploreArea",
-        # Flow
-        "Flow_RunPhysOpt",
-        "Flow_RunPostRoutePhysOpt",
-        "Flow_RuntimeOptimized",
-        "Flow_Quick"
-    ]
-
-    synth_flow = "{Vivado Synthesis 2021}"
-    impl_flow = "{Vivado Implementation 2021}"
-
+    tcl_lines = []
+    runs = []
     for i, synth_strategy in enumerate(synth_strategies):
-        synth_name = f"synth_{i}"
-        print(f"create_run {synth_name} -flow {synth_flow} -strategy {synth_strategy}")
+        synth_name = f"{prefix}_{i}"
+        impl_runs = []
+        line = f"create_run {synth_name} -flow {synth_flow} -strategy {synth_strategy}"
+        tcl_lines.append(f"if {{[llength [get_runs -quiet {synth_name}]] == 0}} {{ {line} }}")
+        if verbose: print(line)
         for j, impl_strategy in enumerate(impl_strategies):
-            impl_name = f"impl_{i}_{j}"
-        print(f"create_run {impl_name} -parent_run {synth_name} -flow {impl_flow} -strategy {impl_strategy}")
+            impl_name = f"{prefix}_{i}_impl_{j}"
+            line = f"create_run {impl_name} -parent_run {synth_name} -flow {impl_flow} -strategy {impl_strategy}"
+            tcl_lines.append(f"if {{[llength [get_runs -quiet {impl_name}]] == 0}} {{ {line} }}")
+            if verbose: print(line)
+            impl_runs.append((impl_name, impl_strategy))
+        runs.append({"synth": synth_name, "synth_strategy": synth_strategy, "impl": impl_runs})
+    return tcl_lines, runs
+
+
+def write_sweep_runs_tcl(output_path, runs, tcl_lines, threads=None, paramaters=(), defines=()):
+    """
+    Write the file sourced by sweep.tcl: the guarded create_run lines, the per-run settings and
+    the run lists (sweep_synth_runs / sweep_impl_runs) to launch.
+    launch_runs starts every run in its own vivado process, so the thread limit is applied by
+    a TCL.PRE hook of the first step of each run, not by the parent session.
+    """
+    synth_names = " ".join(run["synth"] for run in runs)
+    impl_names = " ".join(name for run in runs for name, _ in run["impl"])
+    lines = ["# This script was auto-generated by hdlforge (vivado --step sweep).", ""]
+    lines.extend(tcl_lines)
+    lines.append("")
+    lines.append(f"set sweep_synth_runs [list {synth_names}]")
+    lines.append(f"set sweep_impl_runs  [list {impl_names}]")
+    lines.append("")
+    more_opts = " ".join([f"-generic {p}" for p in paramaters] + [f"-verilog_define {d}" for d in defines])
+    lines.append("foreach run $sweep_synth_runs {")
+    lines.append(f"    set_property -name {{STEPS.SYNTH_DESIGN.ARGS.MORE OPTIONS}} -value {{{more_opts}}} -objects [get_runs $run]")
+    lines.append("}")
+    if threads:
+        hook_path = Path(output_path).resolve().parent / "sweep_threads_pre.tcl"
+        with open(hook_path, "w") as f:
+            f.write(f"# generated by hdlforge (vivado --step sweep)\nset_param general.maxThreads {int(threads)}\n")
+        lines.append(f"set sweep_threads_hook {{{hook_path}}}")
+        lines.append("foreach run $sweep_synth_runs { set_property STEPS.SYNTH_DESIGN.TCL.PRE $sweep_threads_hook [get_runs $run] }")
+        lines.append("foreach run $sweep_impl_runs  { set_property STEPS.INIT_DESIGN.TCL.PRE $sweep_threads_hook [get_runs $run] }")
+    lines.append("")
+    with open(output_path, "w") as f:
+        f.write("\n".join(lines))
+
+
+# Vivado caps set_param general.maxThreads (1..32 on Linux)
+VIVADO_MAX_THREADS = 32
+
+
+def split_core_budget(total_cores, threads_per_run, n_runs):
+    """Return (parallel jobs, threads per run) so that jobs * threads <= total_cores."""
+    threads_per_run = max(1, min(int(threads_per_run), int(total_cores)))
+    jobs = max(1, int(total_cores) // threads_per_run)
+    return min(jobs, max(1, n_runs)), threads_per_run
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_sweep_results(results_csv):
+    """Read the csv written by sweep.tcl and return rows ranked by WNS, then TNS (best first)."""
+    import csv
+    with open(results_csv, newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        row["WNS"] = _to_float(row.get("WNS"))
+        row["TNS"] = _to_float(row.get("TNS"))
+    # runs without timing results go last
+    rows.sort(key=lambda r: (r["WNS"] is None, -(r["WNS"] or 0.0), -(r["TNS"] or 0.0)))
+    return rows
+
+
+def print_sweep_table(rows):
+    from tabulate import tabulate
+    table = [["Rank", "Impl run", "Synth strategy", "Impl strategy", "Status", "WNS", "TNS", "Synth time", "Impl time"]]
+    for rank, row in enumerate(rows, start=1):
+        table.append([rank, row["run"], row["synth_strategy"], row["impl_strategy"], row["status"],
+                      "" if row["WNS"] is None else row["WNS"],
+                      "" if row["TNS"] is None else row["TNS"],
+                      row["synth_elapsed"], row["impl_elapsed"]])
+    print(tabulate(table, headers="firstrow", tablefmt="grid"))
+
+
+def get_incremental_reference(incremental_dir, run_flow, top_module):
+    """Reference routed checkpoint of a run_flow; kept outside the build dir so `--step new` does not drop it."""
+    return Path(incremental_dir) / run_flow / f"{top_module}_routed.dcp"
+
+
+def update_incremental_reference(run_dir, reference_dcp):
+    """
+    Make the routed checkpoint of `run_dir` the reference of the next incremental implementation.
+    A run that missed timing only becomes the reference when there is none yet.
+    Returns True when the reference was replaced.
+    """
+    import vivado_reports
+    run_dir, reference_dcp = Path(run_dir), Path(reference_dcp)
+    routed = vivado_reports.find_report(run_dir, "*_routed.dcp")
+    if routed is None:
+        print(f"[!] No routed checkpoint in {run_dir}: reference not updated")
+        return False
+    if reference_dcp.exists() and routed.stat().st_mtime <= reference_dcp.stat().st_mtime:
+        return False
+    timing = vivado_reports.parse_run(run_dir)["timing"]
+    if reference_dcp.exists() and timing and timing["met"] is False:
+        print(f"[!] {run_dir.name} missed timing (WNS {timing['wns']}): keeping reference {reference_dcp}")
+        return False
+    reference_dcp.parent.mkdir(parents=True, exist_ok=True)
+    tmp = reference_dcp.with_suffix(".dcp.tmp")
+    shutil.copy2(routed, tmp)
+    os.replace(tmp, reference_dcp)
+    print(f"[+] Incremental reference checkpoint: {routed.name} -> {reference_dcp}")
+    return True
+
+
+def format_incremental_reuse(reuse):
+    if not reuse:
+        return "no incremental reuse report"
+    return ", ".join(f"{key} {value}%" for key, value in reuse.items() if value is not None)
 
 
 class TclBlock:
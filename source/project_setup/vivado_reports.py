@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+vivado_reports.py
+
+Pure-Python parser for the reports Vivado writes into every run directory,
+so timing/utilization checks do not need a Vivado launch (check_timing.tcl opens
+the whole project only to read STATS.WNS/TNS):
+1. *_timing_summary_*.rpt  - WNS/TNS/WHS/THS/WPWS and failing endpoints, failing clocks,
+2. *_utilization_*.rpt     - LUT/FF/BRAM/URAM/DSP/IO used, available and util%,
+3. *_drc_*.rpt / *_methodology_drc_*.rpt - violations by severity,
+4. *_power_*.rpt           - total/dynamic/static power and junction temperature,
+5. *_incremental_reuse_*.rpt - cells/nets/pins/ports reused from the incremental checkpoint.
+When a run has several reports of a kind (placed/routed/postroute_physopted) the newest is used.
+
+Usage:
+    ./vivado_reports.py <project>.runs [--run impl_main_0 ...] [--json]
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+UNDERLINE_RE = re.compile(r"-+")
+TEXT_COLUMNS = {"Clock", "From Clock", "To Clock", "Path Group", "Path Type"}
+
+UTIL_SITES = {
+    "LUT":  ["Slice LUTs", "CLB LUTs"],
+    "FF":   ["Slice Registers", "CLB Registers"],
+    "BRAM": ["Block RAM Tile"],
+    "URAM": ["URAM"],
+    "DSP":  ["DSPs"],
+    "IO":   ["Bonded IOB"],
+}
+POWER_KEYS = {
+    "Total On-Chip Power (W)":  "total",
+    "Dynamic (W)":              "dynamic",
+    "Device Static (W)":        "static",
+    "Junction Temperature (C)": "junction_temp",
+}
+TIMING_KEYS = {
+    "WNS(ns)": "wns", "TNS(ns)": "tns", "TNS Failing Endpoints": "tns_failing",
+    "WHS(ns)": "whs", "THS(ns)": "ths", "THS Failing Endpoints": "ths_failing",
+    "WPWS(ns)": "wpws", "TPWS(ns)": "tpws", "TPWS Failing Endpoints": "tpws_failing",
+}
+
+
+def to_number(value: str):
+    value = value.strip().rstrip("*")
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+
+def find_report(run_dir: Path, pattern: str, exclude: str | None = None) -> Path | None:
+    """Newest report in `run_dir` matching `pattern` (and not `exclude`)."""
+    reports = [p for p in run_dir.glob(pattern) if exclude is None or not p.match(exclude)]
+    return max(reports, key=lambda p: p.stat().st_mtime) if reports else None
+
+
+def parse_aligned_table(lines: list[str], header_index: int) -> list[dict]:
+    """
+    Rows of a space-aligned report table whose header is lines[header_index] and whose
+    underline (-------) follows it. Numeric columns are right-aligned to the end of their
+    underline, text columns start at it; blank cells are None.
+    """
+    header, underline = lines[header_index], lines[header_index + 1]
+    segments = [(m.start(), m.end()) for m in UNDERLINE_RE.finditer(underline)]
+    names = [header[start:end].strip() for start, end in segments]
+    rows = []
+    for line in lines[header_index + 2:]:
+        if not line.strip() or line.startswith("---"):
+            break
+        row = {}
+        for i, (start, end) in enumerate(segments):
+            if names[i] in TEXT_COLUMNS:
+                text = line[start:segments[i + 1][0] if i + 1 < len(segments) else len(line)].split()
+                row[names[i]] = text[0] if text else None
+            else:
+                # last token only: a long clock name can run past its own underline
+                text = line[(segments[i - 1][1] if i else 0):end].split()
+                row[names[i]] = to_number(text[-1]) if text else None
+        rows.append(row)
+    return rows
+
+
+def parse_timing_summary(report: Path) -> dict:
+    """Design totals, per-clock setup/hold/pulse-width slack and the failing clock domains."""
+    lines = []
+    with open(report, "r", errors="replace") as f:
+        for line in f:
+            if line.startswith("| Timing Details"):
+                break  # the path details that follow can be huge and are not needed
+            lines.append(line.rstrip("\n"))
+    result = {key: None for key in TIMING_KEYS.values()}
+    result["failing_clocks"] = []
+    result["clocks"] = {}
+    section = ""
+    for i, line in enumerate(lines[:-1]):
+        if line.startswith("| ") and not line.startswith("| -"):
+            section = line[2:].strip()
+            continue
+        if not UNDERLINE_RE.fullmatch(lines[i + 1].replace(" ", "")) or "WNS(ns)" not in line:
+            continue
+        rows = parse_aligned_table(lines, i)
+        if section == "Design Timing Summary" and rows:
+            result.update({TIMING_KEYS[k]: v for k, v in rows[0].items() if k in TIMING_KEYS})
+        elif section == "Intra Clock Table":
+            for row in rows:
+                result["clocks"][row["Clock"]] = {TIMING_KEYS[k]: v for k, v in row.items() if k in TIMING_KEYS}
+                if any((row.get(k) or 0) < 0 for k in ("WNS(ns)", "WHS(ns)", "WPWS(ns)")):
+                    result["failing_clocks"].append(row["Clock"])
+        elif section == "Inter Clock Table":
+            for row in rows:
+                if any((row.get(k) or 0) < 0 for k in ("WNS(ns)", "WHS(ns)")):
+                    result["failing_clocks"].append(f"{row['From Clock']} -> {row['To Clock']}")
+    result["met"] = None if result["wns"] is None else all(
+        (result[k] or 0) >= 0 for k in ("wns", "tns", "whs", "ths", "wpws", "tpws"))
+    return result
+
+
+def iter_grid_rows(report: Path):
+    """Cells of every `| a | b |` row of the +---+ tables in a report."""
+    with open(report, "r", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("|") and line.endswith("|"):
+                yield [cell.strip() for cell in line[1:-1].split("|")]
+
+
+def parse_utilization(report: Path) -> dict:
+    """{"LUT": {"used", "available", "util"}, "FF": ..., ...} for the sites in UTIL_SITES."""
+    site_of = {name: site for site, names in UTIL_SITES.items() for name in names}
+    result = {}
+    columns = None
+    for cells in iter_grid_rows(report):
+        if "Used" in cells and "Available" in cells:
+            columns = {name: i for i, name in enumerate(cells)}
+            continue
+        site = site_of.get(cells[0].rstrip("*").strip())
+        if columns is None or site is None or site in result or len(cells) != len(columns):
+            continue
+        result[site] = {"used": to_number(cells[columns["Used"]]),
+                        "available": to_number(cells[columns["Available"]]),
+                        "util": to_number(cells[columns.get("Util%", columns.get("Util", -1))])}
+    return result
+
+
+def parse_drc(report: Path) -> dict:
+    """{"violations": total, "by_severity": {severity: count}, "rules": {rule: count}}."""
+    result = {"violations": 0, "by_severity": {}, "rules": {}}
+    columns = None
+    for cells in iter_grid_rows(report):
+        if "Rule" in cells and "Severity" in cells:
+            columns = {name: i for i, name in enumerate(cells)}
+            continue
+        if columns is None or len(cells) != len(columns):
+            continue
+        count = to_number(cells[columns["Violations"]]) or 0
+        severity = cells[columns["Severity"]]
+        result["rules"][cells[columns["Rule"]]] = count
+        result["by_severity"][severity] = result["by_severity"].get(severity, 0) + count
+        result["violations"] += count
+    return result
+
+
+def parse_power(report: Path) -> dict:
+    result = {}
+    for cells in iter_grid_rows(report):
+        if len(cells) == 2 and cells[0] in POWER_KEYS and POWER_KEYS[cells[0]] not in result:
+            result[POWER_KEYS[cells[0]]] = to_number(cells[1])
+    return result
+
+
+def parse_incremental_reuse(report: Path) -> dict:
+    """{"cells": reuse %, "nets": ..., "pins": ..., "ports": ...} from the Reuse Summary table."""
+    result = {}
+    reuse_column = None
+    for cells in iter_grid_rows(report):
+        if any(cell.startswith("Reuse %") for cell in cells):
+            reuse_column = next(i for i, cell in enumerate(cells) if cell.startswith("Reuse %"))
+            continue
+        if reuse_column is not None and cells[0] in ("Cells", "Nets", "Pins", "Ports") and cells[0].lower() not in result:
+            result[cells[0].lower()] = to_number(cells[reuse_column])
+    return result
+
+
+def parse_run(run_dir: Path) -> dict:
+    """Everything the reports of one run directory say; missing reports give None."""
+    run_dir = Path(run_dir)
+    reports = {
+        "timing":      (find_report(run_dir, "*_timing_summary_*.rpt"), parse_timing_summary),
+        "utilization": (find_report(run_dir, "*_utilization_*.rpt", exclude="*_hierarchical_*"), parse_utilization),
+        "drc":         (find_report(run_dir, "*_drc_*.rpt", exclude="*_methodology_drc_*"), parse_drc),
+        "methodology": (find_report(run_dir, "*_methodology_drc_*.rpt"), parse_drc),
+        "power":       (find_report(run_dir, "*_power_*.rpt", exclude="*_power_summary*"), parse_power),
+        "reuse":       (find_report(run_dir, "*_incremental_reuse_*.rpt"), parse_incremental_reuse),
+    }
+    result = {"run": run_dir.name}
+    for key, (report, parse) in reports.items():
+        result[key] = parse(report) if report else None
+        if report:
+            result[f"{key}_report"] = str(report)
+    return result
+
+
+def parse_runs(runs_dir: Path, names: list[str] | None = None) -> list[dict]:
+    runs_dir = Path(runs_dir)
+    if not runs_dir.is_dir():
+        return []
+    return [parse_run(run_dir) for run_dir in sorted(runs_dir.iterdir())
+            if run_dir.is_dir() and (names is None or run_dir.name in names) and any(run_dir.glob("*.rpt"))]
+
+
+def format_util(util: dict | None, site: str) -> str:
+    if not util or site not in util:
+        return ""
+    return f"{util[site]['used']} ({util[site]['util']}%)"
+
+
+def format_drc(drc: dict | None) -> str:
+    if drc is None:
+        return ""
+    short = {"Error": "E", "Critical Warning": "CW", "Warning": "W", "Advisory": "A"}
+    return " ".join(f"{n}{short.get(sev, sev)}" for sev, n in drc["by_severity"].items() if n) or "0"
+
+
+def print_reports_table(results: list[dict]) -> None:
+    from tabulate import tabulate
+    table = [["Run", "Timing", "WNS", "TNS", "WHS", "THS", "LUT", "FF", "BRAM", "DSP", "DRC", "Methodology", "Power [W]", "Failing clocks"]]
+    for r in results:
+        timing = r["timing"] or {}
+        met = timing.get("met")
+        table.append([r["run"], "" if met is None else "PASS" if met else "FAIL",
+                      *["" if timing.get(k) is None else timing[k] for k in ("wns", "tns", "whs", "ths")],
+                      *[format_util(r["utilization"], site) for site in ("LUT", "FF", "BRAM", "DSP")],
+                      format_drc(r["drc"]), format_drc(r["methodology"]),
+                      "" if not r["power"] else r["power"].get("total", ""),
+                      ", ".join(timing.get("failing_clocks", []))])
+    print(tabulate(table, headers="firstrow", tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse Vivado run reports without launching Vivado.")
+    parser.add_argument("runs_dir", help="<project>.runs directory, or a single run directory")
+    parser.add_argument("--run", action="append", help="Only this run (repeatable)")
+    parser.add_argument("--json", action="store_true", help="Print the parsed results as JSON")
+    args = parser.parse_args()
+
+    runs_dir = Path(args.runs_dir)
+    results = [parse_run(runs_dir)] if any(runs_dir.glob("*.rpt")) else parse_runs(runs_dir, args.run)
+    if not results:
+        print(f"[!x!] No reports found under {runs_dir}")
+        sys.exit(1)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_reports_table(results)
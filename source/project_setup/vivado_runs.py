@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+vivado_runs.py
+
+Progress of Vivado project runs read straight from <project>.runs/<run>/,
+without opening the project:
+1. .<step>.begin.rst / .end.rst / .error.rst markers (written by Vivado's ISEWrap)
+   give the status and the elapsed time of every step (vivado, init_design, opt_design, ...),
+2. the tail of runme.log gives the current phase ("Phase 2.3 Global Placement", ...),
+3. the <Run> entries of <project>.xpr give the kind (synth/impl) and the parent synth run of each run,
+4. step durations of completed runs are kept in <project>.runs/.hdlforge_run_history.json
+   and give the estimated remaining time of running ones.
+
+Usage:
+    ./vivado_runs.py <project>.runs [--run impl_main_0 ...] [--watch 10]
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import sys
+import time
+from pathlib import Path
+
+HISTORY_FILE_NAME = ".hdlforge_run_history.json"
+HISTORY_PER_RUN = 10
+LOG_TAIL_BYTES = 64 * 1024
+
+IMPL_STEPS = ["init_design", "opt_design", "power_opt_design", "place_design", "post_place_power_opt_design",
+              "phys_opt_design", "route_design", "post_route_phys_opt_design", "write_bitstream"]
+
+RST_ATTR_RE = re.compile(r'(\w+)="([^"]*)"')
+XPR_RUN_RE  = re.compile(r"<Run\s([^>]*)>")
+RST_FILE_RE = re.compile(r"^\.(\w+)\.(begin|end|error)\.rst$")
+PHASE_RE    = re.compile(r"^(Phase \d+(\.\d+)* .+|Starting .+|Start .+|Command: \w+.*)$")
+
+
+def read_rst(path: Path) -> dict:
+    """Attributes of the <Process .../> element of a .rst marker (Owner, Host, Pid)."""
+    try:
+        with open(path, "r", errors="replace") as f:
+            text = f.read()
+    except OSError:
+        return {}
+    m = re.search(r"<Process\s([^>]*)>", text)
+    return dict(RST_ATTR_RE.findall(m.group(1))) if m else {}
+
+
+def is_process_alive(info: dict) -> bool | None:
+    """True/False for a Pid on this host, None when it cannot be checked (other host, no pid)."""
+    if info.get("Host", "").split(".")[0] != socket.gethostname().split(".")[0] or not info.get("Pid", "").isdigit():
+        return None
+    try:
+        os.kill(int(info["Pid"]), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def get_current_phase(log_file: Path) -> str:
+    """Last "Phase ..."/"Start ..."/"Command: ..." line in the tail of the run log."""
+    try:
+        with open(log_file, "rb") as f:
+            f.seek(max(0, f.seek(0, os.SEEK_END) - LOG_TAIL_BYTES))
+            lines = f.read().decode(errors="replace").splitlines()
+    except OSError:
+        return ""
+    for line in reversed(lines):
+        line = line.strip()
+        if PHASE_RE.match(line):
+            return line.split(" | ")[0][:60]
+    return ""
+
+
+def read_project_runs(runs_dir: Path) -> dict:
+    """{run: {"kind": "synth"|"impl", "parent": synth run or None}} from the <Run> entries of <project>.xpr."""
+    runs_dir = Path(runs_dir)
+    xpr = runs_dir.parent / f"{runs_dir.name.removesuffix('.runs')}.xpr"
+    try:
+        with open(xpr, "r", errors="replace") as f:
+            text = f.read()
+    except OSError:
+        return {}
+    runs = {}
+    for m in XPR_RUN_RE.finditer(text):
+        attrs = dict(RST_ATTR_RE.findall(m.group(1)))
+        if "Id" in attrs:
+            runs[attrs["Id"]] = {"kind": "synth" if "Synth" in attrs.get("Type", "") else "impl",
+                                 "parent": attrs.get("SynthRun") or attrs.get("Parent") or None}
+    return runs
+
+
+def get_run_kind(run_dir: Path, steps: dict) -> str:
+    """impl when the run has implementation steps or logs to a .vdi (runme.sh of an unstarted run), else synth."""
+    if any(step in IMPL_STEPS for step in steps) or any(run_dir.glob("*.vdi")):
+        return "impl"
+    try:
+        with open(run_dir / "runme.sh", "r", errors="replace") as f:
+            return "impl" if ".vdi" in f.read() else "synth"
+    except OSError:
+        return "synth"
+
+
+def scan_run(run_dir: Path, now: float | None = None, kind: str | None = None) -> dict:
+    """
+    Status of one run directory; step times come from the marker mtimes.
+    A launched run that has not started yet is "queued" here; scan_runs() demotes it to
+    "not started" when it can no longer start.
+    """
+    now = time.time() if now is None else now
+    markers = {}
+    for entry in os.scandir(run_dir):
+        m = RST_FILE_RE.match(entry.name)
+        if m:
+            markers.setdefault(m.group(1), {})[m.group(2)] = entry.stat().st_mtime
+
+    steps = {}
+    for step, times in sorted(markers.items(), key=lambda kv: kv[1].get("begin", now)):
+        begin = times.get("begin")
+        end = times.get("end", times.get("error"))
+        steps[step] = {"begin": begin, "end": end,
+                       "status": "error" if "error" in times else "complete" if "end" in times else "running",
+                       "elapsed": ((end or now) - begin) if begin else None}
+
+    run = {"run": run_dir.name, "kind": kind or get_run_kind(run_dir, steps), "status": "not started", "step": "", "phase": "",
+           "started": None, "elapsed": None, "remaining": None, "steps": steps}
+
+    vivado = steps.get("vivado")
+    if vivado is None:
+        if (run_dir / "runme.sh").exists():
+            run["status"] = "queued"
+        return run
+    run["started"], run["elapsed"] = vivado["begin"], vivado["elapsed"]
+    tool_steps = [step for step in steps if step != "vivado"]
+    if any(s["status"] == "error" for s in steps.values()):
+        run["status"] = "error"
+        run["step"] = next((step for step in tool_steps if steps[step]["status"] == "error"), "")
+    elif vivado["status"] == "complete":
+        run["status"] = "complete"
+        run["step"] = tool_steps[-1] if tool_steps else ""
+    else:
+        alive = is_process_alive(read_rst(run_dir / ".vivado.begin.rst"))
+        run["status"] = "stale" if alive is False else "running"
+        run["step"] = next((step for step in reversed(tool_steps) if steps[step]["status"] == "running"), "")
+        run["phase"] = get_current_phase(run_dir / "runme.log")
+    return run
+
+
+def scan_runs(runs_dir: Path, names: list[str] | None = None) -> list[dict]:
+    """
+    Status of every launched run (of `names` only when given). A queued run stays "queued"
+    while its parent synth run is running or queued, or, once the parent has completed (or it
+    has none), while another run is running and may free a job slot; otherwise it will not start.
+    """
+    runs_dir = Path(runs_dir)
+    if not runs_dir.is_dir():
+        return []
+    now = time.time()
+    project_runs = read_project_runs(runs_dir)
+    runs = {run_dir.name: scan_run(run_dir, now, project_runs.get(run_dir.name, {}).get("kind"))
+            for run_dir in sorted(p for p in runs_dir.iterdir() if p.is_dir())
+            if (run_dir / "runme.sh").exists() or (run_dir / ".vivado.begin.rst").exists()}
+    parents = {name: runs.get(project_runs.get(name, {}).get("parent")) for name in runs}
+    any_running = any(run["status"] == "running" for run in runs.values())
+    # synth runs first: an impl run follows the final status of its parent
+    for name in sorted(runs, key=lambda name: parents[name] is not None):
+        run, parent = runs[name], parents[name]
+        if run["status"] != "queued":
+            continue
+        if parent is not None and parent["status"] in ("running", "queued"):
+            continue
+        if (parent is None or parent["status"] == "complete") and any_running:
+            continue
+        run["status"] = "not started"
+    return [run for name, run in runs.items() if names is None or name in names]
+
+
+def load_history(runs_dir: Path) -> dict:
+    try:
+        with open(Path(runs_dir) / HISTORY_FILE_NAME, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_history(runs_dir: Path, runs: list[dict], history: dict) -> dict:
+    """Add the step durations of completed runs not seen before; written only when something changed."""
+    changed = False
+    for run in runs:
+        if run["status"] != "complete":
+            continue
+        entries = history.setdefault(run["run"], [])
+        if any(abs(e["started"] - run["started"]) < 1 for e in entries):
+            continue
+        entries.append({"kind": run["kind"], "started": run["started"],
+                        "steps": {step: round(s["elapsed"], 1) for step, s in run["steps"].items() if s["elapsed"] is not None}})
+        del entries[:-HISTORY_PER_RUN]
+        changed = True
+    if changed:
+        tmp = Path(runs_dir) / f"{HISTORY_FILE_NAME}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(history, f, indent=2)
+            os.replace(tmp, Path(runs_dir) / HISTORY_FILE_NAME)
+        except OSError:
+            pass  # read-only build dir: estimates just stay unavailable
+    return history
+
+
+def estimate_remaining(run: dict, history: dict) -> float | None:
+    """
+    Mean historical duration of the steps still to come plus what is left of the current one.
+    Uses the history of the same run, else of all runs of the same kind; None without history.
+    """
+    entries = history.get(run["run"]) or [e for entries in history.values() for e in entries if e["kind"] == run["kind"]]
+    if not entries or run["status"] != "running":
+        return None
+    mean = {}
+    for entry in entries:
+        for step, seconds in entry["steps"].items():
+            mean.setdefault(step, []).append(seconds)
+    mean = {step: sum(values) / len(values) for step, values in mean.items()}
+    tool_steps = [step for step in mean if step != "vivado"]
+    if not tool_steps or not run["step"]:
+        return max(mean.get("vivado", 0.0) - run["elapsed"], 0.0)
+    remaining = max(mean.get(run["step"], 0.0) - run["steps"][run["step"]]["elapsed"], 0.0)
+    remaining += sum(mean[step] for step in tool_steps if step not in run["steps"])
+    return remaining
+
+
+def format_seconds(seconds: float | None) -> str:
+    if seconds is None:
+        return ""
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def print_runs_table(runs: list[dict]) -> None:
+    from tabulate import tabulate
+    table = [["Run", "Kind", "Status", "Step", "Step time", "Phase", "Elapsed", "Remaining"]]
+    for run in runs:
+        step = run["steps"].get(run["step"], {})
+        table.append([run["run"], run["kind"], run["status"], run["step"], format_seconds(step.get("elapsed")),
+                      run["phase"], format_seconds(run["elapsed"]),
+                      "" if run["remaining"] is None else f"~{format_seconds(run['remaining'])}"])
+    print(tabulate(table, headers="firstrow", tablefmt="grid"), flush=True)
+
+
+def monitor(runs_dir: Path, names: list[str] | None = None, watch: float | None = None) -> list[dict]:
+    """Print the run table once, or every `watch` seconds until no run is running or queued."""
+    runs_dir = Path(runs_dir)
+    if not runs_dir.is_dir():
+        print(f"[!x!] No runs directory: {runs_dir}")
+        sys.exit(1)
+    while True:
+        runs = scan_runs(runs_dir, names)
+        history = update_history(runs_dir, runs, load_history(runs_dir))
+        for run in runs:
+            run["remaining"] = estimate_remaining(run, history)
+        print(f"\n[i] {runs_dir} at {time.strftime('%H:%M:%S')}")
+        print_runs_table(runs)
+        if not watch or not any(run["status"] in ("running", "queued") for run in runs):
+            return runs
+        time.sleep(float(watch))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vivado run progress from the run directories.")
+    parser.add_argument("runs_dir", help="<project>.runs directory")
+    parser.add_argument("--run", action="append", help="Only this run (repeatable)")
+    parser.add_argument("--watch", type=float, default=None, help="Refresh every N seconds while runs are active")
+    args = parser.parse_args()
+    try:
+        monitor(Path(args.runs_dir), args.run, args.watch)
+    except KeyboardInterrupt:
+        pass
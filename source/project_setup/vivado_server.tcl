@@ -0,0 +1,189 @@
+# Usage:
+# vivado -mode batch -source vivado_server.tcl -notrace -tclargs <project.xpr|-> <state_file> [port]
+# tclsh vivado_server.tcl - <state_file> [port]        (stand-in without Vivado)
+#
+# Long-lived TCL server: opens the project once and evaluates scripts sent by
+# vivado_client.py over a localhost socket. The state file (mode 0600) receives
+# "<port> <pid> <token> <project>": the port is reachable by every local user (and by the
+# host when the container uses --net=host), so a connection must prove it can read the file.
+#
+# Protocol (every frame is a header line "<kind> <nbytes>\n" + nbytes of utf-8 payload):
+#   client -> server   A <n>   the token; must be the first frame, else the connection is closed
+#                      S <n>   script to evaluate at global level
+#                      Q 0     shut the server down
+#   server -> client   O <n>   output written with puts to stdout while the script runs
+#                      R <n>   script finished, payload is its result
+#                      E <n>   script failed, payload is the error message
+
+if { $argc < 2 } {
+    puts "Usage: vivado -mode batch -source vivado_server.tcl -tclargs <project.xpr|-> <state_file> \[port\]"
+    exit 1
+}
+
+set ::hdlforge_project    [lindex $argv 0]
+set ::hdlforge_state_file [lindex $argv 1]
+set ::hdlforge_port       [expr { $argc > 2 ? [lindex $argv 2] : 0 }]
+set ::hdlforge_client     ""
+set ::hdlforge_running    1
+
+# random per-server token, proven by the client in its first frame
+set fp [open /dev/urandom rb]
+binary scan [read $fp 32] H* ::hdlforge_token
+close $fp
+
+if { $::hdlforge_project ne "-" } {
+    if {![file exists $::hdlforge_project]} {
+        puts "Error: Project file '$::hdlforge_project' not found."
+        exit 1
+    }
+    puts "(i) Opening project once: $::hdlforge_project"
+    open_project $::hdlforge_project
+}
+
+proc hdlforge_send {chan kind payload} {
+    set data [encoding convertto utf-8 $payload]
+    puts -nonewline $chan "$kind [string length $data]\n"
+    puts -nonewline $chan $data
+    flush $chan
+}
+
+proc hdlforge_read_frame {chan} {
+    set header [gets $chan]
+    if { [eof $chan] || $header eq "" } {
+        return ""
+    }
+    lassign $header kind nbytes
+    set payload ""
+    if { $nbytes > 0 } {
+        set payload [encoding convertfrom utf-8 [read $chan $nbytes]]
+    }
+    return [list $kind $payload]
+}
+
+# puts to stdout is forwarded to the connected client (and still echoed to the server log)
+rename puts hdlforge_orig_puts
+proc puts {args} {
+    set nonewline 0
+    if { [lindex $args 0] eq "-nonewline" } {
+        set nonewline 1
+        set args [lrange $args 1 end]
+    }
+    if { [llength $args] == 1 } {
+        set chan stdout
+        set text [lindex $args 0]
+    } else {
+        lassign $args chan text
+    }
+    if { $chan ne "stdout" || $::hdlforge_client eq "" } {
+        if { $nonewline } {
+            return [hdlforge_orig_puts -nonewline $chan $text]
+        }
+        return [hdlforge_orig_puts $chan $text]
+    }
+    if { !$nonewline } {
+        append text "\n"
+    }
+    hdlforge_orig_puts -nonewline stdout $text
+    hdlforge_send $::hdlforge_client O $text
+}
+
+# Source one of the batch scripts (compile.tcl, project_tool.tcl, ...) inside the
+# server: the project is already open, so open/close_project are skipped and exit
+# only ends the script.
+proc hdlforge_source {script args} {
+    set saved_argv $::argv
+    set saved_argc $::argc
+    set ::argv $args
+    set ::argc [llength $args]
+    rename exit          hdlforge_orig_exit
+    rename open_project  hdlforge_orig_open_project
+    rename close_project hdlforge_orig_close_project
+    proc ::exit {{code 0}} {
+        return -code error -errorcode [list HDLFORGE_EXIT $code] "exit $code"
+    }
+    proc ::open_project {args} { return [current_project] }
+    proc ::close_project {args} { return }
+
+    set rc [catch {uplevel #0 [list source $script]} result options]
+
+    rename ::exit ""
+    rename ::open_project ""
+    rename ::close_project ""
+    rename hdlforge_orig_exit          exit
+    rename hdlforge_orig_open_project  open_project
+    rename hdlforge_orig_close_project close_project
+    set ::argv $saved_argv
+    set ::argc $saved_argc
+
+    if { $rc == 1 } {
+        set code [dict get $options -errorcode]
+        if { [lindex $code 0] eq "HDLFORGE_EXIT" } {
+            if { [lindex $code 1] != 0 } {
+                error "script exited with code [lindex $code 1]"
+            }
+            return ""
+        }
+        return -options $options $result
+    }
+    return $result
+}
+
+# plain tclsh has no project commands; give hdlforge_source something to rename
+foreach cmd {open_project close_project current_project} {
+    if { [llength [info commands $cmd]] == 0 } {
+        proc $cmd {args} { return "" }
+    }
+}
+
+proc hdlforge_accept {chan addr port} {
+    fconfigure $chan -translation binary -blocking 1
+    set frame [hdlforge_read_frame $chan]
+    if { [lindex $frame 0] ne "A" || ![string equal [lindex $frame 1] $::hdlforge_token] } {
+        hdlforge_orig_puts "(!) rejected a connection from $addr:$port without the server token"
+        close $chan
+        return
+    }
+    hdlforge_send $chan R "ok"
+    set ::hdlforge_client $chan
+    while { 1 } {
+        set frame [hdlforge_read_frame $chan]
+        if { $frame eq "" } {
+            break
+        }
+        lassign $frame kind payload
+        if { $kind eq "Q" } {
+            hdlforge_send $chan R "bye"
+            set ::hdlforge_running 0
+            break
+        }
+        if { [catch {uplevel #0 $payload} result] } {
+            hdlforge_send $chan E $result
+        } else {
+            hdlforge_send $chan R $result
+        }
+    }
+    set ::hdlforge_client ""
+    close $chan
+}
+
+set server [socket -server hdlforge_accept -myaddr 127.0.0.1 $::hdlforge_port]
+set ::hdlforge_port [lindex [fconfigure $server -sockname] 2]
+
+file delete -force $::hdlforge_state_file
+set fp [open $::hdlforge_state_file {WRONLY CREAT EXCL} 0600]
+hdlforge_orig_puts $fp "$::hdlforge_port [pid] $::hdlforge_token $::hdlforge_project"
+close $fp
+hdlforge_orig_puts "(i) hdlforge vivado server listening on 127.0.0.1:$::hdlforge_port"
+flush stdout
+
+while { $::hdlforge_running } {
+    vwait ::hdlforge_running
+}
+
+close $server
+file delete -force $::hdlforge_state_file
+if { $::hdlforge_project ne "-" } {
+    close_project
+}
+hdlforge_orig_puts "(i) hdlforge vivado server stopped"
+exit 0
@@ -1,74 +1,257 @@
 import argparse
+import json
 import pickle
 import os
+import re
+import sqlite3
+import time
 from tabulate import tabulate
 
 DEFAULT_MAX_LENGTH = 100  # Default max message length
+DEFAULT_MAX_SAMPLES = 20  # Sample messages kept per (type, code, subcode)
 TABLE_STYLE = "grid"  # Default table format
+DEFAULT_DB = "warnings.db"  # Default warning database (many logs per file)
+
+# "<TYPE>: [<Code> <Subcode>] <message>", e.g. "CRITICAL WARNING: [Synth 8-6859] multi-driven net ..."
+CODED_MSG_RE = re.compile(r"^([^:]*):\s*\[([^\]]*)\]\s*(.*)$")
+
+
+class MessageStats:
+    """Occurrence count and a capped list of distinct sample messages for one (type, code, subcode)."""
+    __slots__ = ("count", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.samples = []
+
+    def add(self, message, max_samples):
+        self.count += 1
+        if len(self.samples) < max_samples and message not in self.samples:
+            self.samples.append(message)
+
+    def __getstate__(self):
+        return (self.count, self.samples)
+
+    def __setstate__(self, state):
+        self.count, self.samples = state
+
 
 def truncate_text(text, length):
     return text if len(text) <= length else text[:length] + "..."
 
-def parse_log_file(log_file, max_length):
+def parse_line(line, max_length):
+    """
+    Split one log line into (type, code, subcode, message), or None for a malformed coded line.
+    Lines without "Type:" are MSG/UNKNOWN/UNKNOWN; "Word: text" lines become "*Word".
+    """
+    line = line.strip()
+    match = CODED_MSG_RE.match(line)
+    if match:
+        msg_type, code_subcode, message = match.groups()
+        code, _, subcode = code_subcode.strip().partition(" ")
+        return msg_type.strip(), code, subcode or "UNKNOWN", truncate_text(message, max_length)
+
+    msg_type, sep, rest = line.partition(":")
+    if not sep:
+        return "MSG", "UNKNOWN", "UNKNOWN", truncate_text(line, max_length)
+    if rest.strip().startswith("["):
+        return None  # "[" without "]": invalid format, skip
+    msg_type = msg_type.strip().split(" ")[0]
+    if len(msg_type) < 3:
+        return "MSG", "UNKNOWN", "UNKNOWN", truncate_text(line, max_length)
+    return "*" + msg_type, "UNKNOWN", "UNKNOWN", truncate_text(line, max_length)
+
+def add_message(log_dict, parsed, max_samples):
+    msg_type, code, subcode, message = parsed
+    subcodes = log_dict.setdefault(msg_type, {}).setdefault(code, {})
+    stats = subcodes.get(subcode)
+    if stats is None:
+        stats = subcodes[subcode] = MessageStats()
+    stats.add(message, max_samples)
+
+def parse_log_file(log_file, max_length, max_samples=DEFAULT_MAX_SAMPLES):
+    """
+    Stream `log_file` once and return {type: {code: {subcode: MessageStats}}}.
+    Memory is bounded by the number of distinct codes, not by the log size.
+    """
     log_dict = {}
 
-    with open(log_file, "r", encoding="utf-8") as f:
+    with open(log_file, "r", encoding="utf-8", errors="replace") as f:
         for line in f:
-            line = line.strip()
-
-            # Step 1: Split by ":"
-            type_split = line.split(":", 1)
-            if len(type_split) != 2:
-                # If no ":", store as MSG type
-                msg_type, code, subcode, message = "MSG", "UNKNOWN", "UNKNOWN", truncate_text(line, max_length)
-            else:
-                msg_type, rest = type_split[0].strip(), type_split[1].strip()
-
-                # If no "[", treat entire line as MSG
-                if  not rest.startswith("["):
-                    msg_type=msg_type.split(' ')[0]
-                    if len(msg_type)<3: 
-                       msg_type, code, subcode, message = "MSG", "UNKNOWN", "UNKNOWN", truncate_text(line, max_length)
-                    else:
-                       code, subcode, message = "UNKNOWN", "UNKNOWN", truncate_text(line, max_length)
-                       msg_type="*"+msg_type
-                else:
-                    # Step 2: Extract code and subcode
-                    code_split = rest.split("[", 1)
-                    if len(code_split) != 2:
-                        continue  # Invalid format, skip
+            parsed = parse_line(line, max_length)
+            if parsed is not None:
+                add_message(log_dict, parsed, max_samples)
+
+    return log_dict
 
-                    before_code, code_part = code_split[0].strip(), code_split[1]
+def parse_filter(filter_str):
+    # Parse filter: "WARNING,DRC,REQP-1935"
+    filters = filter_str.split(",") if filter_str else []
+    filter_type = filters[0] if len(filters) > 0 else None
+    filter_code = filters[1] if len(filters) > 1 else None
+    filter_subcode = filters[2] if len(filters) > 2 else None
+    return filter_type, filter_code, filter_subcode
 
-                    # Step 3: Extract code & message
-                    code_parts = code_part.split("]", 1)
-                    if len(code_parts) != 2:
-                        continue  # Invalid format, skip
+def match_filter(msg_type, code, subcode, filter_type, filter_code, filter_subcode):
+    if filter_type is None:
+        if "*" in msg_type:
+            return False
+    elif filter_type != "*" and msg_type != filter_type:
+        return False
+    if filter_code and code != filter_code:
+        return False
+    if filter_subcode and subcode != filter_subcode:
+        return False
+    return True
 
-                    code_subcode, message = code_parts[0].strip(), code_parts[1].strip()
+def follow_log_file(log_file, max_length, filter_str=None, max_samples=DEFAULT_MAX_SAMPLES,
+                    poll_interval=0.5, from_start=False):
+    """
+    Tail a log that is still being written (e.g. runme.log during a run), print every
+    message matching `filter_str` as it appears, and return the accumulated stats on Ctrl-C.
+    Handles partial lines and restarts from the top when the file is truncated or replaced.
+    """
+    filter_args = parse_filter(filter_str)
+    log_dict = {}
+    if not os.path.exists(log_file):
+        from_start = True  # the run has not created the log yet: read it all once it appears
+        while not os.path.exists(log_file):
+            time.sleep(poll_interval)
 
-                    # Step 4: Extract Code and Subcode
-                    code_sub_split = code_subcode.split(" ", 1)
-                    if len(code_sub_split) == 2:
-                        code, subcode = code_sub_split
-                    else:
-                        code, subcode = code_sub_split[0], "UNKNOWN"  # Default if no subcode
+    f = open(log_file, "r", encoding="utf-8", errors="replace")
+    inode = os.fstat(f.fileno()).st_ino
+    if not from_start:
+        f.seek(0, os.SEEK_END)
+    pending = ""
+    try:
+        while True:
+            chunk = f.read()
+            if chunk:
+                lines = (pending + chunk).split("\n")
+                pending = lines.pop()
+                for line in lines:
+                    parsed = parse_line(line, max_length)
+                    if parsed is None:
+                        continue
+                    add_message(log_dict, parsed, max_samples)
+                    if match_filter(*parsed[:3], *filter_args):
+                        print(f"[{parsed[0]}] [{parsed[1]} {parsed[2]}] {parsed[3]}", flush=True)
+                continue
+            # no new data: check for truncation / log rotation
+            try:
+                st = os.stat(log_file)
+            except FileNotFoundError:
+                st = None
+            if st is not None and (st.st_ino != inode or st.st_size < f.tell()):
+                f.close()
+                f = open(log_file, "r", encoding="utf-8", errors="replace")
+                inode = os.fstat(f.fileno()).st_ino
+                pending = ""
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        f.close()
+    return log_dict
 
-                    message = truncate_text(message, max_length)  # Truncate message
+DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id        INTEGER PRIMARY KEY,
+    path      TEXT NOT NULL,
+    label     TEXT NOT NULL DEFAULT '',
+    size      INTEGER,
+    mtime     REAL,
+    parsed_at REAL,
+    UNIQUE(path, label)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    log_id  INTEGER NOT NULL REFERENCES logs(id) ON DELETE CASCADE,
+    type    TEXT NOT NULL,
+    code    TEXT NOT NULL,
+    subcode TEXT NOT NULL,
+    count   INTEGER NOT NULL,
+    samples TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_type_code_subcode ON messages(type, code, subcode);
+CREATE INDEX IF NOT EXISTS messages_log_id ON messages(log_id);
+"""
 
-            # Store in dictionary
-            if msg_type not in log_dict:
-                log_dict[msg_type] = {}
+def open_db(db_file):
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(DB_SCHEMA)
+    return conn
 
-            if code not in log_dict[msg_type]:
-                log_dict[msg_type][code] = {}
+def store_log(conn, log_file, log_dict, label=""):
+    """Store one parsed log; a log already stored with the same path and label is replaced."""
+    path = os.path.abspath(log_file)
+    st = os.stat(log_file)
+    with conn:
+        conn.execute("DELETE FROM logs WHERE path = ? AND label = ?", (path, label))
+        log_id = conn.execute(
+            "INSERT INTO logs (path, label, size, mtime, parsed_at) VALUES (?, ?, ?, ?, ?)",
+            (path, label, st.st_size, st.st_mtime, time.time())).lastrowid
+        conn.executemany(
+            "INSERT INTO messages (log_id, type, code, subcode, count, samples) VALUES (?, ?, ?, ?, ?, ?)",
+            ((log_id, msg_type, code, subcode, stats.count, json.dumps(stats.samples))
+             for msg_type, codes in log_dict.items()
+             for code, subcodes in codes.items()
+             for subcode, stats in subcodes.items()))
+    return log_id
 
-            if subcode not in log_dict[msg_type][code]:
-                log_dict[msg_type][code][subcode] = []
+def query_messages(conn, filter_str, labels=None, per_log=False, max_samples=DEFAULT_MAX_SAMPLES):
+    """
+    Return table rows [type, code, subcode, count, samples] (prefixed with the log label/path when
+    `per_log`) for the messages matching `filter_str`; only the matching index range is read.
+    Without `per_log`, counts are summed over all stored logs (or the `labels` subset).
+    """
+    filter_type, filter_code, filter_subcode = parse_filter(filter_str)
+    where, params = [], []
+    if filter_type is None:
+        where.append("instr(m.type, '*') = 0")
+    elif filter_type != "*":
+        where.append("m.type = ?")
+        params.append(filter_type)
+    if filter_code:
+        where.append("m.code = ?")
+        params.append(filter_code)
+    if filter_subcode:
+        where.append("m.subcode = ?")
+        params.append(filter_subcode)
+    if labels:
+        where.append(f"l.label IN ({', '.join('?' for _ in labels)})")
+        params.extend(labels)
+    sql = ("SELECT l.label, l.path, m.type, m.code, m.subcode, m.count, m.samples "
+           "FROM messages m JOIN logs l ON l.id = m.log_id")
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY m.type, m.code, m.subcode, l.id"
 
-            log_dict[msg_type][code][subcode].append(message)
+    rows = []
+    merged = {}
+    for label, path, msg_type, code, subcode, count, samples in conn.execute(sql, params):
+        samples = json.loads(samples)
+        if per_log:
+            rows.append([label or path, msg_type, code, subcode, count, samples])
+            continue
+        key = (msg_type, code, subcode)
+        if key not in merged:
+            merged[key] = [msg_type, code, subcode, 0, []]
+            rows.append(merged[key])
+        merged[key][3] += count
+        for msg in samples:
+            if len(merged[key][4]) < max_samples and msg not in merged[key][4]:
+                merged[key][4].append(msg)
+    return rows
 
-    return log_dict
+def list_logs(conn):
+    from datetime import datetime
+    table = []
+    for log_id, label, path, size, parsed_at, total in conn.execute(
+            "SELECT l.id, l.label, l.path, l.size, l.parsed_at, COALESCE(SUM(m.count), 0) "
+            "FROM logs l LEFT JOIN messages m ON m.log_id = l.id GROUP BY l.id ORDER BY l.id"):
+        table.append([log_id, label, path, size, datetime.fromtimestamp(parsed_at).strftime("%Y-%m-%d %H:%M:%S"), total])
+    print(tabulate(table, headers=["Id", "Label", "Path", "Size", "Parsed", "Messages"], tablefmt=TABLE_STYLE))
 
 def save_to_bin(data, bin_file):
     with open(bin_file, "wb") as f:
@@ -78,62 +261,85 @@ def load_from_bin(bin_file):
     with open(bin_file, "rb") as f:
         return pickle.load(f)
 
-def print_table(data, filter_str, max_length):
-    table_data = []
-    available_types = list(data.keys())
-    available_main_types = [key for key in data.keys() if not key.startswith("*")]
-    # Parse filter: "WARNING,DRC,REQP-1935"
-    filters = filter_str.split(",") if filter_str else []
-    filter_type = filters[0] if len(filters) > 0 else None
-    filter_code = filters[1] if len(filters) > 1 else None
-    filter_subcode = filters[2] if len(filters) > 2 else None
-       
-    for msg_type, codes in data.items():
-        if filter_type==None:
-            if "*"in msg_type :
-                  continue
-        else:
-           if filter_type!="*":
-               if(msg_type != filter_type) :
-                   continue
-        for code, subcodes in codes.items():
-            if filter_code and code != filter_code:
-                continue
-            for subcode, messages in subcodes.items():
-                if filter_subcode and subcode != filter_subcode:
-                    continue
-                for msg in messages:
-                    table_data.append([msg_type, code, subcode, truncate_text(msg, max_length)])
-
+def print_rows(table_data, filter_str, max_length, available_types, headers=("Type", "Code", "Subcode", "Count", "Messages (samples)")):
     if not table_data:
         print("✅ No matching log messages found.")
         return
 
-    print("\n" + tabulate(table_data, headers=["Type", "Code", "Subcode", "Message"], tablefmt=TABLE_STYLE))
+    for row in table_data:
+        row[-1] = "\n".join(truncate_text(msg, max_length) for msg in row[-1])
+    print("\n" + tabulate(table_data, headers=list(headers), tablefmt=TABLE_STYLE))
 
     if not filter_str:
+        available_main_types = [key for key in available_types if not key.startswith("*")]
         print("\n🔹 Use `-t Type,Code,Subcode` to filter messages.")
         print(f"📝 Available types: {', '.join(available_main_types)}")
         print(f"📝 Available types: {', '.join(available_types)}")
+
+def print_table(data, filter_str, max_length):
+    table_data = []
+    filter_type, filter_code, filter_subcode = parse_filter(filter_str)
+
+    for msg_type, codes in data.items():
+        for code, subcodes in codes.items():
+            for subcode, stats in subcodes.items():
+                if not match_filter(msg_type, code, subcode, filter_type, filter_code, filter_subcode):
+                    continue
+                if isinstance(stats, list):  # .bin written by the old parser: full message lists
+                    count, samples = len(stats), stats[:DEFAULT_MAX_SAMPLES]
+                else:
+                    count, samples = stats.count, stats.samples
+                table_data.append([msg_type, code, subcode, count, samples])
+
+    print_rows(table_data, filter_str, max_length, list(data.keys()))
+
+def print_db_table(conn, filter_str, max_length, labels=None, per_log=False):
+    rows = query_messages(conn, filter_str, labels, per_log)
+    available_types = [row[0] for row in conn.execute("SELECT DISTINCT type FROM messages")]
+    headers = ("Type", "Code", "Subcode", "Count", "Messages (samples)")
+    if per_log:
+        headers = ("Log",) + headers
+    print_rows(rows, filter_str, max_length, available_types, headers)
+
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Parse log files and save/load data.")
-    parser.add_argument("-f", "--file", help="Log text file to parse")
-    parser.add_argument("-b", "--bin", help="Binary file to load and print")
+    parser = argparse.ArgumentParser(description="Parse log files into a warning database and query it.")
+    parser.add_argument("-f", "--file", help="Log text file to parse (stored into --db)")
+    parser.add_argument("-d", "--db", default=DEFAULT_DB, help=f"Warning database, may hold many logs (default: {DEFAULT_DB})")
+    parser.add_argument("--label", default="", help="Label for the parsed log (run name, commit ...); with a query: comma-separated labels to include")
+    parser.add_argument("--per-log", action="store_true", help="Query: one row per stored log instead of summing over logs")
+    parser.add_argument("--list-logs", action="store_true", help="List the logs stored in --db")
+    parser.add_argument("-b", "--bin", help="Legacy pickle .bin file to load and print")
     parser.add_argument("-t", "--type", help="Filter logs using `Type,Code,Subcode` (e.g., WARNING,DRC,REQP-1935)")
     parser.add_argument("-l", "--length", type=int, default=DEFAULT_MAX_LENGTH, help="Max message length (default: 100)")
+    parser.add_argument("-s", "--samples", type=int, default=DEFAULT_MAX_SAMPLES, help=f"Sample messages kept per code (default: {DEFAULT_MAX_SAMPLES})")
+    parser.add_argument("--follow", action="store_true", help="Tail a growing log (-f) and print matching messages live; Ctrl-C prints the summary")
+    parser.add_argument("--from-start", action="store_true", help="With --follow: parse the existing content first")
 
     args = parser.parse_args()
 
-    if args.file:
-        log_data = parse_log_file(args.file, args.length)
-        bin_file = os.path.splitext(args.file)[0] + ".bin"
-        save_to_bin(log_data, bin_file)
-        print(f"✅ Log data saved to {bin_file}")
+    if args.file and args.follow:
+        log_data = follow_log_file(args.file, args.length, args.type or "CRITICAL WARNING",
+                                   args.samples, from_start=args.from_start)
+        print_table(log_data, args.type, args.length)
+
+    elif args.file:
+        log_data = parse_log_file(args.file, args.length, args.samples)
+        with open_db(args.db) as conn:
+            log_id = store_log(conn, args.file, log_data, args.label)
+        print(f"✅ Log data saved to {args.db} (log id {log_id})")
 
     elif args.bin:
         log_data = load_from_bin(args.bin)
         print_table(log_data, args.type, args.length)
 
-    else:
-        print("❌ Error: Provide either -f <logfile> or -b <binfile>")
+    elif os.path.exists(args.db):
+        conn = open_db(args.db)
+        if args.list_logs:
+            list_logs(conn)
+        else:
+            labels = [l for l in args.label.split(",") if l] or None
+            print_db_table(conn, args.type, args.length, labels, args.per_log)
+        conn.close()
 
+    else:
+        print(f"❌ Error: Provide -f <logfile>, -b <binfile> or an existing -d <db> (not found: {args.db})")
@@ -11,6 +11,7 @@ import subprocess
 import argparse
 import time
 import json
+import hashlib
 import yaml
 from dataclasses import dataclass, asdict
 import os
@@ -19,6 +20,7 @@ from tabulate import tabulate
 import pathlib 
 import logging
 from typing import List, Tuple
+from docker_api import DockerClient, DockerError
 
 
 logger = logging.getLogger(__name__)
@@ -65,141 +67,341 @@ def printlocals(locals_dict,verbose=False):
         
     print("===============================")
 
+TOOLS_IMAGE = "fabrinetes-tools"
+USER_IMAGE = "fabrinetes-dev"
+BUILD_HASH_LABEL = "fabrinetes.build-hash"
+
+
+def get_user_tag() -> str:
+    """Tag of this user's USER_IMAGE: the user name, lower-cased to a valid docker tag."""
+    username = os.getenv("USER") or os.getenv("USERNAME") or f"uid{os.getuid()}"
+    return re.sub(r"[^a-z0-9_.-]", "-", username.lower())
+
+
+def get_image_name(image_settings: dict) -> str:
+    """
+    REPOSITORY:TAG of a [Containers.<ver>] entry; TAG may use $USER, and defaults to the
+    user's own tag for USER_IMAGE (every user builds their own fabrinetes-dev:<user>), else "latest".
+    """
+    repository = image_settings.get("REPOSITORY", None)
+    tag = image_settings.get("TAG", get_user_tag() if repository == USER_IMAGE else "latest")
+    tag = tag.replace("${USER}", get_user_tag()).replace("$USER", get_user_tag())  # same rule as `build`
+    return f"{repository}:{os.path.expandvars(tag)}"
+
+
+def split_dockerfile(text: str) -> Tuple[str, str]:
+    """(shared tools stage, per-user stage) of the Dockerfile, split at `FROM ${BASE_IMAGE}`."""
+    marker = re.search(r"^FROM \$\{BASE_IMAGE\}", text, re.M)
+    if marker is None:
+        return text, ""
+    return text[:marker.start()], text[marker.start():]
+
+
 @task
-def build(ctx):
+def build(ctx, force=False):
     username = os.getenv("USER") or os.getenv("USERNAME")
     uid = os.getuid()
     gid = os.getgid()
     home_dir = os.path.expanduser("~")
 
+    dockerfile = pathlib.Path(__file__).resolve().parent / "Dockerfile"
+    tools_text, user_text = split_dockerfile(dockerfile.read_text())
+    tools_tag = f"{TOOLS_IMAGE}:{hashlib.sha256(tools_text.encode()).hexdigest()[:12]}"
+    # one tag per user: on a shared docker host, builds of other users must not replace this image
+    user_image = f"{USER_IMAGE}:{get_user_tag()}"
+
+    with DockerClient() as client:
+        # shared tool layers: one image per tools-stage content, whoever builds it first
+        if force or client.inspect_image(tools_tag) is None:
+            ctx.run(f"docker build --target tools -t {tools_tag} -t {TOOLS_IMAGE}:latest - < {dockerfile}", pty=True)
+        else:
+            print(f"[i] {tools_tag} is up to date, reusing its layers")
+        base_id = client.inspect_image(tools_tag)["Id"]
+
+        build_args = {"USERNAME": username, "UID": uid, "GID": gid, "HOME_DIR": home_dir}
+        build_hash = hashlib.sha256(json.dumps({"dockerfile": user_text, "args": build_args, "base": base_id},
+                                               sort_keys=True).encode()).hexdigest()[:16]
+        image = client.inspect_image(user_image)
+        labels = (image or {}).get("Config", {}).get("Labels") or {}
+        if not force and labels.get(BUILD_HASH_LABEL) == build_hash:
+            print(f"[i] {user_image} is up to date (build hash {build_hash}), skipping docker build")
+            return
+
+    # thin user layer only: no build context is needed, the Dockerfile comes on stdin
     ctx.run(
-        f"docker build "
+        f"docker build --target user "
+        f"--build-arg BASE_IMAGE={tools_tag} "
         f"--build-arg USERNAME={username} "
         f"--build-arg UID={uid} "
         f"--build-arg GID={gid} "
         f"--build-arg HOME_DIR={home_dir} "
-        f"-t fabrinetes-dev -f Dockerfile .",
+        f"--label {BUILD_HASH_LABEL}={build_hash} "
+        f"-t {user_image} - < {dockerfile}",
         pty=True,
     )
 
-@task
-def list(ctx):
+
+def print_images_and_containers(client: DockerClient):
+    images = []
+    for image in client.images():
+        for repo_tag in image.get("RepoTags") or ["<none>:<none>"]:
+            repository, tag = repo_tag.rsplit(":", 1)
+            images.append([repository, tag, image["Id"].split(":")[-1][:12],
+                           time.strftime("%Y-%m-%d %H:%M", time.localtime(image["Created"])),
+                           f"{image['Size'] / 1e9:.2f}GB"])
+    containers = []
+    for container in client.containers(all=True):
+        containers.append([container["Id"][:12], container["Image"], container["Status"],
+                           ",".join(n.lstrip("/") for n in container["Names"])])
+
     print("============images=========================================================")
-    ctx.run("docker images", pty=True)
+    print(tabulate(images, headers=["REPOSITORY", "TAG", "IMAGE ID", "CREATED", "SIZE"]))
     print("===========================================================================")
     print("")
     print("===========containers=======================================================")
-    ctx.run("docker ps -a", pty=True)
+    print(tabulate(containers, headers=["CONTAINER ID", "IMAGE", "STATUS", "NAMES"]))
     print("===========================================================================")
     print("")
 
 
 @task
-def run(ctx, file,rm=False,verbose=False,ver=None,name=None, x11=True,usb=False,ask=True):
-   
-   
-    print("===============================")
-    ctx.run("docker images", pty=True)
-    print("===============================")
-    print("")
-    print("===============================")
-    ctx.run("docker ps -a", pty=True)
-    print("===============================")
-    print("")
+def list(ctx, as_json=False):
+    with DockerClient() as client:
+        if as_json:
+            print(json.dumps({"images": client.images(), "containers": client.containers(all=True)}, indent=2))
+        else:
+            print_images_and_containers(client)
+
 
+def load_launcher_file(file: str) -> Tuple[pathlib.Path, dict]:
+    """Absolute path of a launcher TOML (relative to the caller's cwd) and its [Containers] table."""
     if not os.path.isabs(file):
         base_path = os.environ.get("HDLFORGE_ORIG_PATH", os.getcwd())
         file = os.path.join(base_path, file)
     file = os.path.expandvars(file)
     file = os.path.abspath(file)
-    _config_file_path = pathlib.Path(file).resolve()
-    RELATIVE_PATH = _config_file_path.parent
-    database = toml.load(str(_config_file_path))
-    IMAGE_SETTINGS = database.get("Containers", {}).get(ver, {})
+    config_file_path = pathlib.Path(file).resolve()
+    database = toml.load(str(config_file_path))
+    return config_file_path, database.get("Containers", {})
 
-    _image_repository = IMAGE_SETTINGS.get("REPOSITORY", None)
-    _image_tag = IMAGE_SETTINGS.get("TAG", "latest")
-    IMAGE_NAME = f"{_image_repository}:{_image_tag}"
 
-    MOUNTS_LIST = IMAGE_SETTINGS.get("mounts", [])
-    _this_file_path = pathlib.Path(__file__).resolve().parent
+def get_container_mounts(image_settings: dict, relative_path: pathlib.Path) -> List[Tuple[str, str]]:
+    mounts_list = [*image_settings.get("mounts", [])]
+    this_file_path = pathlib.Path(__file__).resolve().parent
 
-    MOUNTS_LIST.append(f"{_this_file_path}/source/bashrc-root:{os.getenv('HOME')}/.bashrc")
-    MOUNTS_LIST.append(f"{_this_file_path}/source/project_setup/:/opt/project_setup")
+    mounts_list.append(f"{this_file_path}/source/bashrc-root:{os.getenv('HOME')}/.bashrc")
+    mounts_list.append(f"{this_file_path}/source/project_setup/:/opt/project_setup")
+    return resolve_mounts(mounts_list, relative_path)
 
-    RESOLVED_MOUNTS_LIST=resolve_mounts(MOUNTS_LIST, RELATIVE_PATH)
-    RESOLVED_MOUNTS_LIST:List[Tuple[str, str]]
-        
-    del database
-    del _image_repository
-    del _image_tag
-    del _config_file_path
 
-    printlocals(locals(),verbose)
-    print("")
+def get_missing_mounts(resolved_mounts: List[Tuple[str, str]]) -> List[str]:
+    return [source_str for source_str, _ in resolved_mounts if not pathlib.Path(source_str).exists()]
 
-    cmd_parts=[]
-    cmd_parts = ["docker run -dit"]
-    if name:
-        cmd_parts.append(f"--name {name}")
-    else:
-        print("Error: You must provide a name for the container using --name")
-        sys.exit(1)
-        
-   
-    if rm:
-        cmd_parts.append("--rm")
+
+def get_default_prefix() -> str:
+    """Container name prefix shared by run and run-all, so either one finds the other's containers."""
+    return f"{os.getenv('USER')}-"
+
+
+def build_create_config(image_name: str, resolved_mounts: List[Tuple[str, str]], rm=False, x11=True, usb=False) -> dict:
+    """Engine API create config of the container `docker run -dit` used to start."""
+    binds = []
+    env = []
+    host_config = {"AutoRemove": rm, "Binds": binds}
     if x11:
-        cmd_parts.append("--net=host")
-        cmd_parts.append(f"-e DISPLAY={os.environ['DISPLAY']}")
-        cmd_parts.append(f"-e /tmp/.X11-unix:/tmp/.X11-unix")
-        cmd_parts.append(f"-v {os.environ['HOME']}/.Xauthority:/home/ykarmon/.Xauthority:ro")
-       
+        host_config["NetworkMode"] = "host"
+        env.append(f"DISPLAY={os.environ['DISPLAY']}")
+        binds.append("/tmp/.X11-unix:/tmp/.X11-unix")
+        binds.append(f"{os.environ['HOME']}/.Xauthority:/home/ykarmon/.Xauthority:ro")
 
     if usb:
-        cmd_parts.append("-v /dev/bus/usb:/dev/bus/usb")
+        binds.append("/dev/bus/usb:/dev/bus/usb")
 
+    for source_str, dest in resolved_mounts:
+        binds.append(f"{source_str}:{dest}")
 
-    need_to_exit = False
-    for mount in RESOLVED_MOUNTS_LIST:
-       
+    return {
+        "Image":       image_name,
+        "Tty":         True,
+        "OpenStdin":   True,
+        "Env":         env,
+        "HostConfig":  host_config,
+    }
 
-        source_str, dest = mount  
-        source_path = pathlib.Path(source_str)
 
-        if not source_path.exists():
-            print(f"Warning: Mount source '{source_path}' does not exist. Skipping.")
-            need_to_exit= True
-            continue
+CONFIG_HASH_LABEL = "fabrinetes.config-hash"
+VOLATILE_ENV = ("DISPLAY",)  # changes with every SSH/X session, not a reason to replace a container
+
+
+def get_config_hash(client: DockerClient, create_config: dict) -> str:
+    """Hash of the resolved image (its id, so a rebuilt tag counts as a change), mounts, env (but VOLATILE_ENV) and flags."""
+    image = client.inspect_image(create_config["Image"])
+    config = {key: value for key, value in create_config.items() if key != "Labels"}
+    config["Env"] = [env for env in config.get("Env", []) if env.split("=", 1)[0] not in VOLATILE_ENV]
+    config["ImageId"] = image["Id"] if image else None
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def get_container_action(client: DockerClient, name: str, config_hash: str, recreate=False) -> Tuple[str, dict]:
+    """
+    ("reuse" | "start" | "recreate" | "create" | "config changed", existing container inspect or None).
+    A running container is only replaced with `recreate`: when its config changed it is
+    "config changed" and is reused as is.
+    """
+    existing = client.inspect_container(name)
+    if existing is None:
+        return "create", None
+    labels = existing["Config"].get("Labels") or {}
+    if recreate:
+        return "recreate", existing
+    if labels.get(CONFIG_HASH_LABEL) != config_hash:
+        return ("config changed" if existing["State"]["Running"] else "recreate"), existing
+    return ("reuse" if existing["State"]["Running"] else "start"), existing
+
+
+def start_container(client: DockerClient, name: str, create_config: dict, recreate=False) -> dict:
+    """
+    Reattach to `name` when its config hash label matches (starting it if stopped) or when it is
+    running with a changed config (reported, replaced only with `recreate`),
+    else (re)create + start + safe.directory setup.
+    Returns {name, id, action, status, seconds, error}.
+    """
+    result = {"name": name, "id": "", "action": "", "status": "FAIL", "seconds": 0.0, "error": ""}
+    start = time.monotonic()
+    try:
+        config_hash = get_config_hash(client, create_config)
+        action, existing = get_container_action(client, name, config_hash, recreate)
+        result["action"] = action
+        if action in ("reuse", "start", "config changed"):
+            result["id"] = existing["Id"][:12]
+            if action == "start":
+                client.start_container(existing["Id"])
+            result["status"] = "OK" if action != "config changed" else "OK (old config, --recreate to apply)"
+        else:
+            if existing is not None:
+                client.remove_container(existing["Id"], force=True)
+            create_config = dict(create_config, Labels={CONFIG_HASH_LABEL: config_hash})
+            container_id = client.create_container(name, create_config)
+            result["id"] = container_id[:12]
+            client.start_container(container_id)
+            exit_code, stdout, stderr = client.exec(container_id, ["sudo", "git", "config", "--global", "--add", "safe.directory", "*"])
+            result["status"] = "OK" if exit_code == 0 else f"OK (safe.directory exit {exit_code})"
+    except (DockerError, OSError) as e:
+        result["error"] = str(e)
+    result["seconds"] = time.monotonic() - start
+    return result
 
-        cmd_parts.append(f"-v {str(source_path)}:{dest}")
 
-    if(need_to_exit):
+@task
+def run(ctx, file,rm=False,verbose=False,ver=None,name=None, x11=True,usb=False,ask=True,recreate=False):
+   
+   
+    client = DockerClient()
+    print_images_and_containers(client)
+
+    _config_file_path, _containers = load_launcher_file(file)
+    RELATIVE_PATH = _config_file_path.parent
+    IMAGE_SETTINGS = _containers.get(ver, {})
+
+    IMAGE_NAME = get_image_name(IMAGE_SETTINGS)
+
+    RESOLVED_MOUNTS_LIST=get_container_mounts(IMAGE_SETTINGS, RELATIVE_PATH)
+    RESOLVED_MOUNTS_LIST:List[Tuple[str, str]]
+        
+    del _containers
+    del _config_file_path
+
+    printlocals(locals(),verbose)
+    print("")
+
+    if not name:
+        name = f"{get_default_prefix()}{ver}"  # stable default so the next run finds it again
+
+    missing_mounts = get_missing_mounts(RESOLVED_MOUNTS_LIST)
+    for source_str in missing_mounts:
+        print(f"Warning: Mount source '{source_str}' does not exist. Skipping.")
+    if(missing_mounts):
         print("Exiting due to missing mount source.")
         sys.exit(1)
 
-    cmd_parts.append(IMAGE_NAME)
-    cmd = " ".join(cmd_parts)
+    create_config = build_create_config(IMAGE_NAME, RESOLVED_MOUNTS_LIST, rm=rm, x11=x11, usb=usb)
 
-    print(f"Running command: {cmd}")
-    print(f"command parts:")
-    for part in cmd_parts:
-        print(part)
+    print(f"Creating container {name}:")
+    print(json.dumps(create_config, indent=2))
 
-    if(ask):
+    action, _ = get_container_action(client, name, get_config_hash(client, create_config), recreate)
+    print(f"Container {name}: {action}")
+    if(ask and action == "config changed"):
+        answer = input(f"{name} is running with an older config. Remove and recreate it? [y/N]: ").strip().lower()
+        recreate = answer in ("y", "yes")
+        if not recreate:
+            print(f"[i] Keeping the running {name}, its config is not updated")
+    elif(ask and action in ("create", "recreate")):  # reattaching to a matching container needs no confirmation
         answer = input("Do you want to continue? [y/N]: ").strip().lower()
         if answer not in ("y", "yes"):
             print("Aborted.")
             return
-    
-    ctx.run(cmd, pty=True)
 
+    result = start_container(client, name, create_config, recreate)
+    client.close()
+    if result["error"]:
+        print(f"Error: {result['error']}")
+        sys.exit(1)
+    print(f"[+] {name} ({result['id']}) {result['action']} in {result['seconds']:.1f}s: {result['status']}")
+    print(f"    attach with: docker exec -it {name} bash")
+
+
+@task
+def run_all(ctx, file, vers=None, prefix=None, rm=False, x11=True, usb=False, jobs=8, recreate=False):
+    """
+    Start every [Containers.<ver>] of a launcher TOML (or the comma-separated --vers) in parallel.
+    Container names are <prefix><ver>, $USER-<ver> by default like `run`. All mounts are validated before anything starts.
+    """
+    if prefix is None:
+        prefix = get_default_prefix()
+    config_file_path, containers = load_launcher_file(file)
+    relative_path = config_file_path.parent
+    selected = [v.strip() for v in vers.split(",") if v.strip()] if vers else [ver for ver in containers]
+    unknown = [v for v in selected if v not in containers]
+    if unknown:
+        print(f"Error: {', '.join(unknown)} not in {config_file_path} (available: {', '.join(containers)})")
+        sys.exit(1)
+
+    create_configs = {}
+    need_to_exit = False
+    for ver in selected:
+        image_settings = containers[ver]
+        image_name = get_image_name(image_settings)
+        try:
+            resolved_mounts = get_container_mounts(image_settings, relative_path)
+        except ValueError as e:
+            print(f"Error: [{ver}] {e}")
+            need_to_exit = True
+            continue
+        for source_str in get_missing_mounts(resolved_mounts):
+            print(f"Error: [{ver}] Mount source '{source_str}' does not exist.")
+            need_to_exit = True
+        create_configs[f"{prefix}{ver}"] = build_create_config(image_name, resolved_mounts, rm=rm, x11=x11, usb=usb)
+    if need_to_exit:
+        print("Exiting due to invalid mounts, no container was started.")
+        sys.exit(1)
 
-    ctx.run(f"docker exec {name} sudo git config --global --add safe.directory '*'", pty=True, echo=True, warn=True)
-    
-    
-    
+    print(f"Starting {len(create_configs)} containers from {config_file_path}")
+    from concurrent.futures import ThreadPoolExecutor
 
+    def start_one(item):
+        name, create_config = item
+        with DockerClient() as client:  # one connection per worker thread
+            return start_container(client, name, create_config, recreate)
 
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, min(int(jobs), len(create_configs)))) as pool:
+        results = [*pool.map(start_one, create_configs.items())]
+    total = time.monotonic() - start
 
-   
+    table = [[r["name"], r["id"], r["action"], r["status"], f"{r['seconds']:.1f}", r["error"]] for r in results]
+    print(tabulate(table, headers=["NAME", "CONTAINER ID", "ACTION", "STATUS", "STARTUP [s]", "ERROR"]))
+    n_failed = sum(1 for r in results if r["error"])
+    print(f"{len(results) - n_failed}/{len(results)} containers started in {total:.1f}s")
+    if n_failed:
+        sys.exit(1)
@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# docker_api.py lives at the repo root, the hdlforge modules under source/project_setup
+for path in (ROOT, ROOT / "source" / "project_setup"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+COMPILE_GHDL = ROOT / "source" / "project_setup" / "compile_ghdl.py"
+
+# records every analysed file and creates the library index like ghdl-gcc -a does
+FAKE_GHDL = """#!/bin/sh
+[ "$1" = "--version" ] && { echo "GHDL 9.9 (fake) [Dunoon edition]"; exit 0; }
+workdir=.
+work=work
+for arg in "$@"; do
+    case "$arg" in
+        --workdir=*) workdir="${arg#--workdir=}" ;;
+        --work=*) work="${arg#--work=}" ;;
+        -*) ;;
+        *) echo "$(basename "$arg")" >> "$GHDL_LOG" ;;
+    esac
+done
+touch "$workdir/$work-obj08.cf"
+"""
+
+SOURCES = {
+    "pkg.vhd": "package pkg is\n  constant C : integer := 1;\nend package;\n",
+    "leaf.vhd": "use work.pkg.all;\nentity leaf is\nend entity;\narchitecture rtl of leaf is\nbegin\nend architecture;\n",
+    "top.vhd": "entity top is\nend entity;\narchitecture rtl of top is\nbegin\n  u0: entity work.leaf;\nend architecture;\n",
+    "other.vhd": "entity other is\nend entity;\narchitecture rtl of other is\nbegin\nend architecture;\n",
+}
+
+
+@pytest.fixture
+def project(tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    ghdl = bin_dir / "ghdl-gcc"
+    ghdl.write_text(FAKE_GHDL)
+    ghdl.chmod(0o755)
+    rtl = tmp_path / "rtl"
+    rtl.mkdir()
+    for name, text in SOURCES.items():
+        (rtl / name).write_text(text)
+    (tmp_path / "sources.txt").write_text("".join(f"rtl/{name}\n" for name in SOURCES))
+    (tmp_path / "p.hdlforge.toml").write_text(
+        '[ghdl_settings]\nbuild_dir = "ghdl_build"\n'
+        '[ghdl_settings.lib_list.mylib]\nsources_file = "sources.txt"\nghdl_flags = ["--std=08"]\n'
+        'external_libraries = {}\n')
+    return tmp_path
+
+
+def analyse(project, *extra):
+    """Run the analyse CLI and return the files the fake ghdl-gcc analysed."""
+    log = project / "ghdl.log"
+    log.unlink(missing_ok=True)
+    env = dict(os.environ, PATH=f"{project / 'bin'}{os.pathsep}{os.environ['PATH']}", GHDL_LOG=str(log),
+               HDLFORGE_TRACE_FILE=str(project / "trace.jsonl"))
+    subprocess.run([sys.executable, str(COMPILE_GHDL), "--repo_top", str(project), "--project_json", "p.hdlforge.toml",
+                    "--c", "analyse", *extra], cwd=project, env=env, check=True, capture_output=True, text=True)
+    return log.read_text().split() if log.exists() else []
+
+
+def test_incremental_analysis(project):
+    assert analyse(project) == ["pkg.vhd", "leaf.vhd", "top.vhd", "other.vhd"]
+    assert (project / "ghdl_build" / "mylib" / ".hdlforge_ghdl_state.json").exists()
+    assert analyse(project) == []
+
+    # a package change re-analyses the files that use it, in list order
+    (project / "rtl" / "pkg.vhd").write_text(SOURCES["pkg.vhd"].replace(":= 1", ":= 2"))
+    assert analyse(project) == ["pkg.vhd", "leaf.vhd", "top.vhd"]
+    (project / "rtl" / "other.vhd").write_text(SOURCES["other.vhd"] + "-- comment\n")
+    assert analyse(project) == ["other.vhd"]
+
+
+def test_full_analysis(project):
+    analyse(project)
+    assert analyse(project, "--full") == ["pkg.vhd", "leaf.vhd", "top.vhd", "other.vhd"]
+
+
+def test_missing_library_index_means_full_analysis(project):
+    analyse(project)
+    (project / "ghdl_build" / "mylib" / "mylib-obj08.cf").unlink()
+    assert analyse(project) == ["pkg.vhd", "leaf.vhd", "top.vhd", "other.vhd"]
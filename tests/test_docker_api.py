@@ -0,0 +1,175 @@
+import http.server
+import json
+import socketserver
+import struct
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from docker_api import API_VERSION, DockerClient, DockerError, demux_stream, split_image_name
+
+
+class FakeDaemonHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status: int, body: bytes, close: bool = False):
+        # decided before the client can see the response and change drop_after_response
+        self.close_connection = close or self.server.drop_after_response
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        if close:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status: int, obj):
+        self.send_body(status, json.dumps(obj).encode())
+
+    def do_GET(self):
+        path = self.path.removeprefix(f"/{API_VERSION}")
+        self.server.requests.append(("GET", path))
+        if path == "/_ping":
+            self.send_body(200, b"OK")
+        elif path == "/containers/running/json":
+            self.send_json(200, {"Id": "c" * 64, "State": {"Running": True}})
+        elif path == "/containers/broken/json":
+            self.send_json(500, {"message": "daemon on fire\n"})
+        elif path == "/exec/e1/json":
+            self.send_json(200, {"ExitCode": 3})
+        else:
+            self.send_json(404, {"message": f"No such object: {path}"})
+
+    def do_POST(self):
+        path = self.path.removeprefix(f"/{API_VERSION}")
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+        self.server.requests.append(("POST", path, body))
+        if path.startswith("/containers/create"):
+            if body["Image"] not in self.server.images:
+                self.send_json(404, {"message": f"No such image: {body['Image']}"})
+            else:
+                self.send_json(201, {"Id": "d" * 64})
+        elif path.startswith("/images/create"):
+            query = parse_qs(urlsplit(path).query)
+            image = f"{query['fromImage'][0]}:{query['tag'][0]}"
+            if image.startswith("unknown/"):
+                progress = [{"status": "Pulling"}, {"errorDetail": {"message": "not found"}, "error": "manifest unknown"}]
+            else:
+                self.server.images.add(image)
+                progress = [{"status": "Pulling from"}, {"status": f"Downloaded newer image for {image}"}]
+            self.send_body(200, b"".join(json.dumps(p).encode() + b"\r\n" for p in progress))
+        elif path.endswith("/exec"):
+            self.send_json(201, {"Id": "e1"})
+        elif path == "/exec/e1/start":
+            frames = [(1, b"out 1\n"), (2, b"err 1\n"), (1, b"out 2\n")]
+            stream = b"".join(struct.pack(">BxxxL", kind, len(payload)) + payload for kind, payload in frames)
+            self.send_body(200, stream, close=True)  # the daemon closes the stream when the command exits
+        else:
+            self.send_json(404, {"message": "page not found"})
+
+
+class FakeDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        super().__init__(socket_path, FakeDaemonHandler)
+        self.connections = 0
+        self.requests = []
+        self.drop_after_response = False
+        self.images = {"local/dev:latest"}
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    server = FakeDaemon(str(tmp_path / "docker.sock"))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(daemon):
+    with DockerClient(daemon.server_address, timeout=5) as client:
+        yield client
+
+
+def test_connection_reuse(daemon, client):
+    for _ in range(5):
+        assert client.ping()
+    assert client.inspect_container("running")["State"]["Running"]
+    assert daemon.connections == 1
+
+
+def test_reconnect_after_server_drop(daemon, client):
+    daemon.drop_after_response = True  # closes without "Connection: close", like an idle timeout
+    for _ in range(3):
+        assert client.ping()
+    assert daemon.connections == 3
+    daemon.drop_after_response = False
+    assert client.ping()
+    assert client.ping()
+    assert daemon.connections == 4
+
+
+def test_exec_demux(daemon, client):
+    exit_code, stdout, stderr = client.exec("running", ["ls", "-l"], user="root")
+    assert (exit_code, stdout, stderr) == (3, "out 1\nout 2\n", "err 1\n")
+    assert daemon.requests[0] == ("POST", "/containers/running/exec",
+                                  {"Cmd": ["ls", "-l"], "AttachStdout": True, "AttachStderr": True,
+                                   "Tty": False, "User": "root"})
+    # the closed exec stream does not break the next request
+    assert client.ping()
+
+
+def test_demux_stream_ignores_truncated_frame():
+    data = struct.pack(">BxxxL", 1, 3) + b"abc" + struct.pack(">BxxxL", 2, 2) + b"er" + b"\x01\x00"
+    assert demux_stream(data) == (b"abc", b"er")
+
+
+def test_create_pulls_missing_image(daemon, client):
+    assert client.create_container("c1", {"Image": "local/dev:latest"}) == "d" * 64
+    assert not any(r[1].startswith("/images/create") for r in daemon.requests)
+
+    assert client.create_container("c2", {"Image": "registry.example:5000/team/dev:1.2"}) == "d" * 64
+    creates = [r[1] for r in daemon.requests if r[0] == "POST"]
+    assert creates[1:] == ["/containers/create?name=c2",
+                           "/images/create?fromImage=registry.example%3A5000%2Fteam%2Fdev&tag=1.2",
+                           "/containers/create?name=c2"]
+
+
+def test_pull_failure_raises(daemon, client):
+    with pytest.raises(DockerError, match="manifest unknown"):
+        client.create_container("c3", {"Image": "unknown/dev:latest"})
+    with pytest.raises(DockerError) as excinfo:
+        client.create_container("c4", {"Image": "other/dev:latest"}, pull=False)
+    assert excinfo.value.status == 404
+
+
+def test_split_image_name():
+    assert split_image_name("dev") == ("dev", "latest")
+    assert split_image_name("team/dev:1.2") == ("team/dev", "1.2")
+    assert split_image_name("registry:5000/team/dev") == ("registry:5000/team/dev", "latest")
+
+
+def test_404_is_none(client):
+    assert client.inspect_container("missing") is None
+    assert client.inspect_image("missing:latest") is None
+
+
+def test_error_status_raises(client):
+    with pytest.raises(DockerError) as excinfo:
+        client.inspect_container("broken")
+    assert excinfo.value.status == 500
+    assert excinfo.value.message == "daemon on fire"
+    with pytest.raises(DockerError) as excinfo:
+        client.start_container("missing")
+    assert excinfo.value.status == 404
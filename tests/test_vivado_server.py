@@ -0,0 +1,103 @@
+import os
+import shutil
+import signal
+import socket
+import stat
+import time
+from pathlib import Path
+
+import pytest
+
+from conftest import ROOT
+from vivado_client import STATE_FILE_NAME, VivadoClient, VivadoServerError, read_state, start_server
+
+SERVER_TCL = ROOT / "source" / "project_setup" / "vivado_server.tcl"
+
+pytestmark = pytest.mark.skipif(shutil.which("tclsh") is None, reason="tclsh not installed")
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def server(tmp_path):
+    state_file = tmp_path / STATE_FILE_NAME
+    port, pid, project, token = start_server(["tclsh", str(SERVER_TCL), "-", str(state_file)], state_file,
+                                      tmp_path / "server.log", cwd=tmp_path, timeout=10)
+    yield state_file, pid
+    if state_file.exists():
+        os.kill(pid, signal.SIGTERM)
+
+
+def test_state_file(server):
+    state_file, pid = server
+    port, state_pid, project, token = read_state(state_file)
+    assert port > 0
+    assert state_pid == pid
+    assert project == "-"
+    assert len(token) == 64
+    assert stat.S_IMODE(state_file.stat().st_mode) == 0o600
+
+
+@pytest.mark.parametrize("first_frame", [b"A 3\nbad", b"A 0\n", b"S 9\nexec true"])
+def test_connection_without_token_is_closed(server, first_frame):
+    state_file, _ = server
+    port, _, _, token = read_state(state_file)
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as sock:
+        sock.sendall(first_frame + b"S 9\nexec true")
+        assert sock.recv(1024) == b""  # closed without evaluating anything
+    with pytest.raises(OSError):
+        VivadoClient(port, token[::-1], timeout=10)
+    # the server keeps serving clients with the token
+    with VivadoClient.from_state_file(state_file, timeout=10) as client:
+        assert client.eval("expr {1 + 1}") == "2"
+
+
+def test_eval_round_trip(server):
+    state_file, _ = server
+    output = []
+    with VivadoClient.from_state_file(state_file, timeout=10) as client:
+        assert client.eval("expr {6 * 7}", output.append) == "42"
+        assert client.eval("set x 1; puts -nonewline a; puts b; incr x", output.append) == "2"
+        # state set by one script is visible to the next one
+        assert client.eval("set x", output.append) == "2"
+    assert "".join(output) == "ab\n"
+
+
+def test_error_keeps_server_alive(server):
+    state_file, _ = server
+    with VivadoClient.from_state_file(state_file, timeout=10) as client:
+        with pytest.raises(VivadoServerError, match="boom"):
+            client.eval("error boom")
+        assert client.eval("string length {été}") == "3"
+    # a new connection after the first one closed
+    with VivadoClient.from_state_file(state_file, timeout=10) as client:
+        assert client.eval("set x 5") == "5"
+
+
+def test_source_args_and_exit(server, tmp_path):
+    state_file, _ = server
+    script = tmp_path / "step.tcl"
+    script.write_text('puts "argc=$argc argv=$argv"\nif {[lindex $argv 0] ne "ok"} { exit 3 }\nexit 0\nputs unreachable\n')
+    output = []
+    with VivadoClient.from_state_file(state_file, timeout=10) as client:
+        assert client.source(script, ["ok", "a b"], output.append) == ""
+        assert output == ["argc=2 argv=ok {a b}\n"]
+        with pytest.raises(VivadoServerError, match="exited with code 3"):
+            client.source(script, ["fail"], output.append)
+        # exit and argv are restored after the script
+        assert client.eval("list $argc [llength [info commands hdlforge_orig_exit]]") == "2 0"
+
+
+def test_stop_removes_state_file(server):
+    state_file, _ = server
+    with VivadoClient.from_state_file(state_file, timeout=10) as client:
+        client.stop()
+    assert wait_for(lambda: not state_file.exists())
+    assert VivadoClient.from_state_file(state_file) is None